@@ -1,3 +1,4 @@
+import logging
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -8,32 +9,131 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 # Use explicit path to .env file in backend directory
 env_path = BASE_DIR / '.env'
 
-if env_path.exists():
-    print(f"Loading .env from: {env_path}")
+env_found = env_path.exists()
+if env_found:
     # override=True ensures this file takes precedence
     load_dotenv(dotenv_path=env_path, override=True)
+
+# Leveled logging for the whole app; disabled levels cost nothing
+LOG_LEVEL = os.getenv(
+    "LOG_LEVEL", "DEBUG" if os.getenv("DEBUG", "false").lower() == "true" else "INFO"
+).upper()
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+logger = logging.getLogger(__name__)
+
+if env_found:
+    logger.debug("Loading .env from: %s", env_path)
 else:
-    print(f"Warning: .env file not found at: {env_path}")
-    print(f"Current working directory: {Path.cwd()}")
-    print(f"BASE_DIR: {BASE_DIR}")
+    logger.warning(".env file not found at: %s (cwd: %s, BASE_DIR: %s)", env_path, Path.cwd(), BASE_DIR)
 
 class Settings:
     # Gemini API key - loaded from .env file
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
+    GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+    
+    # Gemini client - "google" for the real API, "fake" for offline load tests
+    GEMINI_TRANSPORT: str = os.getenv("GEMINI_TRANSPORT", "google")
+    GEMINI_FAKE_LATENCY: float = float(os.getenv("GEMINI_FAKE_LATENCY", "0"))  # seconds per fake call
+    GEMINI_REQUESTS_PER_MINUTE: int = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+    GEMINI_TOKENS_PER_MINUTE: int = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+    GEMINI_TIMEOUT: float = float(os.getenv("GEMINI_TIMEOUT", "90"))  # seconds per attempt
+    GEMINI_MAX_RETRIES: int = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+    GEMINI_BACKOFF_BASE: float = float(os.getenv("GEMINI_BACKOFF_BASE", "1"))
+    GEMINI_BACKOFF_MAX: float = float(os.getenv("GEMINI_BACKOFF_MAX", "30"))
+    GEMINI_CIRCUIT_FAILURES: int = int(os.getenv("GEMINI_CIRCUIT_FAILURES", "5"))  # consecutive, to open
+    GEMINI_CIRCUIT_RESET: float = float(os.getenv("GEMINI_CIRCUIT_RESET", "30"))  # seconds before a probe
+    GEMINI_TOP_UP_ATTEMPTS: int = int(os.getenv("GEMINI_TOP_UP_ATTEMPTS", "1"))  # follow-ups for short quizzes
+    
+    # target_hots_percentage - steered follow-ups for the underrepresented category
+    HOTS_TARGET_TOLERANCE: float = float(os.getenv("HOTS_TARGET_TOLERANCE", "10"))  # percentage points
+    HOTS_TARGET_MAX_CALLS: int = int(os.getenv("HOTS_TARGET_MAX_CALLS", "3"))  # Gemini calls per quiz
     
     # Other settings
-    UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "uploads")
     MAX_FILE_SIZE: int = int(os.getenv("MAX_FILE_SIZE", "10485760"))  # 10MB default
+    MAX_PDF_PAGES: int = int(os.getenv("MAX_PDF_PAGES", "500"))
+    PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))  # split across PDF_WORKERS above this
+    MAX_UNCOMPRESSED_SIZE: int = int(os.getenv("MAX_UNCOMPRESSED_SIZE", "104857600"))  # XML inside DOCX/PPTX, 100MB
+    
+    # Gemini prompt budgets
+    PROMPT_INPUT_TOKENS: int = int(os.getenv("PROMPT_INPUT_TOKENS", "1000"))  # document tokens per quiz prompt
+    PROMPT_SOURCE_CHARS: int = int(os.getenv("PROMPT_SOURCE_CHARS", "16000"))  # PDF text read to select them from
+    PROMPT_SELECT_MAX_CHARS: int = int(os.getenv("PROMPT_SELECT_MAX_CHARS", "200000"))  # sampled beyond this
+    GEMINI_JSON_MODE: bool = os.getenv("GEMINI_JSON_MODE", "true").lower() == "true"  # response schema, no example in prompt
+    GEMINI_MAX_OUTPUT_TOKENS: int = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", "8192"))  # cap on the sized answer
+    GEMINI_THINKING_BUDGET: int = int(os.getenv("GEMINI_THINKING_BUDGET", "1024"))  # thinking tokens per call, 0 disables
+    
+    # Long-document mode - chunked, concurrent generation
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+    LONG_DOC_CHUNK_TOKENS: int = int(os.getenv("LONG_DOC_CHUNK_TOKENS", "1000"))
+    LONG_DOC_MAX_CHUNKS: int = int(os.getenv("LONG_DOC_MAX_CHUNKS", "16"))
+    LONG_DOC_OVERSAMPLE: float = float(os.getenv("LONG_DOC_OVERSAMPLE", "1.5"))  # extra questions for dedup
+    
+    # Batch generation - many documents (or ZIPs of them) per request
+    BATCH_MAX_FILES: int = int(os.getenv("BATCH_MAX_FILES", "50"))  # documents, after ZIP expansion
+    BATCH_MAX_UPLOAD_SIZE: int = int(os.getenv("BATCH_MAX_UPLOAD_SIZE", "104857600"))  # 100MB per request
+    
+    # Concurrency - bounded pools for blocking work
+    PDF_WORKERS: int = int(os.getenv("PDF_WORKERS", "2"))    # processes for document parsing
+    BERT_WORKERS: int = int(os.getenv("BERT_WORKERS", "1"))  # threads for BERT inference
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", "1048576"))  # 1MB
+    
+    # BERT classifier
+    BERT_MODEL_NAME: str = os.getenv("BERT_MODEL_NAME", "all-MiniLM-L6-v2")
+    BERT_BACKEND: str = os.getenv("BERT_BACKEND", "torch")       # torch | onnx | int8 (speed vs accuracy)
+    BERT_ONNX_THREADS: int = int(os.getenv("BERT_ONNX_THREADS", "0"))  # ONNX Runtime intra-op threads (0 = all cores)
+    BERT_EAGER_LOAD: bool = os.getenv("BERT_EAGER_LOAD", "true").lower() == "true"  # warm up at startup
+    BERT_BATCH_MAX_SIZE: int = int(os.getenv("BERT_BATCH_MAX_SIZE", "64"))        # micro-batch flush size
+    BERT_BATCH_MAX_WAIT_MS: float = float(os.getenv("BERT_BATCH_MAX_WAIT_MS", "5"))  # max added latency
+    BERT_SERVER_SOCKET: str = os.getenv("BERT_SERVER_SOCKET", "")  # classifier sidecar socket; empty = in-process
+    CLASSIFY_BATCH_MAX_QUESTIONS: int = int(os.getenv("CLASSIFY_BATCH_MAX_QUESTIONS", "5000"))
+    LEXICAL_PRECLASSIFIER: bool = os.getenv("LEXICAL_PRECLASSIFIER", "true").lower() == "true"  # keyword match before BERT
+    BLOOMS_TAXONOMY_PATH: str = os.getenv("BLOOMS_TAXONOMY_PATH", "")  # empty = app/data/blooms_taxonomy.json
+    TAXONOMY_CHECK_INTERVAL: float = float(os.getenv("TAXONOMY_CHECK_INTERVAL", "5"))  # seconds between file checks, 0 = reload endpoint only
+    EMBEDDING_CACHE_DIR: str = os.getenv("EMBEDDING_CACHE_DIR", "cache/embeddings")
+    QUESTION_EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv("QUESTION_EMBEDDING_CACHE_MAX_ENTRIES", "20000"))  # in-memory LRU
+    QUESTION_EMBEDDING_CACHE_PATH: str = os.getenv("QUESTION_EMBEDDING_CACHE_PATH", "")  # SQLite file; empty = memory only
+    QUESTION_EMBEDDING_CACHE_MAX_ROWS: int = int(os.getenv("QUESTION_EMBEDDING_CACHE_MAX_ROWS", "200000"))  # SQLite file, LRU evicted
+    
+    # Semantic near-duplicate questions (within a quiz and across generations)
+    QUESTION_DEDUP: str = os.getenv("QUESTION_DEDUP", "drop")  # drop (and top up) | flag | off
+    QUESTION_DEDUP_THRESHOLD: float = float(os.getenv("QUESTION_DEDUP_THRESHOLD", "0.9"))  # cosine similarity
+    QUESTION_INDEX_PATH: str = os.getenv("QUESTION_INDEX_PATH", "")  # SQLite file; empty = memory only
+    QUESTION_INDEX_BACKEND: str = os.getenv("QUESTION_INDEX_BACKEND", "auto")  # auto | exact | hnsw (hnswlib)
+    QUESTION_INDEX_MAX_QUESTIONS: int = int(os.getenv("QUESTION_INDEX_MAX_QUESTIONS", "100000"))  # oldest evicted past this
+    QUESTION_DEDUP_SCOPE: str = os.getenv("QUESTION_DEDUP_SCOPE", "document")  # document | global (every upload)
+    
+    # Question bank (every classified question, reused by /assemble)
+    QUESTION_BANK_PATH: str = os.getenv("QUESTION_BANK_PATH", "cache/question_bank.sqlite3")  # empty = disabled
+    QUESTION_BANK_MAX_AVOID: int = int(os.getenv("QUESTION_BANK_MAX_AVOID", "50"))  # bank questions listed in shortfall prompts
+    
+    # Async job queue
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_QUEUE_MAX_DEPTH: int = int(os.getenv("JOB_QUEUE_MAX_DEPTH", "100"))  # 429 beyond this
+    JOB_STORE_PATH: str = os.getenv("JOB_STORE_PATH", "cache/jobs.sqlite3")
+    JOB_RESULT_TTL: int = int(os.getenv("JOB_RESULT_TTL", "86400"))  # seconds finished jobs are kept
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "60"))  # running jobs are taken over after this
+    JOB_SWEEP_INTERVAL: float = float(os.getenv("JOB_SWEEP_INTERVAL", "30"))  # seconds between purges/requeues
+    
+    # Generated quiz cache - "memory", "sqlite" or "none"
+    QUIZ_CACHE_BACKEND: str = os.getenv("QUIZ_CACHE_BACKEND", "memory")
+    QUIZ_CACHE_PATH: str = os.getenv("QUIZ_CACHE_PATH", "cache/quiz_cache.sqlite3")
+    QUIZ_CACHE_TTL: int = int(os.getenv("QUIZ_CACHE_TTL", "86400"))  # seconds, 0 = never expire
+    QUIZ_CACHE_MAX_ENTRIES: int = int(os.getenv("QUIZ_CACHE_MAX_ENTRIES", "512"))
+    QUIZ_CACHE_MAX_BYTES: int = int(os.getenv("QUIZ_CACHE_MAX_BYTES", "52428800"))  # 50MB
     
     # Production mode (less verbose logging)
     DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
+    LOG_LEVEL: str = LOG_LEVEL  # DEBUG / INFO / WARNING / ERROR
+    SLOW_REQUEST_SECONDS: float = float(os.getenv("SLOW_REQUEST_SECONDS", "10"))  # logged with stage breakdown
     
     def __init__(self):
         if self.DEBUG:
-            self._debug_print()
+            self._debug_log()
         
-        # Validate API key
-        if not self.GEMINI_API_KEY:
+        # Validate API key (not needed by the offline fake transport)
+        if self.GEMINI_TRANSPORT.lower() == "fake":
+            pass
+        elif not self.GEMINI_API_KEY:
             raise ValueError(
                 "GEMINI_API_KEY not found in .env file. "
                 "Please create a .env file in the backend directory with: "
@@ -46,16 +146,12 @@ class Settings:
                 f"Current value starts with: {self.GEMINI_API_KEY[:10]}..."
             )
     
-    def _debug_print(self):
+    def _debug_log(self):
         """Debug output - only shown when DEBUG=true"""
-        print("\n" + "="*60)
-        print("🔧 SETTINGS INITIALIZATION")
-        print("="*60)
-        
-        print(f"\n✅ Gemini API Key loaded from .env successfully!")
-        print(f"   Length: {len(self.GEMINI_API_KEY)} characters")
-        print(f"   BASE_DIR: {BASE_DIR}")
-        print("="*60 + "\n")
+        logger.debug(
+            "Settings initialized: Gemini API key loaded (%d characters), BASE_DIR=%s",
+            len(self.GEMINI_API_KEY), BASE_DIR
+        )
 
 # Create singleton instance
 settings = Settings()
\ No newline at end of file
@@ -1,17 +1,48 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-import os
-import shutil
+from typing import List, Optional
+import asyncio
+import json
+import logging
 from app.config.settings import settings
-from app.utils.pdf_extractor import extract_text_from_pdf
-from app.services.gemini_service import generate_quiz_from_text, format_quiz_for_frontend
-from app.services.bert_classifier import classify_multiple_questions, get_detailed_classification
+from app.utils.upload_limits import read_upload
+from app.utils.document_extractors import detect_format, supported_formats, UNSUPPORTED_MESSAGE
+from app.services.micro_batcher import (
+    get_classification_batcher,
+    classifier_status,
+    classifier_stats,
+    reload_classifier_taxonomy,
+)
+from app.services.quiz_cache import get_quiz_cache
+from app.services.gemini_client import get_gemini_client
+from app.services.gemini_service import get_generation_stats
+from app.services.question_index import get_question_index
+from app.services.question_bank import get_question_bank, document_hash
+from app.services.quiz_pipeline import (
+    run_quiz_pipeline,
+    assemble_quiz,
+    extract_quiz_text,
+    stream_quiz_questions,
+    build_classification_stats,
+    save_to_bank,
+    validate_hots_percentage,
+    QuizPipelineError,
+)
+from app.services.batch_pipeline import collect_documents, run_batch_pipeline
+from app.services.job_queue import get_job_queue, QueueFullError, STATUS_DONE, STATUS_FAILED
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Ensure uploads directory exists
-os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+
+def _upload_format(file, data):
+    """Format of an uploaded document, sniffed from its content (400 if unsupported)"""
+    document_format = detect_format(data, file.filename)
+    if document_format not in supported_formats():
+        raise HTTPException(status_code=400, detail=UNSUPPORTED_MESSAGE)
+    return document_format
 
 
 @router.post("/generate-from-pdf")
@@ -20,89 +51,176 @@ async def generate_quiz_from_pdf(
     title: str = Form("Generated Quiz"),
     num_multiple_choice: int = Form(5),
     num_true_false: int = Form(5),
-    num_identification: int = Form(5)
+    num_identification: int = Form(5),
+    long_document: bool = Form(False),
+    target_hots_percentage: Optional[float] = Form(None)
 ):
     """
-    Generate quiz from uploaded PDF using Gemini AI with BERT LOTS/HOTS classification.
+    Generate quiz from an uploaded document using Gemini AI with BERT LOTS/HOTS classification.
+    
+    Accepts PDF, DOCX, PPTX, plain text, Markdown and HTML; the format is
+    recognised from the content, not the file name.
+    
+    With long_document=true the whole document is read and split into
+    chunks that are generated concurrently, so the quiz covers the full
+    text instead of only the first few pages.
+    
+    With target_hots_percentage set, questions of the overrepresented
+    category are replaced through small follow-up requests steered by the
+    Bloom's taxonomy verbs, until the HOTS share is within
+    HOTS_TARGET_TOLERANCE or HOTS_TARGET_MAX_CALLS is spent; the quiz's
+    hots_target reports the outcome.
     """
-    file_path = None
     try:
-        # Validate file type
-        if not file.filename.endswith('.pdf'):
-            raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-        
-        print(f"📄 Processing file: {file.filename}")
-        
-        # Save uploaded file
-        file_path = os.path.join(settings.UPLOAD_DIR, file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        logger.info("📄 Processing file: %s", file.filename)
         
-        # Extract text from PDF
-        print("📖 Extracting text from PDF...")
-        extracted_text = extract_text_from_pdf(file_path)
+        # Read straight from the spooled upload (memory, or an anonymous
+        # tempfile for large files) with a streaming size check
+        data = await read_upload(file)
         
-        if not extracted_text:
-            raise HTTPException(status_code=400, detail="Failed to extract text from PDF")
-        
-        print(f"✓ Extracted {len(extracted_text)} characters")
+        # Validate file type
+        document_format = _upload_format(file, data)
         
-        # Generate quiz using Gemini
-        print(f"🤖 Generating quiz (MC: {num_multiple_choice}, TF: {num_true_false}, ID: {num_identification})...")
-        quiz_data = generate_quiz_from_text(
-            extracted_text,
-            num_multiple_choice,
-            num_true_false,
-            num_identification
-        )
+        try:
+            formatted_quiz = await run_quiz_pipeline(
+                data,
+                title=title,
+                num_multiple_choice=num_multiple_choice,
+                num_true_false=num_true_false,
+                num_identification=num_identification,
+                long_document=long_document,
+                target_hots_percentage=target_hots_percentage,
+                document_format=document_format
+            )
+        except QuizPipelineError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
         
-        # Format for frontend
-        formatted_quiz = format_quiz_for_frontend(quiz_data, title)
+        return JSONResponse(content={
+            "success": True,
+            "quiz": formatted_quiz,
+            "message": "Quiz generated successfully with BERT classification"
+        })
         
-        # ⭐ NEW: Classify questions using BERT ⭐
-        print("🧠 Classifying questions with BERT (LOTS/HOTS)...")
-        questions = formatted_quiz.get('questions', [])
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.exception("❌ Error generating quiz: %s", e)
         
-        if questions:
-            # Extract question texts
-            question_texts = [q['question'] for q in questions]
-            
-            # Batch classify all questions (efficient)
-            classifications = classify_multiple_questions(question_texts)
-            
-            # Add classification to each question
-            for i, question in enumerate(questions):
-                classification, confidence = classifications[i]
-                question['bloom_classification'] = classification
-                question['classification_confidence'] = round(confidence, 4)
-            
-            # Calculate statistics
-            lots_count = sum(1 for q in questions if q.get('bloom_classification') == 'LOTS')
-            hots_count = sum(1 for q in questions if q.get('bloom_classification') == 'HOTS')
-            total = len(questions)
-            
-            formatted_quiz['classification_stats'] = {
-                'total_questions': total,
-                'lots_count': lots_count,
-                'hots_count': hots_count,
-                'lots_percentage': round((lots_count / total) * 100, 2) if total > 0 else 0,
-                'hots_percentage': round((hots_count / total) * 100, 2) if total > 0 else 0,
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "message": str(e)
             }
+        )
+
+
+def _sse(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/generate-from-pdf/stream")
+async def generate_quiz_from_pdf_stream(
+    file: UploadFile = File(...),
+    title: str = Form("Generated Quiz"),
+    num_multiple_choice: int = Form(5),
+    num_true_false: int = Form(5),
+    num_identification: int = Form(5)
+):
+    """
+    Stream quiz questions over server-sent events as Gemini produces them.
+    
+    Emits a "question" event per formatted, BERT-classified question, then a
+    "done" event with total_points and classification_stats (or "error").
+    """
+    data = await read_upload(file)
+    document_format = _upload_format(file, data)
+    
+    # Extract before the stream starts so input errors still get a 4xx status
+    try:
+        extracted_text = await extract_quiz_text(data, document_format=document_format)
+    except QuizPipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    async def events():
+        questions = []
+        try:
+            async for question in stream_quiz_questions(
+                extracted_text, num_multiple_choice, num_true_false, num_identification
+            ):
+                questions.append(question)
+                yield _sse("question", question)
             
-            print(f"✓ Classification complete: {lots_count} LOTS, {hots_count} HOTS")
+            await save_to_bank(await asyncio.to_thread(document_hash, data), questions)
+            yield _sse("done", {
+                "title": title,
+                "total_points": sum(q["points"] for q in questions),
+                "classification_stats": build_classification_stats(questions)
+            })
+        except Exception as e:
+            logger.exception("❌ Error streaming quiz: %s", e)
+            yield _sse("error", {"success": False, "message": str(e)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/assemble")
+async def assemble_quiz_from_bank(
+    file: Optional[UploadFile] = File(None),
+    source_hash: str = Form(""),
+    title: str = Form("Generated Quiz"),
+    num_multiple_choice: int = Form(5),
+    num_true_false: int = Form(5),
+    num_identification: int = Form(5),
+    hots_percentage: Optional[float] = Form(None)
+):
+    """
+    Assemble a quiz from the question bank, calling Gemini only for the shortfall.
+    
+    Every classified question generated from a document is banked under the
+    document's hash. Send the document again (or just its source_hash) with
+    the type counts and an optional hots_percentage; stored questions are
+    picked least-served first, and only questions the bank lacks are
+    generated (which needs the document). The response reports how many
+    came from where.
+    """
+    try:
+        data = None
+        document_format = None
+        if file is not None:
+            data = await read_upload(file)
+            document_format = _upload_format(file, data)
+        
+        try:
+            quiz, bank = await assemble_quiz(
+                data,
+                source_hash=source_hash or None,
+                title=title,
+                num_multiple_choice=num_multiple_choice,
+                num_true_false=num_true_false,
+                num_identification=num_identification,
+                hots_percentage=hots_percentage,
+                document_format=document_format
+            )
+        except QuizPipelineError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
         
         return JSONResponse(content={
             "success": True,
-            "quiz": formatted_quiz,
-            "message": "Quiz generated successfully with BERT classification"
+            "quiz": quiz,
+            "bank": bank,
+            "message": f"{bank['from_bank']} questions from the bank, {bank['generated']} generated"
         })
         
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"❌ Error generating quiz: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error assembling quiz: %s", e)
         
         return JSONResponse(
             status_code=500,
@@ -111,14 +229,159 @@ async def generate_quiz_from_pdf(
                 "message": str(e)
             }
         )
-    finally:
-        # Clean up uploaded file
-        if file_path and os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                print(f"🗑️ Cleaned up: {file.filename}")
-            except:
-                pass
+
+
+@router.post("/generate-batch")
+async def generate_quiz_batch(
+    files: List[UploadFile] = File(...),
+    num_multiple_choice: int = Form(5),
+    num_true_false: int = Form(5),
+    num_identification: int = Form(5),
+    long_document: bool = Form(False)
+):
+    """
+    Generate one quiz per document for a whole unit in a single request.
+    
+    Accepts several documents (PDF, DOCX, PPTX, TXT, Markdown, HTML) and/or
+    ZIP archives of them. Documents are
+    extracted in parallel, Gemini calls share one concurrency limit and all
+    questions are classified in one BERT batch. Results stream back as
+    newline-delimited JSON: a "generated" event as each quiz comes back, a
+    "document" event per document (success with its quiz, or its own error)
+    and a final "done" event with totals.
+    """
+    uploads = []
+    total = 0
+    for file in files:
+        data = await read_upload(file, max_size=settings.BATCH_MAX_UPLOAD_SIZE)
+        total += len(data)
+        if total > settings.BATCH_MAX_UPLOAD_SIZE:
+            raise HTTPException(
+                status_code=413, detail=f"Batch too large (limit {settings.BATCH_MAX_UPLOAD_SIZE} bytes)"
+            )
+        uploads.append((file.filename or "upload", data))
+    
+    try:
+        documents = await asyncio.to_thread(collect_documents, uploads)
+    except QuizPipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    logger.info("📚 Batch of %d documents", len(documents))
+    
+    async def lines():
+        async for event in run_batch_pipeline(
+            documents, num_multiple_choice, num_true_false, num_identification, long_document
+        ):
+            yield json.dumps(event) + "\n"
+    
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/jobs", status_code=202)
+async def submit_quiz_job(
+    request: Request,
+    file: UploadFile = File(...),
+    title: str = Form("Generated Quiz"),
+    num_multiple_choice: int = Form(5),
+    num_true_false: int = Form(5),
+    num_identification: int = Form(5),
+    long_document: bool = Form(False),
+    target_hots_percentage: Optional[float] = Form(None)
+):
+    """
+    Queue quiz generation and return a job id immediately.
+    
+    Poll /jobs/{job_id} for the stage and fetch /jobs/{job_id}/result once
+    it is done. Returns 429 when the queue is full.
+    """
+    try:
+        validate_hots_percentage(target_hots_percentage)
+    except QuizPipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    data = await read_upload(file)
+    document_format = _upload_format(file, data)
+    
+    params = {
+        "title": title,
+        "num_multiple_choice": num_multiple_choice,
+        "num_true_false": num_true_false,
+        "num_identification": num_identification,
+        "long_document": long_document,
+        "target_hots_percentage": target_hots_percentage,
+        "document_format": document_format
+    }
+    
+    try:
+        job_id = await get_job_queue().submit(data, params)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    
+    logger.info("📥 Queued job %s for %s", job_id, file.filename)
+    
+    return JSONResponse(status_code=202, content={
+        "success": True,
+        "job_id": job_id,
+        "status_url": str(request.url_for("get_quiz_job_status", job_id=job_id)),
+        "result_url": str(request.url_for("get_quiz_job_result", job_id=job_id))
+    })
+
+
+@router.get("/jobs/{job_id}")
+async def get_quiz_job_status(job_id: str):
+    """
+    Get the status and current stage of a quiz generation job.
+    """
+    job = await get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return JSONResponse(content={
+        "success": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    })
+
+
+@router.get("/jobs/{job_id}/result")
+async def get_quiz_job_result(job_id: str):
+    """
+    Get the generated quiz for a finished job (202 while still running).
+    """
+    job = await get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job["status"] == STATUS_FAILED:
+        return JSONResponse(
+            status_code=job["status_code"] or 500,
+            content={
+                "success": False,
+                "message": job["error"]
+            }
+        )
+    
+    if job["status"] != STATUS_DONE:
+        return JSONResponse(status_code=202, content={
+            "success": False,
+            "status": job["status"],
+            "stage": job["stage"],
+            "message": "Job is not finished yet"
+        })
+    
+    return JSONResponse(content={
+        "success": True,
+        "quiz": job["result"],
+        "message": "Quiz generated successfully with BERT classification"
+    })
 
 
 @router.post("/reclassify-question")
@@ -132,8 +395,8 @@ async def reclassify_question(data: dict):
         if not question_text:
             raise HTTPException(status_code=400, detail="Question text is required")
         
-        # Get detailed classification
-        result = get_detailed_classification(question_text)
+        # Get detailed classification (batched with concurrent requests)
+        result = await get_classification_batcher().submit(question_text)
         
         return JSONResponse(content={
             "success": True,
@@ -152,19 +415,90 @@ async def reclassify_question(data: dict):
         )
 
 
+class ClassifyBatchRequest(BaseModel):
+    questions: List[str]
+
+
+@router.post("/classify-batch")
+async def classify_batch(data: ClassifyBatchRequest):
+    """
+    Classify many questions in one request using batched BERT inference.
+    """
+    try:
+        if len(data.questions) > settings.CLASSIFY_BATCH_MAX_QUESTIONS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"At most {settings.CLASSIFY_BATCH_MAX_QUESTIONS} questions per request"
+            )
+        
+        results = await get_classification_batcher().submit_many(data.questions)
+        
+        lots_count = sum(1 for r in results if r['classification'] == 'LOTS')
+        hots_count = len(results) - lots_count
+        
+        return JSONResponse(content={
+            "success": True,
+            "classifications": results,
+            "lots_count": lots_count,
+            "hots_count": hots_count
+        })
+        
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "message": str(e)
+            }
+        )
+
+
 @router.get("/classification-keywords")
 async def get_classification_keywords():
     """
-    Get LOTS/HOTS keyword lists for reference.
+    Get LOTS/HOTS keyword lists and the Bloom's taxonomy levels for reference.
+    """
+    from app.utils.blooms_taxonomy import get_all_keywords, get_taxonomy
+    
+    try:
+        taxonomy = get_taxonomy()
+        return JSONResponse(content={
+            "success": True,
+            "version": taxonomy["version"],
+            "keywords": get_all_keywords(),
+            "levels": taxonomy["levels"]
+        })
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "message": str(e)
+            }
+        )
+
+
+@router.post("/classification-keywords/reload")
+async def reload_classification_keywords():
+    """
+    Reload the Bloom's taxonomy file (BLOOMS_TAXONOMY_PATH).
+    
+    Only new or changed keywords are embedded; the new keyword index is
+    swapped in atomically, so in-flight classifications are not blocked.
+    Other workers follow the file within TAXONOMY_CHECK_INTERVAL seconds.
     """
-    from app.utils.blooms_taxonomy import get_all_keywords
+    from app.utils.blooms_taxonomy import TaxonomyError
     
     try:
-        keywords = get_all_keywords()
+        summary = await reload_classifier_taxonomy()
         return JSONResponse(content={
             "success": True,
-            "keywords": keywords
+            "taxonomy": summary
         })
+    except TaxonomyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         return JSONResponse(
             status_code=500,
@@ -175,11 +509,70 @@ async def get_classification_keywords():
         )
 
 
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """
+    Get hit/miss counters and size of the generated quiz cache.
+    """
+    return JSONResponse(content={
+        "success": True,
+        "cache": await asyncio.to_thread(get_quiz_cache().stats)
+    })
+
+
+@router.get("/classifier-stats")
+async def get_classifier_stats():
+    """
+    Get lexical short-circuit, BERT micro-batching and question embedding
+    cache statistics (from the classifier sidecar when BERT_SERVER_SOCKET is set).
+    """
+    try:
+        stats = await classifier_stats()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Classifier server unavailable: {e}")
+    return JSONResponse(content={"success": True, **stats})
+
+
+@router.get("/generation-stats")
+async def get_generation_stats_route():
+    """
+    Get JSON repair, top-up and near-duplicate counters for Gemini quiz
+    generation, and the size of the question dedup index and question bank.
+    """
+    bank = get_question_bank()
+    # Both stores read SQLite under a lock: keep that off the event loop
+    return JSONResponse(content={
+        "success": True,
+        "generation": get_generation_stats(),
+        "question_index": await asyncio.to_thread(get_question_index().stats),
+        "question_bank": await asyncio.to_thread(bank.stats) if bank is not None else None
+    })
+
+
 @router.get("/health")
 async def health_check():
-    """Health check endpoint."""
-    return {
-        "status": "healthy", 
+    """
+    Health check endpoint.
+    
+    Returns 503 until the BERT model is warm so the load balancer only
+    routes traffic to workers that can classify immediately. With
+    BERT_EAGER_LOAD=false nothing warms the model until a request arrives,
+    so a cold in-process model is healthy (200, "cold") rather than held
+    out of rotation forever.
+    """
+    classifier = await classifier_status()
+    lazy_load = not settings.BERT_EAGER_LOAD and not settings.BERT_SERVER_SOCKET
+    ready = classifier["state"] == "warm" or (lazy_load and classifier["state"] == "cold")
+    
+    content = {
+        "status": "healthy" if ready else "warming",
         "service": "quiz-generator",
-        "bert_classifier": "enabled"
-    }
\ No newline at end of file
+        "bert_classifier": classifier["state"],
+        "bert_model": classifier["model"]
+    }
+    if "error" in classifier:
+        content["bert_error"] = classifier["error"]
+    
+    content["gemini"] = get_gemini_client().stats()
+    
+    return JSONResponse(status_code=200 if ready else 503, content=content)
\ No newline at end of file
@@ -0,0 +1,249 @@
+# app/services/batch_pipeline.py
+
+"""
+Batch quiz generation for a whole unit of documents
+Documents (uploaded files, or files inside ZIP archives) are extracted in
+parallel, Gemini calls run under one concurrency limit, and every question
+of the batch is classified in a single BERT batch. A failing document only
+produces an error for itself.
+"""
+
+import asyncio
+import io
+import logging
+import os
+import time
+import zipfile
+
+from app.config.settings import settings
+from app.services.gemini_service import generate_quiz_from_text_async, format_quiz_for_frontend
+from app.services.long_document import generate_quiz_from_long_text
+from app.services.quiz_pipeline import (
+    extract_quiz_text,
+    classify_quizzes,
+    build_classification_stats,
+    save_to_bank,
+    QuizPipelineError,
+)
+from app.services.question_bank import document_hash
+from app.utils.document_extractors import detect_format, supported_formats, UNSUPPORTED_MESSAGE
+
+logger = logging.getLogger(__name__)
+
+
+class BatchTooLargeError(QuizPipelineError):
+    """The batch holds too many documents or too much data (413)"""
+
+    def __init__(self, message):
+        super().__init__(message, status_code=413)
+
+
+def _document(name, data=None, document_format=None, error=None, status_code=400):
+    if error is not None:
+        return {"name": name, "data": None, "format": None, "error": error, "status_code": status_code}
+    return {"name": name, "data": data, "format": document_format, "error": None, "status_code": None}
+
+
+def expand_zip(name, data):
+    """
+    List the documents inside a ZIP archive
+
+    Member sizes are checked against MAX_FILE_SIZE while decompressing (the
+    sizes in the archive header are not trusted), and the archive as a whole
+    against BATCH_MAX_UPLOAD_SIZE, so a zip bomb can't exhaust memory.
+
+    Args:
+        name (str): Archive file name (prefixed to member names)
+        data (bytes): The archive
+
+    Returns:
+        list: Documents, one per member (unsupported members become errors)
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile as e:
+        return [_document(name, error=f"Invalid ZIP archive: {e}")]
+
+    documents = []
+    total = 0
+    with archive:
+        for member in archive.infolist():
+            base = os.path.basename(member.filename)
+            if member.is_dir() or not base or base.startswith(".") or member.filename.startswith("__MACOSX/"):
+                continue
+            member_name = f"{name}/{member.filename}"
+
+            with archive.open(member) as f:
+                content = f.read(settings.MAX_FILE_SIZE + 1)
+            if len(content) > settings.MAX_FILE_SIZE:
+                documents.append(_document(
+                    member_name, error=f"File too large (limit {settings.MAX_FILE_SIZE} bytes)", status_code=413
+                ))
+                continue
+            total += len(content)
+            if total > settings.BATCH_MAX_UPLOAD_SIZE:
+                raise BatchTooLargeError(
+                    f"{name}: uncompressed documents exceed {settings.BATCH_MAX_UPLOAD_SIZE} bytes"
+                )
+            # Sniffed from the content: member names are as untrusted as upload names
+            document_format = detect_format(content, base)
+            if document_format not in supported_formats():
+                documents.append(_document(member_name, error=UNSUPPORTED_MESSAGE))
+                continue
+            documents.append(_document(member_name, content, document_format))
+    return documents
+
+
+def collect_documents(uploads):
+    """
+    Turn uploaded files into the batch's documents
+
+    Args:
+        uploads (list): (file name, bytes) pairs; ZIP archives are expanded
+
+    Returns:
+        list: Documents {"name", "data", "format", "error", "status_code"}
+
+    Raises:
+        BatchTooLargeError: If there are more than BATCH_MAX_FILES documents
+    """
+    documents = []
+    for name, data in uploads:
+        document_format = detect_format(data, name)
+        if document_format == "zip":
+            documents.extend(expand_zip(name, data))
+        elif document_format not in supported_formats():
+            documents.append(_document(name, error="Unsupported file type (upload PDF, DOCX, PPTX, TXT, Markdown, HTML or ZIP files)"))
+        elif len(data) > settings.MAX_FILE_SIZE:
+            documents.append(_document(
+                name, error=f"File too large (limit {settings.MAX_FILE_SIZE} bytes)", status_code=413
+            ))
+        else:
+            documents.append(_document(name, data, document_format))
+
+        if len(documents) > settings.BATCH_MAX_FILES:
+            raise BatchTooLargeError(f"At most {settings.BATCH_MAX_FILES} documents per batch")
+
+    if not documents:
+        raise QuizPipelineError("No documents in the batch")
+    return documents
+
+
+def _document_title(name):
+    return os.path.splitext(os.path.basename(name))[0] or "Generated Quiz"
+
+
+async def run_batch_pipeline(
+    documents,
+    num_multiple_choice=5,
+    num_true_false=5,
+    num_identification=5,
+    long_document=False
+):
+    """
+    Generate one classified quiz per document, yielding events as they happen
+
+    Yields:
+        dict: {"event": "generated", "index", "name", "question_count"} as
+            each quiz comes back from Gemini; {"event": "document", "index",
+            "name", "success", "quiz" | "message"/"status_code"} per
+            document (failures as soon as they happen, quizzes after the
+            shared classification batch); finally {"event": "done", ...}
+    """
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+    generate = generate_quiz_from_long_text if long_document else generate_quiz_from_text_async
+
+    async def build_quiz(document):
+        # Extraction runs in the document process pool for all documents at
+        # once (one worker per non-PDF document); only Gemini calls are limited
+        extracted_text = await extract_quiz_text(document["data"], long_document, document["format"])
+        async with semaphore:
+            quiz_data = await generate(extracted_text, num_multiple_choice, num_true_false, num_identification)
+        return format_quiz_for_frontend(quiz_data, _document_title(document["name"]))
+
+    async def run_document(index, document):
+        try:
+            return index, await build_quiz(document), None
+        except Exception as e:
+            return index, None, e
+
+    def failure(index, message, status_code):
+        return {
+            "event": "document",
+            "index": index,
+            "name": documents[index]["name"],
+            "success": False,
+            "status_code": status_code,
+            "message": message,
+        }
+
+    tasks = [
+        asyncio.ensure_future(run_document(index, document))
+        for index, document in enumerate(documents) if document["error"] is None
+    ]
+    failed = 0
+    quizzes = {}
+    try:
+        for index, document in enumerate(documents):
+            if document["error"] is not None:
+                failed += 1
+                yield failure(index, document["error"], document["status_code"])
+
+        for next_done in asyncio.as_completed(tasks):
+            index, quiz, error = await next_done
+            if error is None:
+                quizzes[index] = quiz
+                yield {
+                    "event": "generated",
+                    "index": index,
+                    "name": documents[index]["name"],
+                    "question_count": len(quiz["questions"]),
+                }
+                continue
+
+            failed += 1
+            if isinstance(error, QuizPipelineError):
+                yield failure(index, str(error), error.status_code)
+            else:
+                logger.error("❌ Batch document %s failed: %s", documents[index]["name"], error)
+                yield failure(index, str(error), 500)
+    finally:
+        # Client went away: don't keep generating for nobody
+        for task in tasks:
+            task.cancel()
+
+    if quizzes:
+        order = sorted(quizzes)
+        try:
+            await classify_quizzes([quizzes[index] for index in order])
+        except Exception as e:
+            logger.error("❌ Batch classification failed: %s", e)
+            for index in order:
+                yield failure(index, f"Classification failed: {e}", 503)
+            failed += len(order)
+            quizzes = {}
+        else:
+            hashes = await asyncio.to_thread(lambda: [document_hash(documents[index]["data"]) for index in order])
+            await asyncio.gather(*(
+                save_to_bank(source_hash, quizzes[index]["questions"])
+                for source_hash, index in zip(hashes, order)
+            ))
+            for index in order:
+                yield {
+                    "event": "document",
+                    "index": index,
+                    "name": documents[index]["name"],
+                    "success": True,
+                    "quiz": quizzes[index],
+                }
+
+    all_questions = [q for quiz in quizzes.values() for q in quiz["questions"]]
+    yield {
+        "event": "done",
+        "documents": len(documents),
+        "succeeded": len(quizzes),
+        "failed": failed,
+        "classification_stats": build_classification_stats(all_questions),
+        "elapsed_seconds": round(time.perf_counter() - start, 3),
+    }
@@ -3,34 +3,350 @@
 """
 BERT-based LOTS/HOTS Classification Service
 Uses sentence embeddings and cosine similarity
+
+The model and keyword embeddings are loaded lazily (or warmed up from the
+FastAPI lifespan hook), so importing this module is cheap.
 """
 
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
+import hashlib
+import json
+import logging
 import sys
 import os
+import threading
+
+# Add backend directory to path so the module can also be run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from app.config.settings import settings
+from app.utils.blooms_taxonomy import get_taxonomy, load_taxonomy, set_taxonomy
+from app.services.embedding_cache import get_embedding_cache, make_embedding_key
+from app.services.inference_backends import create_backend
+
+logger = logging.getLogger(__name__)
+
+# Populated by load_classifier()
+model = None
+keyword_index = None  # current KeywordIndex; replaced, never mutated, on reload
+
+_load_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_load_error = None
+
+
+class KeywordIndex:
+    """
+    Immutable snapshot of the taxonomy's keyword embeddings and centroids
+    
+    A reload builds a new index and swaps the module-level reference, so a
+    classification that already picked up an index finishes against a
+    consistent snapshot and never waits for the reload.
+    """
+    
+    def __init__(self, taxonomy, embeddings):
+        """
+        Args:
+            taxonomy (dict): Taxonomy from blooms_taxonomy.load_taxonomy
+            embeddings (np.ndarray): One row per keyword, in taxonomy level order
+        """
+        self.taxonomy = taxonomy
+        self.version = taxonomy["version"]
+        self.levels = taxonomy["levels"]
+        self.level_names = [level["name"] for level in self.levels]
+        self.keywords = [k for level in self.levels for k in level["keywords"]]
+        self.embeddings = np.asarray(embeddings, dtype=np.float32)
+        
+        level_rows = []
+        start = 0
+        for level in self.levels:
+            level_rows.append(self.embeddings[start:start + len(level["keywords"])])
+            start += len(level["keywords"])
+        
+        def category_rows(category):
+            return np.concatenate([
+                rows for level, rows in zip(self.levels, level_rows) if level["category"] == category
+            ])
+        
+        self.centroid_matrix = build_centroid_matrix(category_rows("LOTS"), category_rows("HOTS"))
+        # dim x levels, same mean-cosine construction as the LOTS/HOTS columns
+        self.level_centroids = np.stack(
+            [_l2_normalize(rows).mean(axis=0) for rows in level_rows], axis=1
+        ).astype(np.float32)
+        # LOTS, HOTS, then one column per level: a single matmul scores all
+        self.score_matrix = np.hstack([self.centroid_matrix, self.level_centroids])
+    
+    def vectors_by_keyword(self):
+        return dict(zip(self.keywords, self.embeddings))
+    
+    def summary(self):
+        return {
+            "version": self.version,
+            "keywords": len(self.keywords),
+            "levels": [
+                {"name": level["name"], "category": level["category"], "keywords": len(level["keywords"])}
+                for level in self.levels
+            ],
+        }
+
+
+def embedding_model_key():
+    """Model + inference backend; embeddings differ slightly between backends"""
+    return f"{settings.BERT_MODEL_NAME}:{settings.BERT_BACKEND.lower()}"
+
+
+def _keyword_cache_path(keywords):
+    """Path of the .npy keyword embedding cache for the current model, backend + keyword list"""
+    digest = hashlib.sha256(json.dumps(keywords).encode("utf-8")).hexdigest()[:16]
+    model_slug = embedding_model_key().replace("/", "_").replace(":", "-")
+    return os.path.join(settings.EMBEDDING_CACHE_DIR, f"{model_slug}-{digest}.npy")
+
+
+def _build_keyword_index(bert_model, taxonomy, previous=None):
+    """
+    Embed a taxonomy's keywords, encoding as few as possible
+    
+    Uses the .npy cache for exactly this keyword list if present; otherwise
+    reuses vectors of keywords already in the previous index and encodes
+    only new or changed ones.
+    
+    Returns:
+        tuple: (KeywordIndex, number of keywords encoded)
+    """
+    keywords = [k for level in taxonomy["levels"] for k in level["keywords"]]
+    cache_path = _keyword_cache_path(keywords)
+    
+    if os.path.exists(cache_path):
+        try:
+            embeddings = np.load(cache_path)
+            if embeddings.shape[0] == len(keywords):
+                logger.info("Loaded keyword embeddings from cache: %s", cache_path)
+                return KeywordIndex(taxonomy, embeddings), 0
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable keyword embedding cache: %s", e)
+    
+    known = previous.vectors_by_keyword() if previous is not None else {}
+    new_keywords = list(dict.fromkeys(k for k in keywords if k not in known))
+    if new_keywords:
+        logger.info("Generating embeddings for %d keywords...", len(new_keywords))
+        known.update(zip(new_keywords, bert_model.encode(new_keywords)))
+    embeddings = np.stack([known[k] for k in keywords]).astype(np.float32)
+    
+    try:
+        os.makedirs(settings.EMBEDDING_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, embeddings)
+        # Atomic rename so concurrent workers never read a partial file
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning("Could not write keyword embedding cache: %s", e)
+    
+    return KeywordIndex(taxonomy, embeddings), len(new_keywords)
 
-# Add parent directory to path to import utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.blooms_taxonomy import get_lots_keywords, get_hots_keywords
 
-# Load pre-trained BERT model (lightweight and fast)
-print("Loading BERT model...")
-model = SentenceTransformer('all-MiniLM-L6-v2')
-print("BERT model loaded successfully!")
+def load_classifier():
+    """
+    Load the BERT model and keyword embeddings (idempotent, thread-safe)
+    
+    Called from the FastAPI lifespan hook to warm up in the background,
+    and on first use otherwise.
+    """
+    global model, keyword_index, _load_error
+    
+    if keyword_index is not None:
+        return
+    
+    with _load_lock:
+        if keyword_index is not None:
+            return
+        try:
+            # Load pre-trained BERT model (lightweight and fast) on the
+            # configured backend (torch / onnx / int8)
+            logger.info("Loading BERT model (%s backend)...", settings.BERT_BACKEND)
+            bert_model = create_backend(settings.BERT_BACKEND, settings.BERT_MODEL_NAME)
+            logger.info("BERT model loaded successfully!")
+            
+            index, _ = _build_keyword_index(bert_model, get_taxonomy())
+            
+            model = bert_model
+            _load_error = None
+            # Assigned last: a non-None keyword index means "ready"
+            keyword_index = index
+            logger.info("✓ BERT classification ready!")
+        except Exception as e:
+            _load_error = str(e)
+            raise
 
-# Generate reference embeddings at startup (do this once)
-LOTS_KEYWORDS = get_lots_keywords()
-HOTS_KEYWORDS = get_hots_keywords()
 
-print(f"Generating embeddings for {len(LOTS_KEYWORDS)} LOTS keywords...")
-lots_embeddings = model.encode(LOTS_KEYWORDS)
+def reload_keyword_index():
+    """
+    Re-read the taxonomy file and swap in a new keyword index
+    
+    Only new or changed keywords are encoded. In-flight classifications keep
+    using the old index; the previous taxonomy stays active if the file is
+    invalid.
+    
+    Returns:
+        dict: Summary of the new index plus "encoded_keywords"
+        
+    Raises:
+        TaxonomyError: If the taxonomy file is missing or malformed
+    """
+    global keyword_index
+    load_classifier()
+    
+    with _reload_lock:
+        taxonomy = load_taxonomy()
+        index, encoded = _build_keyword_index(model, taxonomy, previous=keyword_index)
+        keyword_index = index
+        set_taxonomy(taxonomy)
+    
+    logger.info("✓ Reloaded Bloom's taxonomy v%s (%d keywords encoded)", index.version, encoded)
+    summary = index.summary()
+    summary["encoded_keywords"] = encoded
+    return summary
 
-print(f"Generating embeddings for {len(HOTS_KEYWORDS)} HOTS keywords...")
-hots_embeddings = model.encode(HOTS_KEYWORDS)
 
-print("✓ BERT classification ready!")
+def _current_keyword_index():
+    """
+    The keyword index for the current taxonomy
+    
+    Rebuilt (new keywords encoded) when get_taxonomy() has picked up a
+    changed taxonomy file, e.g. after a reload through another worker.
+    """
+    global keyword_index
+    index = keyword_index
+    taxonomy = get_taxonomy()
+    if index.taxonomy is taxonomy:
+        return index
+    with _reload_lock:
+        # A reload may have finished while this thread waited
+        taxonomy = get_taxonomy()
+        if keyword_index.taxonomy is not taxonomy:
+            keyword_index, encoded = _build_keyword_index(model, taxonomy, previous=keyword_index)
+            logger.info("✓ Following Bloom's taxonomy v%s (%d keywords encoded)", taxonomy["version"], encoded)
+        return keyword_index
+
+
+def get_classifier_status():
+    """
+    Report whether the classifier is loaded
+    
+    Returns:
+        dict: {"state": "warm" | "cold" | "error", "model": ..., "error": ...}
+    """
+    index = keyword_index
+    if index is not None:
+        state = "warm"
+    elif _load_error is not None:
+        state = "error"
+    else:
+        state = "cold"
+    
+    status = {"state": state, "model": settings.BERT_MODEL_NAME, "backend": settings.BERT_BACKEND}
+    if index is not None:
+        status["taxonomy_version"] = index.version
+    if _load_error is not None:
+        status["error"] = _load_error
+    return status
+
+
+def build_centroid_matrix(lots_embeddings, hots_embeddings):
+    """
+    Build the (dim x 2) keyword-centroid matrix used for scoring
+    
+    The mean cosine similarity against a keyword set equals the dot product of
+    the L2-normalized question with the mean of the L2-normalized keyword
+    embeddings, so one matmul against these two columns reproduces the
+    per-keyword average (up to float32 rounding). The centroids themselves are deliberately
+    not re-normalized, otherwise the scores would change.
+    
+    Args:
+        lots_embeddings (np.ndarray): LOTS keyword embeddings (K1 x dim)
+        hots_embeddings (np.ndarray): HOTS keyword embeddings (K2 x dim)
+        
+    Returns:
+        np.ndarray: float32 matrix, column 0 = LOTS, column 1 = HOTS
+    """
+    centroids = [
+        _l2_normalize(embeddings).mean(axis=0)
+        for embeddings in (lots_embeddings, hots_embeddings)
+    ]
+    return np.stack(centroids, axis=1).astype(np.float32)
+
+
+def _l2_normalize(embeddings):
+    """Row-wise L2 normalization (zero rows stay zero, like sklearn)"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+
+def score_embeddings(question_embeddings, centroid_matrix):
+    """
+    Score a batch of question embeddings against the keyword centroids
+    
+    Args:
+        question_embeddings (np.ndarray): N x dim question embeddings
+        centroid_matrix (np.ndarray): dim x 2 matrix from build_centroid_matrix
+            (or a KeywordIndex.score_matrix, which adds per-level columns)
+        
+    Returns:
+        np.ndarray: N x columns float32 array, starting with (lots_score, hots_score)
+    """
+    return _l2_normalize(question_embeddings) @ centroid_matrix
+
+
+def encode_questions(questions_list):
+    """
+    Embed a batch of questions, running the model only for cache misses
+
+    Args:
+        questions_list (list): Question texts
+
+    Returns:
+        np.ndarray: N x dim float32 embeddings
+    """
+    load_classifier()
+    cache = get_embedding_cache()
+    model_key = embedding_model_key()
+    keys = [make_embedding_key(q, model_key) for q in questions_list]
+    cached = cache.get_many(keys)
+
+    missing = [i for i, vector in enumerate(cached) if vector is None]
+    if missing:
+        # Encode each distinct missing text once
+        unique = {}
+        for i in missing:
+            unique.setdefault(keys[i], questions_list[i])
+        fresh = model.encode(list(unique.values()))
+        cache.put_many(list(unique.keys()), fresh)
+        by_key = dict(zip(unique.keys(), fresh))
+        for i in missing:
+            cached[i] = by_key[keys[i]]
+
+    return np.asarray(cached, dtype=np.float32)
+
+
+def _score_questions(questions_list):
+    """
+    Encode a batch of questions and score them
+    
+    Returns:
+        tuple: (N x (2 + levels) scores, the KeywordIndex they were scored against)
+    """
+    question_embeddings = encode_questions(questions_list)
+    # One snapshot for the whole batch, even if a reload swaps it meanwhile
+    index = _current_keyword_index()
+    return score_embeddings(question_embeddings, index.score_matrix), index
+
+
+def _decide(lots_score, hots_score):
+    """Pick the higher-scoring category (ties go to LOTS)"""
+    if hots_score > lots_score:
+        return "HOTS", float(hots_score)
+    return "LOTS", float(lots_score)
 
 
 def classify_question(question_text):
@@ -49,26 +365,9 @@ def classify_question(question_text):
     if not question_text or not question_text.strip():
         return "LOTS", 0.5  # Default for empty questions
     
-    # Generate embedding for the question
-    question_embedding = model.encode([question_text])[0]
-    
-    # Compute average similarity with LOTS keywords
-    lots_similarities = cosine_similarity([question_embedding], lots_embeddings)
-    lots_score = np.mean(lots_similarities)
-    
-    # Compute average similarity with HOTS keywords
-    hots_similarities = cosine_similarity([question_embedding], hots_embeddings)
-    hots_score = np.mean(hots_similarities)
-    
-    # Determine classification based on higher score
-    if hots_score > lots_score:
-        classification = "HOTS"
-        confidence = float(hots_score)
-    else:
-        classification = "LOTS"
-        confidence = float(lots_score)
-    
-    return classification, confidence
+    scores, _ = _score_questions([question_text])
+    lots_score, hots_score = scores[0, :2]
+    return _decide(lots_score, hots_score)
 
 
 def classify_multiple_questions(questions_list):
@@ -85,27 +384,56 @@ def classify_multiple_questions(questions_list):
     if not questions_list:
         return []
     
-    # Generate embeddings for all questions at once
-    question_embeddings = model.encode(questions_list)
+    # One encode + one (N x dim) . (dim x 2) matmul for the whole batch
+    scores, _ = _score_questions(questions_list)
+    return [_decide(lots_score, hots_score) for lots_score, hots_score in scores[:, :2]]
+
+
+def get_detailed_classifications(questions_list):
+    """
+    Get detailed classification for a batch of questions (one encode call)
     
-    results = []
-    for question_embedding in question_embeddings:
-        # Compute similarities
-        lots_similarities = cosine_similarity([question_embedding], lots_embeddings)
-        lots_score = np.mean(lots_similarities)
-        
-        hots_similarities = cosine_similarity([question_embedding], hots_embeddings)
-        hots_score = np.mean(hots_similarities)
+    Args:
+        questions_list (list): List of question strings
         
-        # Determine classification
-        if hots_score > lots_score:
-            classification = "HOTS"
-            confidence = float(hots_score)
+    Returns:
+        list: One detailed classification dict per question
+    """
+    
+    results = [None] * len(questions_list)
+    indexes = []
+    texts = []
+    for i, question_text in enumerate(questions_list):
+        if not question_text or not question_text.strip():
+            # Default for empty questions
+            results[i] = {
+                "classification": "LOTS",
+                "confidence": 0.5,
+                "lots_score": 0.5,
+                "hots_score": 0.5,
+                "difference": 0.0,
+                "bloom_level": None,
+                "method": "default"
+            }
         else:
-            classification = "LOTS"
-            confidence = float(lots_score)
-        
-        results.append((classification, confidence))
+            indexes.append(i)
+            texts.append(question_text)
+    
+    if texts:
+        scores, index = _score_questions(texts)
+        for i, row in zip(indexes, scores):
+            lots_score, hots_score = float(row[0]), float(row[1])
+            classification, confidence = _decide(lots_score, hots_score)
+            results[i] = {
+                "classification": classification,
+                "confidence": confidence,
+                "lots_score": lots_score,
+                "hots_score": hots_score,
+                "difference": abs(hots_score - lots_score),
+                # Per-level scores come from the same matmul
+                "bloom_level": index.level_names[int(np.argmax(row[2:]))],
+                "method": "bert"
+            }
     
     return results
 
@@ -121,40 +449,7 @@ def get_detailed_classification(question_text):
         dict: Detailed classification info
     """
     
-    if not question_text or not question_text.strip():
-        return {
-            "classification": "LOTS",
-            "confidence": 0.5,
-            "lots_score": 0.5,
-            "hots_score": 0.5,
-            "difference": 0.0
-        }
-    
-    # Generate embedding
-    question_embedding = model.encode([question_text])[0]
-    
-    # Compute scores
-    lots_similarities = cosine_similarity([question_embedding], lots_embeddings)
-    lots_score = float(np.mean(lots_similarities))
-    
-    hots_similarities = cosine_similarity([question_embedding], hots_embeddings)
-    hots_score = float(np.mean(hots_similarities))
-    
-    # Determine classification
-    if hots_score > lots_score:
-        classification = "HOTS"
-        confidence = hots_score
-    else:
-        classification = "LOTS"
-        confidence = lots_score
-    
-    return {
-        "classification": classification,
-        "confidence": confidence,
-        "lots_score": lots_score,
-        "hots_score": hots_score,
-        "difference": abs(hots_score - lots_score)
-    }
+    return get_detailed_classifications([question_text])[0]
 
 
 # Test the classifier when module is run directly
@@ -179,4 +474,5 @@ if __name__ == "__main__":
         print(f"   Confidence: {result['confidence']:.4f}")
         print(f"   LOTS Score: {result['lots_score']:.4f}")
         print(f"   HOTS Score: {result['hots_score']:.4f}")
-        print(f"   Difference: {result['difference']:.4f}")
\ No newline at end of file
+        print(f"   Difference: {result['difference']:.4f}")
+        print(f"   Bloom Level: {result['bloom_level']}")
\ No newline at end of file
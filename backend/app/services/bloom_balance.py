@@ -0,0 +1,162 @@
+# app/services/bloom_balance.py
+
+"""
+Steer a classified quiz towards a target LOTS/HOTS mix
+Instead of regenerating the whole quiz, questions of the overrepresented
+category are swapped for new ones from small Gemini calls that ask only for
+the underrepresented category (prompts steered by the taxonomy's verbs).
+Each candidate is classified before it is accepted. Follow-ups for a long
+document take turns over excerpts spread across it.
+"""
+
+import logging
+import math
+
+from app.config.settings import settings
+from app.services.gemini_service import generate_steered_questions, format_question
+from app.services.micro_batcher import classify_questions, embed_questions, annotate_question
+from app.services.question_index import find_duplicates
+from app.utils import metrics
+from app.utils.metrics import stage, STAGE_CLASSIFY
+
+logger = logging.getLogger(__name__)
+
+QUESTION_TYPES = ["multiple_choice", "true_false", "identification"]
+
+
+def hots_count(questions):
+    return sum(1 for q in questions if q.get('bloom_classification') == 'HOTS')
+
+
+def on_target(questions, target, tolerance=None):
+    """Within tolerance of the target HOTS share, or as close as this many questions allow"""
+    tolerance = settings.HOTS_TARGET_TOLERANCE if tolerance is None else tolerance
+    total = len(questions)
+    hots = hots_count(questions)
+    return abs(hots / total * 100 - target) <= tolerance or hots == round(total * target / 100)
+
+
+def _pick_slots(questions, category, need):
+    """Positions of `need` questions of category to replace, spread across types"""
+    by_type = {
+        qtype: [i for i, q in enumerate(questions)
+                if q['type'] == qtype and q.get('bloom_classification') == category]
+        for qtype in QUESTION_TYPES
+    }
+    slots = []
+    while len(slots) < need and any(by_type.values()):
+        for qtype in QUESTION_TYPES:
+            if by_type[qtype] and len(slots) < need:
+                slots.append(by_type[qtype].pop())
+    return slots
+
+
+async def _classify(questions):
+    with stage(STAGE_CLASSIFY):
+        results = await classify_questions(questions)
+    for question, result in zip(questions, results):
+        annotate_question(question, result)
+
+
+async def _repeats(kept, candidates):
+    """Rows of candidates that nearly repeat a kept question or an earlier candidate"""
+    if settings.QUESTION_DEDUP.lower() == "off":
+        return set()
+    try:
+        vectors = await embed_questions([q['question'] for q in kept + candidates])
+    except Exception as e:
+        logger.warning("Near-duplicate check skipped: %s", e)
+        return set()
+    offset = len(kept)
+    return {
+        row - offset for row in find_duplicates(vectors, settings.QUESTION_DEDUP_THRESHOLD)
+        if row >= offset
+    }
+
+
+async def balance_questions(questions, excerpts, target_hots_percentage, tolerance=None, max_calls=None):
+    """
+    Swap questions until the HOTS share is within tolerance of the target
+
+    Args:
+        questions (list): Formatted, classified questions (not modified)
+        excerpts (list): Source texts for the follow-up prompts; call k uses
+            the excerpt k/max_calls of the way through the list
+        target_hots_percentage (float): Wanted HOTS share, 0-100
+        tolerance (float): Accepted distance in percentage points
+            (defaults to HOTS_TARGET_TOLERANCE)
+        max_calls (int): Follow-up Gemini call budget (defaults to HOTS_TARGET_MAX_CALLS)
+
+    Returns:
+        tuple: (balanced questions, every new classified question generated
+            on the way, report {"target_hots_percentage", "hots_percentage",
+            "met", "follow_up_calls", "replaced"})
+    """
+    tolerance = settings.HOTS_TARGET_TOLERANCE if tolerance is None else tolerance
+    max_calls = settings.HOTS_TARGET_MAX_CALLS if max_calls is None else max_calls
+    questions = list(questions)
+    generated = []
+    rejected = []
+    calls = replaced = 0
+
+    while questions and not on_target(questions, target_hots_percentage, tolerance) and calls < max_calls:
+        wanted = round(len(questions) * target_hots_percentage / 100)
+        hots = hots_count(questions)
+        under, over = ("HOTS", "LOTS") if hots < wanted else ("LOTS", "HOTS")
+        slots = _pick_slots(questions, over, abs(wanted - hots))
+        if not slots:
+            break
+
+        # Ask for half again as many as needed: not every candidate will
+        # classify into the category asked for
+        missing = {qtype: sum(1 for i in slots if questions[i]['type'] == qtype) for qtype in QUESTION_TYPES}
+        request = {qtype: count + math.ceil(count / 2) for qtype, count in missing.items()}
+        avoid = [q['question'] for q in questions] + rejected
+
+        excerpt = excerpts[calls * len(excerpts) // max_calls % len(excerpts)]
+        calls += 1
+        try:
+            extra = await generate_steered_questions(excerpt, request, under, avoid)
+        except Exception as e:
+            logger.warning("Steered follow-up failed, keeping current mix: %s", e)
+            break
+
+        candidates = []
+        for qtype in QUESTION_TYPES:
+            for item in extra.get(qtype, []):
+                try:
+                    candidates.append(format_question(qtype, item))
+                except (KeyError, TypeError, ValueError) as e:
+                    logger.warning("Skipping malformed %s item: %s", qtype, e)
+        if not candidates:
+            continue
+        await _classify(candidates)
+        generated.extend(candidates)
+
+        repeats = await _repeats(questions, candidates)
+        seen = {q['question'].strip().lower() for q in questions}
+        for row, candidate in enumerate(candidates):
+            key = candidate['question'].strip().lower()
+            slot = next((i for i in slots if questions[i]['type'] == candidate['type']), None)
+            if candidate['bloom_classification'] != under or row in repeats or key in seen or slot is None:
+                rejected.append(candidate['question'])
+                continue
+            slots.remove(slot)
+            questions[slot] = candidate
+            seen.add(key)
+            replaced += 1
+
+    met = bool(questions) and on_target(questions, target_hots_percentage, tolerance)
+    metrics.increment("bloom_targets_met" if met else "bloom_targets_missed")
+    report = {
+        "target_hots_percentage": target_hots_percentage,
+        "hots_percentage": round(hots_count(questions) / len(questions) * 100, 2) if questions else 0,
+        "met": met,
+        "follow_up_calls": calls,
+        "replaced": replaced,
+    }
+    logger.info(
+        "🎯 HOTS %.1f%% (target %.1f%%) after %d follow-up calls",
+        report["hots_percentage"], target_hots_percentage, calls
+    )
+    return questions, generated, report
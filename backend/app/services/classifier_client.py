@@ -0,0 +1,125 @@
+# app/services/classifier_client.py
+
+"""
+Client for the BERT classification sidecar (classifier_server.py)
+Drop-in replacement for the in-process micro-batcher: same submit /
+submit_many interface, but the model lives in one shared process
+"""
+
+import asyncio
+import json
+
+# Must match classifier_server.STREAM_LIMIT
+STREAM_LIMIT = 64 * 1024 * 1024
+
+
+class ClassifierServerError(Exception):
+    """The sidecar answered with an error"""
+
+
+class RemoteClassifier:
+    """
+    One multiplexed connection per worker process
+
+    Requests carry an id and are answered out of order, so concurrent
+    callers share the connection. If the sidecar restarts, pending calls
+    fail with ConnectionError and the next call reconnects.
+    """
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self._reader_task = None
+        self._writer = None
+        self._pending = {}
+        self._next_id = 0
+        self._connect_lock = None
+        self.requests = 0
+        self.items = 0
+        self.connects = 0
+
+    async def _connect(self):
+        if self._writer is not None and not self._writer.is_closing():
+            return
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return
+            reader, writer = await asyncio.open_unix_connection(self.socket_path, limit=STREAM_LIMIT)
+            self._writer = writer
+            self.connects += 1
+            self._reader_task = asyncio.ensure_future(self._read_responses(reader, writer))
+
+    async def _read_responses(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self._pending.pop(response.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if "error" in response:
+                    future.set_exception(ClassifierServerError(response["error"]))
+                else:
+                    future.set_result(response)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            if self._writer is writer:
+                self._writer = None
+            writer.close()
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Classifier server connection closed"))
+
+    async def _call(self, payload):
+        await self._connect()
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+
+        payload["id"] = request_id
+        try:
+            self._writer.write((json.dumps(payload) + "\n").encode("utf-8"))
+            await self._writer.drain()
+        except ConnectionError:
+            self._pending.pop(request_id, None)
+            raise
+        return await future
+
+    async def submit(self, question):
+        """Classify one question; returns its detailed classification dict"""
+        return (await self.submit_many([question]))[0]
+
+    async def submit_many(self, questions):
+        """Classify several questions in one round trip"""
+        questions = list(questions)
+        self.requests += 1
+        self.items += len(questions)
+        response = await self._call({"op": "classify", "questions": questions})
+        return response["results"]
+
+    async def embed(self, questions):
+        """Embed questions with the sidecar's model; returns one list of floats per question"""
+        return (await self._call({"op": "embed", "questions": list(questions)}))["embeddings"]
+
+    async def server_status(self):
+        """Classifier state plus the sidecar's batcher and cache stats"""
+        return await self._call({"op": "status"})
+
+    async def reload_taxonomy(self):
+        """Make the sidecar re-read the taxonomy file and swap its keyword index"""
+        return (await self._call({"op": "reload_taxonomy"}))["taxonomy"]
+
+    def stats(self):
+        return {
+            "remote": self.socket_path,
+            "requests": self.requests,
+            "items": self.items,
+            "connects": self.connects,
+            "connected": self._writer is not None and not self._writer.is_closing(),
+        }
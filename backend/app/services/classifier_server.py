@@ -0,0 +1,144 @@
+# app/services/classifier_server.py
+
+"""
+Standalone BERT classification sidecar
+Holds the only copy of the model and keyword embeddings and funnels every
+uvicorn worker's questions through one micro-batcher. Workers connect over a
+Unix socket when BERT_SERVER_SOCKET is set (see classifier_client.py).
+
+Run from the backend directory:
+    BERT_SERVER_SOCKET=/tmp/quizzard-bert.sock python -m app.services.classifier_server
+
+Protocol: newline-delimited JSON over one long-lived connection per worker.
+    {"id": 1, "op": "classify", "questions": ["...", ...]}
+        -> {"id": 1, "results": [<detailed classification>, ...]}
+    {"id": 2, "op": "status"}
+        -> {"id": 2, "status": {...}, "batcher": {...}, "embedding_cache": {...}}
+    {"id": 3, "op": "reload_taxonomy"}
+        -> {"id": 3, "taxonomy": {<keyword index summary>}}
+    {"id": 4, "op": "embed", "questions": ["...", ...]}
+        -> {"id": 4, "embeddings": [[float, ...], ...]}
+Failures come back as {"id": ..., "error": "..."}. Responses may arrive out
+of order.
+"""
+
+import asyncio
+import json
+import logging
+import os
+
+from app.config.settings import settings
+from app.services.bert_classifier import (
+    load_classifier,
+    get_classifier_status,
+    reload_keyword_index,
+    encode_questions,
+)
+from app.services.embedding_cache import get_embedding_cache
+from app.services.micro_batcher import create_local_batcher
+from app.utils.executors import run_in_bert_executor, shutdown_executors
+
+logger = logging.getLogger(__name__)
+
+# Large /classify-batch requests arrive as a single line
+STREAM_LIMIT = 64 * 1024 * 1024
+
+
+class ClassifierServer:
+    """Serves classification requests from a Unix socket through one batcher"""
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.batcher = create_local_batcher()
+        self.connections = 0
+
+    async def _answer(self, request):
+        op = request.get("op", "classify")
+        if op == "classify":
+            return {"results": await self.batcher.submit_many(request["questions"])}
+        if op == "embed":
+            vectors = await run_in_bert_executor(encode_questions, request["questions"])
+            return {"embeddings": vectors.tolist()}
+        if op == "status":
+            return {
+                "status": get_classifier_status(),
+                "batcher": self.batcher.stats(),
+                "embedding_cache": await asyncio.to_thread(get_embedding_cache().stats),
+                "connections": self.connections,
+            }
+        if op == "reload_taxonomy":
+            return {"taxonomy": await run_in_bert_executor(reload_keyword_index)}
+        raise ValueError(f"Unknown op: {op}")
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(request):
+            try:
+                payload = await self._answer(request)
+            except Exception as e:
+                payload = {"error": f"{type(e).__name__}: {e}"}
+            payload["id"] = request.get("id")
+            async with write_lock:
+                writer.write((json.dumps(payload) + "\n").encode("utf-8"))
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    continue
+                # Handle requests concurrently so they can share batches
+                task = asyncio.ensure_future(respond(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.connections -= 1
+            writer.close()
+
+    async def serve(self):
+        logger.info("Loading classifier (%s, %s backend)...", settings.BERT_MODEL_NAME, settings.BERT_BACKEND)
+        await run_in_bert_executor(load_classifier)
+
+        # A socket file left behind by a crashed server would block bind()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        directory = os.path.dirname(self.socket_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        server = await asyncio.start_unix_server(
+            self._handle, path=self.socket_path, limit=STREAM_LIMIT
+        )
+        os.chmod(self.socket_path, 0o660)
+        logger.info("✓ Classifier server listening on %s", self.socket_path)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            shutdown_executors()
+
+
+def main():
+    if not settings.BERT_SERVER_SOCKET:
+        raise SystemExit("Set BERT_SERVER_SOCKET to the Unix socket path to listen on")
+    try:
+        asyncio.run(ClassifierServer(settings.BERT_SERVER_SOCKET).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
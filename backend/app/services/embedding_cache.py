@@ -0,0 +1,228 @@
+# app/services/embedding_cache.py
+
+"""
+Memoization of question embeddings
+Repeated classifications of the same question text (generation, reclassify,
+regeneration from cached text) skip transformer inference entirely
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from app.config.settings import settings
+
+
+def normalize_question(text):
+    """
+    Normalize question text for cache lookup
+
+    Only differences the tokenizer ignores anyway are folded (unicode form,
+    surrounding/repeated whitespace), so cached embeddings are identical to
+    freshly computed ones.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def make_embedding_key(text, model_key):
+    """Cache key for a question under a given model (and backend)"""
+    payload = f"{model_key}\0{normalize_question(text)}"
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteEmbeddingStore:
+    """
+    Persistent key -> float32 vector store, bounded to max_rows
+
+    Least recently used rows are evicted on write. Reads are recorded in
+    memory and their access times written with the next put_many (or every
+    TOUCH_BATCH reads), as in SQLiteCacheBackend.
+    """
+
+    TOUCH_BATCH = 512
+
+    def __init__(self, path, max_rows=200000):
+        self.path = path
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._touched = {}  # key -> last read time, not yet written
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " accessed_at REAL NOT NULL DEFAULT 0)"
+        )
+        # Stores created before eviction existed
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")}
+        if "accessed_at" not in columns:
+            self._conn.execute("ALTER TABLE embeddings ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_accessed ON embeddings(accessed_at)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        found = {}
+        now = time.time()
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+                    self._touched[key] = now
+            if len(self._touched) >= self.TOUCH_BATCH:
+                self._flush_touched()
+                self._conn.commit()
+        return found
+
+    def put_many(self, items):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, accessed_at) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items]
+            )
+            self._flush_touched()
+            self._evict()
+            self._conn.commit()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()]
+            )
+            self._touched = {}
+
+    def _evict(self):
+        # Oldest rows through the accessed_at index, never a full-table read
+        excess = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.max_rows
+        if excess > 0:
+            cur = self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN"
+                " (SELECT key FROM embeddings ORDER BY accessed_at ASC LIMIT ?)", (excess,)
+            )
+            self.evictions += cur.rowcount
+
+
+class EmbeddingCache:
+    """Bounded in-memory LRU in front of an optional persistent store"""
+
+    def __init__(self, max_entries, store=None):
+        self.max_entries = max_entries
+        self.store = store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def get_many(self, keys):
+        """
+        Look up embeddings
+
+        Returns:
+            list: One vector per key, None where not cached
+        """
+        results = [None] * len(keys)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._entries.get(key)
+                if vector is None:
+                    missing.append(i)
+                else:
+                    self._entries.move_to_end(key)
+                    results[i] = vector
+            self.hits += len(keys) - len(missing)
+
+        if missing and self.store is not None:
+            found = self.store.get_many([keys[i] for i in missing])
+            if found:
+                self._remember(found.items())
+                self.store_hits += len(found)
+                still_missing = []
+                for i in missing:
+                    vector = found.get(keys[i])
+                    if vector is None:
+                        still_missing.append(i)
+                    else:
+                        results[i] = vector
+                missing = still_missing
+
+        with self._lock:
+            self.misses += len(missing)
+        return results
+
+    def put_many(self, keys, vectors):
+        """Store freshly computed embeddings (memory and persistent store)"""
+        items = [(key, np.asarray(vector, dtype=np.float32)) for key, vector in zip(keys, vectors)]
+        self._remember(items)
+        if self.store is not None:
+            self.store.put_many(items)
+
+    def _remember(self, items):
+        with self._lock:
+            for key, vector in items:
+                self._entries[key] = vector
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.store_hits + self.misses
+        stats = {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.store_hits) / lookups, 4) if lookups else 0.0,
+        }
+        if self.store is not None:
+            stats["store_path"] = self.store.path
+            stats["store_entries"] = self.store.count()
+            stats["store_max_entries"] = self.store.max_rows
+            stats["store_evictions"] = self.store.evictions
+        return stats
+
+
+_embedding_cache = None
+
+
+def get_embedding_cache():
+    """Return the shared question embedding cache configured from settings"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        store = None
+        if settings.QUESTION_EMBEDDING_CACHE_PATH:
+            store = SQLiteEmbeddingStore(
+                settings.QUESTION_EMBEDDING_CACHE_PATH, settings.QUESTION_EMBEDDING_CACHE_MAX_ROWS
+            )
+        _embedding_cache = EmbeddingCache(settings.QUESTION_EMBEDDING_CACHE_MAX_ENTRIES, store)
+    return _embedding_cache
@@ -0,0 +1,440 @@
+# app/services/gemini_client.py
+
+"""
+Shared Gemini client
+One long-lived model per process, client-side rate limiting (requests/min
+and tokens/min), per-call deadlines, jittered exponential backoff on
+429/5xx, a circuit breaker, and a pluggable transport with a deterministic
+local fake for offline load tests
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass
+
+from app.config.settings import settings
+from app.services.prompt_builder import count_tokens
+from app.utils.metrics import stage, observe_stage, STAGE_GEMINI, record_tokens, record_gemini_request
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class GeminiResponse:
+    """Text plus token usage of one completion"""
+    text: str
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.output_tokens
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling Gemini while the circuit breaker is open"""
+
+
+class RetryableError(Exception):
+    """Transport error worth retrying (rate limit, 5xx, timeout)"""
+
+
+class GoogleGeminiTransport:
+    """Real transport: one GenerativeModel reused for every call"""
+
+    def __init__(self, model_name, api_key):
+        import google.generativeai as genai
+        from google.api_core import exceptions as google_exceptions
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self._model = genai.GenerativeModel(model_name)
+        # Older google-ai-generativelanguage protos have no thinking_config
+        self._thinking_config = "thinking_config" in genai.protos.GenerationConfig.meta.fields
+        if not self._thinking_config:
+            logger.warning(
+                "Installed Gemini SDK can't set thinking_config; thinking is not capped, "
+                "so max_output_tokens is GEMINI_MAX_OUTPUT_TOKENS instead of the sized limit"
+            )
+        self._retryable = (
+            google_exceptions.TooManyRequests,
+            google_exceptions.ResourceExhausted,
+            google_exceptions.InternalServerError,
+            google_exceptions.ServiceUnavailable,
+            google_exceptions.DeadlineExceeded,
+        )
+
+    @staticmethod
+    def _usage(response):
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return 0, 0
+        # Thinking tokens are billed and rate limited as output
+        return (getattr(usage, "prompt_token_count", 0) or 0,
+                (getattr(usage, "candidates_token_count", 0) or 0)
+                + (getattr(usage, "thoughts_token_count", 0) or 0))
+
+    def _config(self, generation_config):
+        if self._thinking_config or "thinking_config" not in generation_config:
+            return generation_config
+        # Uncapped thinking shares max_output_tokens with the answer, so the
+        # limit sized for a fixed thinking budget would truncate answers
+        config = {key: value for key, value in generation_config.items() if key != "thinking_config"}
+        config["max_output_tokens"] = max(
+            config.get("max_output_tokens", 0), settings.GEMINI_MAX_OUTPUT_TOKENS
+        )
+        return config
+
+    async def generate(self, prompt, generation_config):
+        try:
+            response = await self._model.generate_content_async(
+                prompt, generation_config=self._config(generation_config)
+            )
+            text = response.text
+        except self._retryable as e:
+            raise RetryableError(str(e)) from e
+        prompt_tokens, output_tokens = self._usage(response)
+        return GeminiResponse(text, prompt_tokens, output_tokens)
+
+    async def stream(self, prompt, generation_config):
+        try:
+            response = await self._model.generate_content_async(
+                prompt, generation_config=self._config(generation_config), stream=True
+            )
+            async for chunk in response:
+                # usage_metadata is cumulative; the last chunk carries the totals
+                prompt_tokens, output_tokens = self._usage(chunk)
+                yield GeminiResponse(chunk.text, prompt_tokens, output_tokens)
+        except self._retryable as e:
+            raise RetryableError(str(e)) from e
+
+
+class FakeGeminiTransport:
+    """
+    Deterministic offline transport
+
+    Reads the requested counts and the TEXT section from the prompt and
+    builds a valid quiz from the document's sentences, so the whole pipeline
+    (parsing, formatting, classification) can be load-tested without network
+    access. The same prompt always yields the same quiz.
+    """
+
+    _COUNT_PATTERNS = {
+        "multiple_choice": r"(\d+)\s+Multiple Choice",
+        "true_false": r"(\d+)\s+True/False",
+        "identification": r"(\d+)\s+Identification",
+    }
+
+    def __init__(self, model_name, latency=0.0, chunk_size=64):
+        self.model_name = f"fake:{model_name}"
+        self.latency = latency
+        self.chunk_size = chunk_size
+
+    def _build_quiz(self, prompt):
+        counts = {}
+        for qtype, pattern in self._COUNT_PATTERNS.items():
+            match = re.search(pattern, prompt)
+            counts[qtype] = int(match.group(1)) if match else 0
+
+        text_match = re.search(r"TEXT:\s*(.*?)\n\s*Generate exactly", prompt, re.S)
+        source = text_match.group(1) if text_match else prompt
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n+", source) if len(s.strip()) > 10]
+        if not sentences:
+            sentences = ["The document discusses an important topic."]
+
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+        offset = rng.randrange(len(sentences))
+
+        def pick(i):
+            return sentences[(i + offset) % len(sentences)]
+
+        quiz = {"multiple_choice": [], "true_false": [], "identification": []}
+        for i in range(counts["multiple_choice"]):
+            sentence = pick(i)
+            quiz["multiple_choice"].append({
+                "question": f"Which statement best matches: {sentence[:120]}?",
+                "choices": [sentence[:60], f"Not {sentence[:50]}", "None of the above", "All of the above"],
+                "correct_answer": 0,
+                "points": 1
+            })
+        for i in range(counts["true_false"]):
+            quiz["true_false"].append({
+                "question": pick(i + counts["multiple_choice"])[:160],
+                "correct_answer": rng.random() < 0.5,
+                "points": 1
+            })
+        for i in range(counts["identification"]):
+            sentence = pick(i + counts["multiple_choice"] + counts["true_false"])
+            words = re.findall(r"[A-Za-z]{5,}", sentence) or ["topic"]
+            quiz["identification"].append({
+                "question": f"Identify the term described in item {i + 1}: {sentence[:120]}",
+                "correct_answer": words[0],
+                "points": 1
+            })
+
+        # Steered prompts (LOTS/HOTS follow-ups) list Bloom's verbs to use
+        verbs = [v.strip() for group in re.findall(r"\(verbs: ([^)]*)\)", prompt) for v in group.split(",")]
+        if verbs:
+            for qtype in quiz:
+                for item in quiz[qtype]:
+                    item["question"] = f"{rng.choice(verbs).capitalize()}: {item['question']}"
+        return quiz
+
+    async def generate(self, prompt, generation_config):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        text = json.dumps(self._build_quiz(prompt), indent=2)
+        return GeminiResponse(
+            text,
+            prompt_tokens=count_tokens(prompt),
+            output_tokens=count_tokens(text)
+        )
+
+    async def stream(self, prompt, generation_config):
+        text = json.dumps(self._build_quiz(prompt), indent=2)
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        for i, chunk in enumerate(chunks):
+            if self.latency:
+                await asyncio.sleep(self.latency / max(len(chunks), 1))
+            if i == len(chunks) - 1:
+                yield GeminiResponse(
+                    chunk,
+                    prompt_tokens=count_tokens(prompt),
+                    output_tokens=count_tokens(text)
+                )
+            else:
+                yield GeminiResponse(chunk)
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at rate_per_minute
+
+    No asyncio.Lock: check-and-debit happens without an await in between,
+    which is atomic on a single event loop.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount=1):
+        # Never wait for more than the bucket can hold
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return
+            await asyncio.sleep((amount - self._tokens) / self.rate)
+
+    def debit(self, amount):
+        """Charge a correction after the fact (may go negative)"""
+        self._refill()
+        self._tokens -= amount
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures, probes again after reset_timeout"""
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "open" or (state == "half_open" and self._probing):
+            raise CircuitOpenError("Gemini circuit breaker is open; try again shortly")
+        if state == "half_open":
+            self._probing = True
+
+    def record_success(self):
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self._failures += 1
+        self._probing = False
+        if self._failures >= self.failure_threshold or self._opened_at is not None:
+            self._opened_at = time.monotonic()
+
+    def release(self):
+        """End a call that neither succeeded nor failed retryably (bad request, cancellation)"""
+        self._probing = False
+
+
+def backoff_delay(attempt, base, maximum):
+    """Full-jitter exponential backoff: uniform(0, min(maximum, base * 2**attempt))"""
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+
+class GeminiClient:
+    """Rate-limited, retrying, circuit-broken front end for a transport"""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.model_name = transport.model_name
+        self.request_bucket = TokenBucket(settings.GEMINI_REQUESTS_PER_MINUTE)
+        self.token_bucket = TokenBucket(settings.GEMINI_TOKENS_PER_MINUTE)
+        self.breaker = CircuitBreaker(
+            settings.GEMINI_CIRCUIT_FAILURES, settings.GEMINI_CIRCUIT_RESET
+        )
+
+    async def _admit(self, prompt):
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            record_gemini_request("circuit_open")
+            raise
+        estimate = count_tokens(prompt)
+        await self.request_bucket.acquire(1)
+        await self.token_bucket.acquire(estimate)
+        return estimate
+
+    async def _retry_wait(self, attempt, error):
+        self.breaker.record_failure()
+        if attempt >= settings.GEMINI_MAX_RETRIES:
+            record_gemini_request("error")
+            raise error
+        record_gemini_request("retry")
+        delay = backoff_delay(attempt, settings.GEMINI_BACKOFF_BASE, settings.GEMINI_BACKOFF_MAX)
+        logger.warning("↻ Gemini call failed (%s); retry %d in %.1fs", error, attempt + 1, delay)
+        await asyncio.sleep(delay)
+
+    async def generate(self, prompt, generation_config):
+        """
+        Run one completion with rate limiting, deadline and retries
+
+        Returns:
+            GeminiResponse: Completion text and token usage
+
+        Raises:
+            CircuitOpenError: If recent calls kept failing
+            RetryableError / asyncio.TimeoutError: Once retries are exhausted
+        """
+        attempt = 0
+        # Timed as one stage, including rate-limit waits and retries
+        with stage(STAGE_GEMINI):
+            while True:
+                estimate = await self._admit(prompt)
+                try:
+                    response = await asyncio.wait_for(
+                        self.transport.generate(prompt, generation_config),
+                        timeout=settings.GEMINI_TIMEOUT
+                    )
+                except (RetryableError, asyncio.TimeoutError) as e:
+                    await self._retry_wait(attempt, e)
+                    attempt += 1
+                    continue
+                except BaseException:
+                    # Not an outage, but a half-open probe must not stay claimed
+                    self.breaker.release()
+                    raise
+
+                self.breaker.record_success()
+                record_gemini_request("success")
+                record_tokens(response.prompt_tokens, response.output_tokens)
+                if response.total_tokens:
+                    self.token_bucket.debit(response.total_tokens - estimate)
+                return response
+
+    async def stream(self, prompt, generation_config):
+        """
+        Stream a completion as text chunks
+
+        Retries only until the first chunk arrives; after that a failure is
+        raised to the caller, since chunks were already consumed. Every
+        chunk must arrive within GEMINI_TIMEOUT of the previous one.
+        """
+        start = time.perf_counter()
+        usage = GeminiResponse("")
+        chunks = None
+        try:
+            attempt = 0
+            while True:
+                await self._admit(prompt)
+                chunks = self.transport.stream(prompt, generation_config)
+                try:
+                    first = await asyncio.wait_for(chunks.__anext__(), timeout=settings.GEMINI_TIMEOUT)
+                except StopAsyncIteration:
+                    self.breaker.record_success()
+                    record_gemini_request("success")
+                    return
+                except (RetryableError, asyncio.TimeoutError) as e:
+                    await chunks.aclose()
+                    await self._retry_wait(attempt, e)
+                    attempt += 1
+                    continue
+                except BaseException:
+                    self.breaker.release()
+                    raise
+                break
+
+            self.breaker.record_success()
+            record_gemini_request("success")
+            chunk = first
+            while True:
+                if chunk.total_tokens:
+                    usage = chunk
+                yield chunk.text
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=settings.GEMINI_TIMEOUT)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    record_gemini_request("error")
+                    logger.warning("Gemini stream stalled for %ss", settings.GEMINI_TIMEOUT)
+                    raise
+        finally:
+            if chunks is not None:
+                await chunks.aclose()
+            record_tokens(usage.prompt_tokens, usage.output_tokens)
+            observe_stage(STAGE_GEMINI, time.perf_counter() - start)
+
+    def stats(self):
+        return {
+            "transport": type(self.transport).__name__,
+            "model": self.model_name,
+            "circuit": self.breaker.state,
+        }
+
+
+_client = None
+
+
+def get_gemini_client():
+    """Return the shared Gemini client configured from settings"""
+    global _client
+    if _client is None:
+        transport_name = settings.GEMINI_TRANSPORT.lower()
+        if transport_name == "google":
+            transport = GoogleGeminiTransport(settings.GEMINI_MODEL, settings.GEMINI_API_KEY)
+        elif transport_name == "fake":
+            transport = FakeGeminiTransport(settings.GEMINI_MODEL, latency=settings.GEMINI_FAKE_LATENCY)
+        else:
+            raise ValueError(f"Unknown GEMINI_TRANSPORT: {settings.GEMINI_TRANSPORT}")
+        _client = GeminiClient(transport)
+    return _client
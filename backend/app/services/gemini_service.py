@@ -1,145 +1,555 @@
-import google.generativeai as genai
 from app.config.settings import settings
+from app.services.gemini_client import get_gemini_client
+from app.services.quiz_cache import get_quiz_cache
+from app.services.question_dedup import dedup_quiz, index_quiz
+from app.utils.json_stream import QuizStreamParser
+from app.utils.json_repair import parse_quiz_json, strip_trailing_commas
+from app.utils.blooms_taxonomy import get_category_levels
+from app.services.prompt_builder import build_quiz_prompt, fit_to_budget, generation_config
+from app.utils import metrics
+import asyncio
+import hashlib
 import json
-import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+QUESTION_TYPES = ["multiple_choice", "true_false", "identification"]
+
+
+async def _build_prompt(
+    text: str,
+    num_multiple_choice: int,
+    num_true_false: int,
+    num_identification: int,
+    max_input_tokens: int = None,
+    exclude_questions: list = None,
+    focus: str = None,
+    fitted: bool = False
+) -> str:
+    """
+    Build the quiz generation prompt sent to Gemini.
+    
+    The text is fitted to max_input_tokens (PROMPT_INPUT_TOKENS by default)
+    by sentence selection, unless fitted says the caller already did;
+    exclude_questions lists questions already generated (used by top-up
+    calls so the model doesn't repeat them); focus is an extra instruction
+    on the kind of question wanted (see _bloom_focus). Sentence selection
+    runs in a thread.
+    """
+    counts = {
+        "multiple_choice": num_multiple_choice,
+        "true_false": num_true_false,
+        "identification": num_identification,
+    }
+    with metrics.stage(metrics.STAGE_PROMPT):
+        if not fitted:
+            text = await asyncio.to_thread(fit_to_budget, text, max_input_tokens)
+        return build_quiz_prompt(text, counts, exclude_questions=exclude_questions, focus=focus)
+
+
+def source_key(text: str) -> str:
+    """
+    Key of the document a quiz is generated from, for the question index.
+    
+    Taken from the fitted text, which is the same on every regeneration of
+    a handout whatever the question counts.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _is_valid_item(question_type: str, item) -> bool:
+    """Check that a quiz item has the fields format_question needs."""
+    if not isinstance(item, dict):
+        return False
+    question = item.get("question")
+    if not isinstance(question, str) or not question.strip():
+        return False
+    if question_type == "multiple_choice":
+        choices = item.get("choices")
+        answer = item.get("correct_answer")
+        # bool is an int subclass: true/false is not a choice index
+        return (isinstance(choices, list) and len(choices) >= 2
+                and isinstance(answer, int) and not isinstance(answer, bool)
+                and 0 <= answer < len(choices))
+    return "correct_answer" in item
+
+
+@metrics.stage(metrics.STAGE_PARSE)
+def _parse_quiz_response(response_text: str) -> dict:
+    """
+    Parse the quiz JSON from a Gemini response, repairing it if needed.
+    
+    Malformed items are dropped; the result may hold fewer questions than
+    requested (see _shortfall).
+    """
+    try:
+        quiz_data, repaired = parse_quiz_json(response_text)
+    except ValueError as e:
+        metrics.increment("quiz_json_failures")
+        logger.error("JSON Parse Error: %s", e)
+        logger.debug("Response text: %s", response_text)
+        raise Exception(f"Failed to parse Gemini response: {str(e)}")
+    
+    if repaired:
+        metrics.increment("quiz_json_repairs")
+    
+    # Keep only well-formed items, always return all three sections
+    cleaned = {}
+    for question_type in QUESTION_TYPES:
+        items = quiz_data.get(question_type) or []
+        if not isinstance(items, list):
+            items = []
+        valid = [item for item in items if _is_valid_item(question_type, item)]
+        if len(valid) < len(items):
+            metrics.increment("quiz_items_dropped", len(items) - len(valid))
+        cleaned[question_type] = valid
+    
+    return cleaned
+
+
+def _shortfall(quiz_data: dict, counts: dict) -> dict:
+    """Missing question count per type."""
+    return {
+        question_type: max(0, counts[question_type] - len(quiz_data.get(question_type, [])))
+        for question_type in QUESTION_TYPES
+    }
+
+
+def _merge_top_up(quiz_data: dict, extra: dict, counts: dict) -> dict:
+    """Append new (non-repeated) top-up items until each type is full."""
+    seen = {
+        item["question"].strip().lower()
+        for question_type in QUESTION_TYPES for item in quiz_data[question_type]
+    }
+    for question_type in QUESTION_TYPES:
+        for item in extra.get(question_type, []):
+            if len(quiz_data[question_type]) >= counts[question_type]:
+                break
+            key = item["question"].strip().lower()
+            if key not in seen:
+                seen.add(key)
+                quiz_data[question_type].append(item)
+    return quiz_data
+
+
+async def generate_top_up(
+    text: str,
+    missing: dict,
+    existing_questions: list,
+    max_input_tokens: int = None,
+    fitted: bool = False
+) -> dict:
+    """
+    Ask Gemini only for the missing question counts.
+    
+    Args:
+        text: Source text the quiz was generated from
+        missing: Question count still needed per type
+        existing_questions: Question texts the model must not repeat
+        max_input_tokens: Input token budget (defaults to PROMPT_INPUT_TOKENS)
+        fitted: text is already fitted to the budget
+    
+    Returns:
+        dict: Parsed (validated) quiz sections with the extra questions
+    """
+    metrics.increment("quiz_top_ups")
+    logger.info("↻ Topping up short quiz: %s", missing)
+    prompt = await _build_prompt(
+        text,
+        missing["multiple_choice"],
+        missing["true_false"],
+        missing["identification"],
+        max_input_tokens,
+        exclude_questions=existing_questions,
+        fitted=fitted
+    )
+    response = await get_gemini_client().generate(prompt, generation_config(missing))
+    return _parse_quiz_response(response.text)
+
+
+async def _complete_quiz(
+    text: str,
+    quiz_data: dict,
+    counts: dict,
+    max_input_tokens: int = None
+) -> dict:
+    """
+    Run up to GEMINI_TOP_UP_ATTEMPTS targeted top-ups for a short quiz.
+    
+    text is the fitted text the quiz was generated from.
+    """
+    for _ in range(settings.GEMINI_TOP_UP_ATTEMPTS):
+        missing = _shortfall(quiz_data, counts)
+        if not any(missing.values()):
+            break
+        existing = [item["question"] for t in QUESTION_TYPES for item in quiz_data[t]]
+        try:
+            extra = await generate_top_up(text, missing, existing, max_input_tokens, fitted=True)
+        except Exception as e:
+            logger.warning("Top-up failed, keeping short quiz: %s", e)
+            break
+        quiz_data = _merge_top_up(quiz_data, extra, counts)
+    
+    if any(_shortfall(quiz_data, counts).values()):
+        metrics.increment("quiz_short_results")
+    return quiz_data
+
+
+def get_generation_stats() -> dict:
+    """
+    Repair and top-up counters with rates per generation.
+    """
+    counters = metrics.get_counters()
+    generations = counters.get("quiz_generations", 0)
+    
+    def rate(name):
+        return round(counters.get(name, 0) / generations, 4) if generations else 0.0
+    
+    return {
+        "generations": generations,
+        "json_repairs": counters.get("quiz_json_repairs", 0),
+        "json_failures": counters.get("quiz_json_failures", 0),
+        "items_dropped": counters.get("quiz_items_dropped", 0),
+        "top_ups": counters.get("quiz_top_ups", 0),
+        "short_results": counters.get("quiz_short_results", 0),
+        "repair_rate": rate("quiz_json_repairs"),
+        "top_up_rate": rate("quiz_top_ups"),
+        "near_duplicates": counters.get("question_duplicates", 0),
+        "bank_questions_saved": counters.get("bank_questions_saved", 0),
+        "bank_questions_served": counters.get("bank_questions_served", 0),
+        "bloom_follow_ups": counters.get("bloom_follow_ups", 0),
+        "bloom_targets_met": counters.get("bloom_targets_met", 0),
+        "bloom_targets_missed": counters.get("bloom_targets_missed", 0),
+    }
 
-# Configure Gemini with API key from settings
-genai.configure(api_key=settings.GEMINI_API_KEY)
 
 def generate_quiz_from_text(
     text: str,
     num_multiple_choice: int = 5,
     num_true_false: int = 5,
-    num_identification: int = 5
+    num_identification: int = 5,
+    max_input_tokens: int = None
 ) -> dict:
     """
     Generate quiz questions using Gemini AI.
+    
+    Blocking wrapper around generate_quiz_from_text_async for scripts;
+    must not be called from inside a running event loop.
     """
+    return asyncio.run(generate_quiz_from_text_async(
+        text, num_multiple_choice, num_true_false, num_identification, max_input_tokens
+    ))
+
+
+async def generate_quiz_from_text_async(
+    text: str,
+    num_multiple_choice: int = 5,
+    num_true_false: int = 5,
+    num_identification: int = 5,
+    max_input_tokens: int = None,
+    source: str = None,
+    index_questions: bool = True
+) -> dict:
+    """
+    Generate quiz questions using Gemini AI.
+    
+    Uses the shared async Gemini client (rate limited, retried, circuit
+    broken) so the event loop keeps serving other requests while the model
+    is generating. The text is first fitted to the input token budget;
+    results are cached by the hash of that text and the question counts,
+    so a repeat upload of the same document returns without calling Gemini.
+    A quiz that is still short after top-ups and dedup is returned but not
+    cached, so the next request tries again.
+    
+    source keys the question index (source_key of the fitted text by
+    default); index_questions=False leaves indexing to a caller that keeps
+    only some of the questions (long documents index the merged quiz).
+    """
+    counts = {
+        "multiple_choice": num_multiple_choice,
+        "true_false": num_true_false,
+        "identification": num_identification,
+    }
+    with metrics.stage(metrics.STAGE_PROMPT):
+        text = await asyncio.to_thread(fit_to_budget, text, max_input_tokens)
+    client = get_gemini_client()
+    cache = get_quiz_cache()
+    cache_key = cache.make_key(
+        text, num_multiple_choice, num_true_false, num_identification, client.model_name
+    )
+    cached = await cache.get_async(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        # Use gemini-2.5-flash model
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        
-        prompt = f"""
-You are an expert educator. Generate quiz questions based on the following text.
-
-TEXT:
-{text[:4000]}  
-
-Generate exactly:
-- {num_multiple_choice} Multiple Choice questions (with 4 options each, mark correct answer)
-- {num_true_false} True/False questions
-- {num_identification} Identification questions (short answer)
-
-Return ONLY valid JSON in this exact format:
-{{
-  "multiple_choice": [
-    {{
-      "question": "Question text here?",
-      "choices": ["Option A", "Option B", "Option C", "Option D"],
-      "correct_answer": 0,
-      "points": 1
-    }}
-  ],
-  "true_false": [
-    {{
-      "question": "Statement here",
-      "correct_answer": true,
-      "points": 1
-    }}
-  ],
-  "identification": [
-    {{
-      "question": "Question here?",
-      "correct_answer": "Answer here",
-      "points": 1
-    }}
-  ]
-}}
-
-IMPORTANT: Return ONLY the JSON object, no markdown, no explanations, no code blocks.
-"""
-        
-        generation_config = {
-            "temperature": 0.7,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 8192,
-        }
-        
-        response = model.generate_content(
-            prompt,
-            generation_config=generation_config
+        prompt = await _build_prompt(
+            text, num_multiple_choice, num_true_false, num_identification, max_input_tokens,
+            fitted=True
         )
         
-        response_text = response.text.strip()
+        metrics.increment("quiz_generations")
+        response = await client.generate(prompt, generation_config(counts))
         
-        # Clean response - remove markdown code blocks if present
-        response_text = re.sub(r'^```json\s*', '', response_text)
-        response_text = re.sub(r'^```\s*', '', response_text)
-        response_text = re.sub(r'\s*```$', '', response_text)
-        response_text = response_text.strip()
+        # One flaky/short response costs a small top-up call, not a full retry
+        quiz_data = _parse_quiz_response(response.text)
+        quiz_data = await _complete_quiz(text, quiz_data, counts, max_input_tokens)
         
-        # Parse JSON
-        quiz_data = json.loads(response_text)
+        # Near-duplicates (in this quiz or generated before) are replaced
+        # before caching, so cache hits are already deduplicated
+        async def top_up(missing, avoid):
+            return await generate_top_up(text, missing, avoid, max_input_tokens, fitted=True)
         
-        # Validate the response structure
-        if not all(key in quiz_data for key in ["multiple_choice", "true_false", "identification"]):
-            raise ValueError("Invalid quiz data structure returned by Gemini")
+        quiz_data = await dedup_quiz(
+            quiz_data, counts, top_up, source=source or source_key(text), add_to_index=index_questions
+        )
         
+        if any(_shortfall(quiz_data, counts).values()):
+            logger.warning("Not caching short quiz: missing %s", _shortfall(quiz_data, counts))
+        else:
+            await cache.set_async(cache_key, quiz_data)
         return quiz_data
         
-    except json.JSONDecodeError as e:
-        print(f"JSON Parse Error: {e}")
-        print(f"Response text: {response_text}")
-        raise Exception(f"Failed to parse Gemini response: {str(e)}")
     except Exception as e:
-        print(f"Gemini API Error: {e}")
+        logger.error("Gemini API Error: %s", e)
         raise Exception(f"Failed to generate quiz: {str(e)}")
 
 
-def format_quiz_for_frontend(quiz_data: dict, title: str) -> dict:
+async def generate_new_questions(
+    text: str,
+    counts: dict,
+    avoid_questions: list,
+    max_input_tokens: int = None
+) -> dict:
     """
-    Format quiz data for frontend consumption.
+    Generate questions the document hasn't had yet (question bank shortfall).
+    
+    Not cached: the point is to get questions other than the stored ones,
+    which are listed in the prompt as questions not to repeat.
+    
+    Args:
+        text: Source text
+        counts: Question count needed per type
+        avoid_questions: Question texts the model must not repeat
+        max_input_tokens: Input token budget (defaults to PROMPT_INPUT_TOKENS)
+    
+    Returns:
+        dict: Parsed, completed and deduplicated quiz sections
     """
-    questions = []
-    total_points = 0
+    with metrics.stage(metrics.STAGE_PROMPT):
+        text = await asyncio.to_thread(fit_to_budget, text, max_input_tokens)
+    prompt = await _build_prompt(
+        text,
+        counts["multiple_choice"],
+        counts["true_false"],
+        counts["identification"],
+        max_input_tokens,
+        exclude_questions=avoid_questions,
+        fitted=True
+    )
+    
+    metrics.increment("quiz_generations")
+    response = await get_gemini_client().generate(prompt, generation_config(counts))
+    
+    quiz_data = _parse_quiz_response(response.text)
+    quiz_data = await _complete_quiz(text, quiz_data, counts, max_input_tokens)
+    
+    async def top_up(missing, avoid):
+        return await generate_top_up(
+            text, missing, avoid + avoid_questions, max_input_tokens, fitted=True
+        )
+    
+    return await dedup_quiz(quiz_data, counts, top_up, source=source_key(text))
+
+
+def _bloom_focus(category: str) -> str:
+    """Prompt instruction steering every question to one LOTS/HOTS category."""
+    if category == "HOTS":
+        intro = "Every question must require higher-order thinking (analysis, judgment or creation), not recall."
+    else:
+        intro = "Every question must check recall, understanding or direct application of the text."
+    levels = "\n".join(
+        f"- {level['name']}: {level['description']} (verbs: {', '.join(level['keywords'][:8])})"
+        for level in get_category_levels(category)
+    )
+    return f"{intro}\nBuild each question around one of these Bloom's taxonomy levels and its verbs:\n{levels}"
+
+
+async def generate_steered_questions(
+    text: str,
+    counts: dict,
+    category: str,
+    avoid_questions: list,
+    max_input_tokens: int = None
+) -> dict:
+    """
+    Ask Gemini for questions of one LOTS/HOTS category only.
+    
+    The prompt is steered with the taxonomy's level descriptions and verbs
+    for that category; the caller classifies the result to check it.
+    
+    Args:
+        text: Source text
+        counts: Question count wanted per type
+        category: "LOTS" or "HOTS"
+        avoid_questions: Question texts the model must not repeat
+        max_input_tokens: Input token budget (defaults to PROMPT_INPUT_TOKENS)
+    
+    Returns:
+        dict: Parsed (validated) quiz sections
+    """
+    metrics.increment("bloom_follow_ups")
+    logger.info("↻ Asking for %s questions: %s", category, counts)
+    prompt = await _build_prompt(
+        text,
+        counts["multiple_choice"],
+        counts["true_false"],
+        counts["identification"],
+        max_input_tokens,
+        exclude_questions=avoid_questions,
+        focus=_bloom_focus(category)
+    )
+    response = await get_gemini_client().generate(prompt, generation_config(counts))
+    return _parse_quiz_response(response.text)
+
+
+async def stream_quiz_from_text(
+    text: str,
+    num_multiple_choice: int = 5,
+    num_true_false: int = 5,
+    num_identification: int = 5
+):
+    """
+    Stream quiz items as Gemini produces them.
+    
+    Items reach the caller before the quiz is complete, so the result can't
+    be deduplicated: it is added to the question index (so regenerations
+    avoid its questions) and cached under a stream-only key. A deduplicated
+    quiz cached by generate_quiz_from_text_async is served when present.
+    
+    Yields:
+        tuple: (question_type, item) for each completed question object
+    """
+    with metrics.stage(metrics.STAGE_PROMPT):
+        text = await asyncio.to_thread(fit_to_budget, text)
+    client = get_gemini_client()
+    cache = get_quiz_cache()
+    cache_key = cache.make_key(
+        text, num_multiple_choice, num_true_false, num_identification, client.model_name
+    )
+    stream_key = cache.make_key(
+        text, num_multiple_choice, num_true_false, num_identification, f"{client.model_name}:stream"
+    )
+    cached = await cache.get_async(cache_key)
+    if cached is None:
+        cached = await cache.get_async(stream_key)
+    if cached is not None:
+        for question_type in QUESTION_TYPES:
+            for item in cached.get(question_type, []):
+                yield question_type, item
+        return
     
-    # Add multiple choice questions
-    for mc in quiz_data.get("multiple_choice", []):
+    counts = {
+        "multiple_choice": num_multiple_choice,
+        "true_false": num_true_false,
+        "identification": num_identification,
+    }
+    quiz_data = {question_type: [] for question_type in QUESTION_TYPES}
+    parser = QuizStreamParser(loads=lambda s: json.loads(strip_trailing_commas(s)))
+    
+    try:
+        prompt = await _build_prompt(
+            text, num_multiple_choice, num_true_false, num_identification, fitted=True
+        )
+        
+        metrics.increment("quiz_generations")
+        async for chunk in client.stream(prompt, generation_config(counts)):
+            for question_type, item in parser.feed(chunk):
+                if question_type not in quiz_data:
+                    continue
+                if not _is_valid_item(question_type, item):
+                    metrics.increment("quiz_items_dropped")
+                    continue
+                quiz_data[question_type].append(item)
+                yield question_type, item
+        
+        # Truncated/short stream: top up and stream the extra items too
+        if any(_shortfall(quiz_data, counts).values()):
+            before = {t: len(quiz_data[t]) for t in QUESTION_TYPES}
+            quiz_data = await _complete_quiz(text, quiz_data, counts)
+            for question_type in QUESTION_TYPES:
+                for item in quiz_data[question_type][before[question_type]:]:
+                    yield question_type, item
+        
+    except Exception as e:
+        logger.error("Gemini API Error: %s", e)
+        raise Exception(f"Failed to generate quiz: {str(e)}")
+    
+    await index_quiz(quiz_data, source_key(text))
+    if not any(_shortfall(quiz_data, counts).values()):
+        await cache.set_async(stream_key, quiz_data)
+
+
+def format_question(question_type: str, item: dict) -> dict:
+    """
+    Format a single Gemini quiz item for frontend consumption.
+    """
+    if question_type == "multiple_choice":
         choices = []
-        for i, choice_text in enumerate(mc["choices"]):
+        for i, choice_text in enumerate(item["choices"]):
             choices.append({
                 "text": choice_text,
-                "is_correct": i == mc["correct_answer"]
+                "is_correct": i == item["correct_answer"]
             })
         
-        questions.append({
+        question = {
             "type": "multiple_choice",
-            "question": mc["question"],
+            "question": item["question"],
             "choices": choices,
-            "points": mc.get("points", 2)
-        })
-        total_points += mc.get("points", 2)
+            "points": item.get("points", 2)
+        }
     
-    # Add true/false questions
-    for tf in quiz_data.get("true_false", []):
-        questions.append({
+    elif question_type == "true_false":
+        question = {
             "type": "true_false",
-            "question": tf["question"],
-            "correct_answer": "True" if tf["correct_answer"] else "False",
-            "points": tf.get("points", 1)
-        })
-        total_points += tf.get("points", 1)
-    
-    # Add identification questions
-    for id_q in quiz_data.get("identification", []):
-        questions.append({
+            "question": item["question"],
+            "correct_answer": "True" if item["correct_answer"] else "False",
+            "points": item.get("points", 1)
+        }
+    
+    elif question_type == "identification":
+        question = {
             "type": "identification",
-            "question": id_q["question"],
-            "correct_answer": id_q["correct_answer"],
-            "points": id_q.get("points", 2)
-        })
-        total_points += id_q.get("points", 2)
+            "question": item["question"],
+            "correct_answer": item["correct_answer"],
+            "points": item.get("points", 2)
+        }
+    
+    else:
+        raise ValueError(f"Unknown question type: {question_type}")
+    
+    # Near-duplicate flag from question dedup (QUESTION_DEDUP=flag)
+    if "duplicate_of" in item:
+        question["duplicate_of"] = item["duplicate_of"]
+        question["duplicate_similarity"] = item.get("duplicate_similarity")
+    
+    return question
+
+
+@metrics.stage(metrics.STAGE_FORMAT)
+def format_quiz_for_frontend(quiz_data: dict, title: str) -> dict:
+    """
+    Format quiz data for frontend consumption.
+    """
+    questions = []
+    total_points = 0
+    
+    # Multiple choice, then true/false, then identification
+    for question_type in QUESTION_TYPES:
+        for item in quiz_data.get(question_type, []):
+            question = format_question(question_type, item)
+            questions.append(question)
+            total_points += question["points"]
     
     return {
         "title": title,
@@ -0,0 +1,202 @@
+# app/services/inference_backends.py
+
+"""
+Sentence embedding backends for the LOTS/HOTS classifier
+Selected with BERT_BACKEND:
+    torch - SentenceTransformer in float32 (reference)
+    onnx  - the same transformer exported to ONNX, run with ONNX Runtime
+    int8  - the ONNX export with dynamically quantized int8 weights
+
+The ONNX backends export the model once into EMBEDDING_CACHE_DIR/onnx and
+afterwards load only onnxruntime + the tokenizer, so workers that find the
+export on disk never import torch.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "onnx", "int8")
+
+_export_lock = threading.Lock()
+
+
+class TorchBackend:
+    """SentenceTransformer on PyTorch (the original behaviour)"""
+
+    name = "torch"
+
+    def __init__(self, model_name):
+        # Imported here: pulling in torch alone takes seconds
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self._model = SentenceTransformer(model_name)
+
+    def encode(self, texts):
+        return np.asarray(self._model.encode(list(texts)), dtype=np.float32)
+
+
+def _export_dir(model_name):
+    return os.path.join(settings.EMBEDDING_CACHE_DIR, "onnx", model_name.replace("/", "_"))
+
+
+def export_onnx(model_name):
+    """
+    Export the transformer of a SentenceTransformer model to ONNX (idempotent)
+
+    Writes model.onnx, model-int8.onnx, the tokenizer files and a small
+    pooling.json into a temporary directory that is renamed into place, so
+    concurrent workers never load a partial export.
+
+    Returns:
+        str: The export directory
+    """
+    export_dir = _export_dir(model_name)
+    meta_path = os.path.join(export_dir, "pooling.json")
+
+    with _export_lock:
+        if os.path.exists(meta_path):
+            return export_dir
+
+        import torch
+        from sentence_transformers import SentenceTransformer
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        logger.info("Exporting %s to ONNX...", model_name)
+        st_model = SentenceTransformer(model_name, device="cpu")
+        transformer = st_model[0]
+        pooling = st_model[1]
+        if not pooling.pooling_mode_mean_tokens:
+            raise ValueError(f"{model_name}: only mean-pooling models can be exported")
+
+        tmp_dir = f"{export_dir}.{os.getpid()}.tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+        transformer.tokenizer.save_pretrained(tmp_dir)
+
+        sample = transformer.tokenizer(["export sample"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+        class HiddenStates(torch.nn.Module):
+            """Expose only the token embeddings; pooling happens in numpy"""
+
+            def __init__(self, auto_model):
+                super().__init__()
+                self.auto_model = auto_model
+
+            def forward(self, *inputs):
+                return self.auto_model(**dict(zip(input_names, inputs)))[0]
+
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+        fp32_path = os.path.join(tmp_dir, "model.onnx")
+        with torch.no_grad():
+            torch.onnx.export(
+                HiddenStates(transformer.auto_model.eval()),
+                tuple(sample[name] for name in input_names),
+                fp32_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+            )
+        quantize_dynamic(
+            fp32_path, os.path.join(tmp_dir, "model-int8.onnx"), weight_type=QuantType.QInt8
+        )
+        with open(os.path.join(tmp_dir, "pooling.json"), "w") as f:
+            json.dump({
+                "max_seq_length": st_model.max_seq_length,
+                "input_names": input_names,
+            }, f)
+
+        try:
+            os.rename(tmp_dir, export_dir)
+            logger.info("✓ ONNX export written to %s", export_dir)
+        except OSError:
+            # Another worker finished its export first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return export_dir
+
+
+class OnnxBackend:
+    """ONNX Runtime session + mean pooling, matching SentenceTransformer output"""
+
+    name = "onnx"
+    model_file = "model.onnx"
+
+    def __init__(self, model_name):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        export_dir = export_onnx(model_name)
+        with open(os.path.join(export_dir, "pooling.json")) as f:
+            meta = json.load(f)
+        self._max_length = meta["max_seq_length"]
+        self._input_names = meta["input_names"]
+
+        self._tokenizer = AutoTokenizer.from_pretrained(export_dir)
+        options = ort.SessionOptions()
+        # One inference thread pool per worker; BERT_WORKERS threads share it
+        options.intra_op_num_threads = settings.BERT_ONNX_THREADS
+        self._session = ort.InferenceSession(
+            os.path.join(export_dir, self.model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+
+    def encode(self, texts):
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        tokens = self._tokenizer(
+            texts, padding=True, truncation=True, max_length=self._max_length, return_tensors="np"
+        )
+        feeds = {name: tokens[name].astype(np.int64) for name in self._input_names}
+        (hidden,) = self._session.run(["last_hidden_state"], feeds)
+
+        # Mean over real (non-padding) tokens. Models ending in a Normalize
+        # layer differ from this only in scale, which scoring ignores.
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        summed = (hidden * mask).sum(axis=1)
+        return (summed / np.clip(mask.sum(axis=1), 1e-9, None)).astype(np.float32)
+
+
+class QuantizedOnnxBackend(OnnxBackend):
+    """ONNX Runtime with dynamically quantized int8 weights"""
+
+    name = "int8"
+    model_file = "model-int8.onnx"
+
+
+def create_backend(name, model_name):
+    """
+    Instantiate an embedding backend
+
+    Args:
+        name (str): One of BACKENDS
+        model_name (str): SentenceTransformer model name
+
+    Returns:
+        object: Backend with encode(texts) -> N x dim float32 array
+    """
+    backends = {
+        "torch": TorchBackend,
+        "onnx": OnnxBackend,
+        "int8": QuantizedOnnxBackend,
+    }
+    try:
+        backend_class = backends[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown BERT_BACKEND: {name} (expected one of {', '.join(BACKENDS)})")
+    return backend_class(model_name)
@@ -0,0 +1,360 @@
+# app/services/job_queue.py
+
+"""
+Async job queue for quiz generation
+Jobs are persisted in SQLite so results (and queued inputs) survive a
+worker restart; a bounded pool of asyncio workers drains the queue. Workers
+claim a job atomically and hold a renewed lease on it, so processes sharing
+one store never run the same job twice and pick up each other's jobs once
+a lease runs out.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from app.config.settings import settings
+from app.services.quiz_pipeline import run_quiz_pipeline, QuizPipelineError
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when the queue is at JOB_QUEUE_MAX_DEPTH (maps to 429)"""
+
+
+class JobStore:
+    """SQLite-backed job records; inputs are kept only until the job finishes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " stage TEXT,"
+            " params TEXT NOT NULL,"
+            " result TEXT,"
+            " error TEXT,"
+            " status_code INTEGER,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " owner TEXT,"
+            " lease_until REAL)"
+        )
+        # Stores created before leases existed
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("lease_until", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_inputs ("
+            " job_id TEXT PRIMARY KEY,"
+            " data BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def create(self, job_id, params, data):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, stage, params, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, STATUS_QUEUED, STATUS_QUEUED, json.dumps(params), now, now)
+            )
+            self._conn.execute(
+                "INSERT INTO job_inputs (job_id, data) VALUES (?, ?)", (job_id, data)
+            )
+            self._conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, stage, params, result, error, status_code,"
+                " created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "status": row[1],
+            "stage": row[2],
+            "params": json.loads(row[3]),
+            "result": json.loads(row[4]) if row[4] else None,
+            "error": row[5],
+            "status_code": row[6],
+            "created_at": row[7],
+            "updated_at": row[8],
+        }
+
+    def get_input(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM job_inputs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def claim(self, job_id, owner, lease_seconds):
+        """
+        Take a job for owner: queued, or running under an expired lease
+
+        Returns:
+            bool: Whether this owner got it (one UPDATE, so exactly one
+                claimer wins)
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, lease_until = ?, updated_at = ?"
+                " WHERE id = ? AND (status = ? OR (status = ? AND (lease_until IS NULL OR lease_until < ?)))",
+                (STATUS_RUNNING, owner, now + lease_seconds, now, job_id, STATUS_QUEUED, STATUS_RUNNING, now)
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def renew(self, owner, job_ids, lease_seconds):
+        """Extend owner's leases on running jobs"""
+        if not job_ids:
+            return
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = ?"
+                f" AND id IN ({','.join('?' * len(job_ids))})",
+                (time.time() + lease_seconds, owner, STATUS_RUNNING, *job_ids)
+            )
+            self._conn.commit()
+
+    def update_stage(self, job_id, stage, owner):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET stage = ?, updated_at = ? WHERE id = ? AND owner = ? AND status = ?",
+                (stage, time.time(), job_id, owner, STATUS_RUNNING)
+            )
+            self._conn.commit()
+
+    def finish(self, job_id, result=None, error=None, status_code=None, owner=None):
+        """Record the outcome; with owner, only if that owner still holds the job"""
+        status = STATUS_FAILED if error else STATUS_DONE
+        query = (
+            "UPDATE jobs SET status = ?, stage = ?, result = ?, error = ?,"
+            " status_code = ?, updated_at = ?, lease_until = NULL WHERE id = ?"
+        )
+        params = [status, status, json.dumps(result) if result is not None else None,
+                  error, status_code, time.time(), job_id]
+        if owner is not None:
+            query += " AND owner = ?"
+            params.append(owner)
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            if cursor.rowcount == 1:
+                self._conn.execute("DELETE FROM job_inputs WHERE job_id = ?", (job_id,))
+            self._conn.commit()
+
+    def claimable_job_ids(self, queued_before):
+        """
+        Jobs nobody is working on: running under an expired lease, or queued
+        since before queued_before (their process may have died before
+        claiming them)
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE (status = ? AND updated_at < ?)"
+                " OR (status = ? AND (lease_until IS NULL OR lease_until < ?)) ORDER BY created_at",
+                (STATUS_QUEUED, queued_before, STATUS_RUNNING, now)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def purge(self, older_than):
+        """Delete finished jobs last updated before older_than (epoch seconds)"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (STATUS_DONE, STATUS_FAILED, older_than)
+            )
+            self._conn.commit()
+
+
+class JobQueue:
+    """
+    Bounded queue + fixed pool of asyncio workers running the quiz pipeline
+
+    Each uvicorn worker process runs its own queue over one shared SQLite
+    store, so any process can answer status/result lookups. A job runs only
+    after an atomic claim, under a lease renewed every third of
+    JOB_LEASE_SECONDS. Every JOB_SWEEP_INTERVAL the queue purges old results
+    and enqueues jobs whose lease expired (their process died) or that sat
+    queued for a whole lease; a job that doesn't fit stays in the store for
+    the next sweep.
+    """
+
+    def __init__(self, store, num_workers, max_depth):
+        self.store = store
+        self.num_workers = num_workers
+        self.max_depth = max_depth
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue = None
+        self._enqueued = set()
+        self._running = set()
+        self._workers = []
+        self._tasks = []
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_depth)
+        # Work interrupted by a restart is picked up by the first sweep
+        await self._sweep(queued_before=time.time())
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.num_workers)
+        ]
+        self._tasks = [asyncio.create_task(self._sweeper()), asyncio.create_task(self._heartbeat())]
+
+    async def stop(self):
+        for task in self._workers + self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._tasks, return_exceptions=True)
+        self._workers = []
+        self._tasks = []
+
+    def _enqueue(self, job_id):
+        if job_id in self._enqueued:
+            return True
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            return False
+        self._enqueued.add(job_id)
+        return True
+
+    async def _sweep(self, queued_before):
+        await asyncio.to_thread(self.store.purge, time.time() - settings.JOB_RESULT_TTL)
+        for job_id in await asyncio.to_thread(self.store.claimable_job_ids, queued_before):
+            if job_id not in self._running and not self._enqueue(job_id):
+                break
+
+    async def _sweeper(self):
+        while True:
+            await asyncio.sleep(settings.JOB_SWEEP_INTERVAL)
+            try:
+                await self._sweep(queued_before=time.time() - settings.JOB_LEASE_SECONDS)
+            except Exception as e:
+                logger.warning("Job sweep failed: %s", e)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+            try:
+                await asyncio.to_thread(
+                    self.store.renew, self.owner, list(self._running), settings.JOB_LEASE_SECONDS
+                )
+            except Exception as e:
+                logger.warning("Job lease renewal failed: %s", e)
+
+    def depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, data, params):
+        """
+        Persist a job and enqueue it
+
+        Args:
+            data (bytes): Raw document bytes
+            params (dict): Keyword arguments for run_quiz_pipeline
+
+        Returns:
+            str: The new job id
+
+        Raises:
+            QueueFullError: If JOB_QUEUE_MAX_DEPTH jobs are already waiting
+        """
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+        if self._queue.full():
+            raise QueueFullError(f"Job queue is full ({self.max_depth} jobs waiting)")
+
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(self.store.create, job_id, params, data)
+        if not self._enqueue(job_id):
+            # Lost a race with another submit while persisting
+            await asyncio.to_thread(
+                self.store.finish, job_id, None, "Job queue is full", 429
+            )
+            raise QueueFullError(f"Job queue is full ({self.max_depth} jobs waiting)")
+        return job_id
+
+    async def get(self, job_id):
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _worker(self, worker_id):
+        while True:
+            job_id = await self._queue.get()
+            self._enqueued.discard(job_id)
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id):
+        # Another process (or an earlier sweep) may already have it
+        if not await asyncio.to_thread(self.store.claim, job_id, self.owner, settings.JOB_LEASE_SECONDS):
+            return
+        self._running.add(job_id)
+        try:
+            await self._execute(job_id)
+        finally:
+            self._running.discard(job_id)
+
+    async def _execute(self, job_id):
+        job = await asyncio.to_thread(self.store.get, job_id)
+        data = await asyncio.to_thread(self.store.get_input, job_id)
+        if job is None:
+            return
+        if data is None:
+            await asyncio.to_thread(self.store.finish, job_id, None, "Job input is missing", 500, self.owner)
+            return
+
+        async def on_stage(stage):
+            await asyncio.to_thread(self.store.update_stage, job_id, stage, self.owner)
+
+        try:
+            quiz = await run_quiz_pipeline(data, on_stage=on_stage, **job["params"])
+            await asyncio.to_thread(self.store.finish, job_id, quiz, owner=self.owner)
+        except QuizPipelineError as e:
+            await asyncio.to_thread(self.store.finish, job_id, None, str(e), e.status_code, self.owner)
+        except Exception as e:
+            logger.exception("❌ Job %s failed: %s", job_id, e)
+            await asyncio.to_thread(self.store.finish, job_id, None, str(e), 500, self.owner)
+
+
+_job_queue = None
+
+
+def get_job_queue():
+    """Return the shared job queue configured from settings"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(
+            JobStore(settings.JOB_STORE_PATH),
+            num_workers=settings.JOB_WORKERS,
+            max_depth=settings.JOB_QUEUE_MAX_DEPTH
+        )
+    return _job_queue
@@ -0,0 +1,137 @@
+# app/services/lexical_classifier.py
+
+"""
+Lexical LOTS/HOTS pre-classifier
+Questions that open with a Bloom's keyword used as an instruction
+("Define the...", "List three...", "Design an...", "Why...?") are decided
+by compiled regexes in microseconds; only ambiguous questions go on to BERT
+"""
+
+import re
+
+from app.utils.blooms_taxonomy import get_taxonomy
+
+
+def _normalize_keyword(keyword):
+    return " ".join(keyword.lower().split())
+
+
+# Words that open the object of an imperative ("Define the...", "List three...",
+# "Explain why..."). A keyword followed by anything else may be a noun
+# ("Rate of reaction...", "State capitals...") and is left to BERT.
+OBJECT_STARTERS = {
+    "a", "an", "the", "this", "that", "these", "those", "each", "every", "all",
+    "any", "both", "some", "one", "two", "three", "four", "five", "several",
+    "your", "their", "its", "his", "her", "our", "my",
+    "how", "why", "what", "whether", "which", "who", "when", "where",
+    "between", "among",
+}
+WH_WORDS = {"who", "what", "when", "where", "which", "why", "how"}
+
+
+class LexicalClassifier:
+    """
+    Keyword matcher built from one taxonomy snapshot
+
+    A question is decided only when
+    - it is not a true/false item (those are statements, not instructions),
+    - it starts with a keyword (after optional quotes or "1." style numbering),
+    - the keyword is used as an instruction: a verb followed by a colon, a
+      number or one of OBJECT_STARTERS, or a wh-word in a question ending
+      with "?" ("When heated, water expands." is a statement),
+    - that keyword belongs to a single category ("examine" is in both), and
+    - no keyword of the other category appears later in the question.
+    Everything else returns None and is left to BERT.
+    """
+
+    def __init__(self, taxonomy):
+        self.taxonomy = taxonomy
+        self._keywords = {}
+        ambiguous = set()
+        for level in taxonomy["levels"]:
+            for keyword in level["keywords"]:
+                key = _normalize_keyword(keyword)
+                previous = self._keywords.get(key)
+                if previous is None:
+                    self._keywords[key] = (level["category"], level["name"])
+                elif previous[0] != level["category"]:
+                    ambiguous.add(key)
+        self._ambiguous = ambiguous
+
+        # Longest first, so "what if" wins over "what" and
+        # "compare and contrast" over any shorter keyword
+        alternation = "|".join(
+            r"\s+".join(re.escape(word) for word in key.split())
+            for key in sorted(self._keywords, key=len, reverse=True)
+        )
+        self._leading = re.compile(
+            r"^[\s\"'(\[]*(?:(?:\d+|[a-z])[.)]\s+)?(?P<keyword>" + alternation + r")\b",
+            re.IGNORECASE
+        )
+        self._anywhere = re.compile(r"\b(?:" + alternation + r")\b", re.IGNORECASE)
+        self._next_word = re.compile(r"\s*(?::|(?P<word>[a-z0-9]+))", re.IGNORECASE)
+
+    def _is_instruction(self, question_text, keyword, end):
+        if keyword.split()[0] in WH_WORDS:
+            return question_text.rstrip().endswith("?")
+        following = self._next_word.match(question_text, end)
+        if following is None:
+            return False
+        word = following.group("word")
+        return word is None or word.isdigit() or word.lower() in OBJECT_STARTERS
+
+    def classify(self, question_text, question_type=None):
+        """
+        Decide a question from its keywords alone
+
+        Args:
+            question_text (str): The question to classify
+            question_type (str): multiple_choice, true_false or
+                identification, if known
+
+        Returns:
+            dict: Detailed classification (same keys as BERT's, method "lexical"),
+                or None if the question is ambiguous. A keyword match has no
+                similarity scores, so confidence and the LOTS/HOTS scores are
+                None rather than numbers on a different scale from BERT's.
+        """
+        if not question_text or question_type == "true_false":
+            return None
+        match = self._leading.match(question_text)
+        if match is None:
+            return None
+
+        keyword = _normalize_keyword(match.group("keyword"))
+        if keyword in self._ambiguous or not self._is_instruction(question_text, keyword, match.end()):
+            return None
+        category, level = self._keywords[keyword]
+
+        for other in self._anywhere.finditer(question_text, match.end()):
+            other_keyword = _normalize_keyword(other.group(0))
+            if other_keyword in self._ambiguous or self._keywords[other_keyword][0] != category:
+                return None
+
+        return {
+            "classification": category,
+            "confidence": None,
+            "lots_score": None,
+            "hots_score": None,
+            "difference": None,
+            "bloom_level": level,
+            "matched_keyword": keyword,
+            "method": "lexical"
+        }
+
+
+_classifier = None
+
+
+def get_lexical_classifier():
+    """Return the matcher for the current taxonomy (rebuilt after a reload)"""
+    global _classifier
+    taxonomy = get_taxonomy()
+    classifier = _classifier
+    if classifier is None or classifier.taxonomy is not taxonomy:
+        classifier = LexicalClassifier(taxonomy)
+        _classifier = classifier
+    return classifier
@@ -0,0 +1,268 @@
+# app/services/long_document.py
+
+"""
+Long-document quiz generation
+Splits the full text into token-budgeted chunks, generates questions for
+each chunk concurrently, then merges them into one quiz that covers the
+whole document
+"""
+
+import asyncio
+import logging
+import math
+import re
+
+from app.config.settings import settings
+from app.services.gemini_service import generate_quiz_from_text_async, generate_top_up, source_key
+from app.services.prompt_builder import count_tokens
+from app.services.question_dedup import dedup_quiz, index_quiz
+
+logger = logging.getLogger(__name__)
+
+QUESTION_TYPES = ["multiple_choice", "true_false", "identification"]
+
+def split_into_chunks(text, chunk_tokens):
+    """
+    Split text into chunks of at most chunk_tokens, breaking on line boundaries
+
+    Args:
+        text (str): Full document text
+        chunk_tokens (int): Token budget per chunk
+
+    Returns:
+        list: Chunk strings in document order
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for line in text.splitlines():
+        line_tokens = count_tokens(line)
+        if line_tokens > chunk_tokens:
+            # Hard-split lines that alone exceed the budget, on word boundaries
+            pieces, piece, piece_tokens = [], [], 0
+            for word in line.split():
+                word_tokens = count_tokens(word)
+                if piece and piece_tokens + word_tokens > chunk_tokens:
+                    pieces.append((" ".join(piece), piece_tokens))
+                    piece, piece_tokens = [], 0
+                piece.append(word)
+                piece_tokens += word_tokens
+            pieces.append((" ".join(piece), piece_tokens))
+        else:
+            pieces = [(line, line_tokens)]
+
+        for piece, piece_tokens in pieces:
+            if current and current_tokens + piece_tokens > chunk_tokens:
+                chunks.append("\n".join(current).strip())
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += piece_tokens
+
+    if current:
+        chunks.append("\n".join(current).strip())
+
+    return [chunk for chunk in chunks if chunk]
+
+
+def allocate_counts(counts, num_chunks, oversample):
+    """
+    Spread the requested per-type counts over the chunks
+
+    Counts are oversampled so duplicates can be dropped at merge time, and
+    every chunk is asked for at least one question so the whole document
+    is covered.
+
+    Args:
+        counts (dict): Requested count per question type
+        num_chunks (int): Number of chunks
+        oversample (float): Multiplier applied to each requested count
+
+    Returns:
+        list: One {question_type: count} dict per chunk
+    """
+    plan = [{qtype: 0 for qtype in QUESTION_TYPES} for _ in range(num_chunks)]
+
+    # A single slot counter across types spreads questions evenly
+    slot = 0
+    for qtype in QUESTION_TYPES:
+        wanted = math.ceil(counts[qtype] * oversample) if counts[qtype] else 0
+        for _ in range(wanted):
+            plan[slot % num_chunks][qtype] += 1
+            slot += 1
+
+    requested_types = [qtype for qtype in QUESTION_TYPES if counts[qtype]]
+    if requested_types:
+        for i, chunk_plan in enumerate(plan):
+            if not any(chunk_plan.values()):
+                chunk_plan[requested_types[i % len(requested_types)]] = 1
+
+    return plan
+
+
+def _normalize_question(question_text):
+    return re.sub(r"[^a-z0-9]+", " ", question_text.lower()).strip()
+
+
+def merge_chunk_quizzes(chunk_quizzes, counts):
+    """
+    Merge per-chunk quizzes, dropping duplicates and picking round-robin by chunk
+
+    Args:
+        chunk_quizzes (list): Quiz dicts in document order (None for failed chunks)
+        counts (dict): Requested count per question type
+
+    Returns:
+        tuple: (merged quiz dict, {question_type: shortfall})
+    """
+    seen = set()
+    merged = {}
+    shortfall = {}
+
+    for qtype in QUESTION_TYPES:
+        # Unique candidates per chunk, in order
+        per_chunk = []
+        for quiz in chunk_quizzes:
+            candidates = []
+            for item in (quiz or {}).get(qtype, []):
+                key = _normalize_question(item.get("question", ""))
+                if key and key not in seen:
+                    seen.add(key)
+                    candidates.append(item)
+            per_chunk.append(candidates)
+
+        # Round-robin across chunks so every section contributes
+        selected = []
+        depth = 0
+        while len(selected) < counts[qtype] and any(depth < len(c) for c in per_chunk):
+            for candidates in per_chunk:
+                if depth < len(candidates) and len(selected) < counts[qtype]:
+                    selected.append(candidates[depth])
+            depth += 1
+
+        merged[qtype] = selected
+        shortfall[qtype] = counts[qtype] - len(selected)
+
+    return merged, shortfall
+
+
+def _fill_shortfall(merged, extra, counts):
+    """Append unique questions from a top-up quiz until each type is full"""
+    seen = {
+        _normalize_question(item.get("question", ""))
+        for qtype in QUESTION_TYPES for item in merged[qtype]
+    }
+    for qtype in QUESTION_TYPES:
+        for item in extra.get(qtype, []):
+            if len(merged[qtype]) >= counts[qtype]:
+                break
+            key = _normalize_question(item.get("question", ""))
+            if key and key not in seen:
+                seen.add(key)
+                merged[qtype].append(item)
+    return merged
+
+
+def document_chunks(text):
+    """
+    Split a whole document into at most LONG_DOC_MAX_CHUNKS chunks
+
+    Returns:
+        tuple: (chunks, chunk_tokens)
+    """
+    # Grow the chunk size rather than exceed LONG_DOC_MAX_CHUNKS calls
+    chunk_tokens = max(
+        settings.LONG_DOC_CHUNK_TOKENS,
+        math.ceil(count_tokens(text) / settings.LONG_DOC_MAX_CHUNKS)
+    )
+    chunks = split_into_chunks(text, chunk_tokens)
+    while len(chunks) > settings.LONG_DOC_MAX_CHUNKS:
+        # Line-boundary splitting leaves slack, so widen until it fits
+        chunk_tokens = math.ceil(chunk_tokens * 1.1)
+        chunks = split_into_chunks(text, chunk_tokens)
+    return chunks, chunk_tokens
+
+
+async def generate_quiz_from_long_text(
+    text: str,
+    num_multiple_choice: int = 5,
+    num_true_false: int = 5,
+    num_identification: int = 5
+) -> dict:
+    """
+    Generate a quiz covering the whole document with concurrent Gemini calls.
+
+    Latency is close to a single call: chunks are generated in parallel under
+    GEMINI_MAX_CONCURRENCY, then merged and topped up if anything is missing.
+    """
+    counts = {
+        "multiple_choice": num_multiple_choice,
+        "true_false": num_true_false,
+        "identification": num_identification,
+    }
+
+    chunks, chunk_tokens = await asyncio.to_thread(document_chunks, text)
+
+    if len(chunks) <= 1:
+        return await generate_quiz_from_text_async(
+            text, num_multiple_choice, num_true_false, num_identification,
+            max_input_tokens=chunk_tokens
+        )
+
+    plan = allocate_counts(counts, len(chunks), settings.LONG_DOC_OVERSAMPLE)
+    # Chunks dedup against the whole document's earlier questions, but only
+    # the merged selection is indexed (oversampled extras are discarded)
+    source = source_key(text)
+    semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+
+    async def generate_chunk(chunk, chunk_plan):
+        if not any(chunk_plan.values()):
+            return None
+        async with semaphore:
+            return await generate_quiz_from_text_async(
+                chunk,
+                chunk_plan["multiple_choice"],
+                chunk_plan["true_false"],
+                chunk_plan["identification"],
+                max_input_tokens=chunk_tokens,
+                source=source,
+                index_questions=False
+            )
+
+    logger.info("📚 Long document: %d chunks of ~%d tokens", len(chunks), chunk_tokens)
+    results = await asyncio.gather(
+        *(generate_chunk(chunk, chunk_plan) for chunk, chunk_plan in zip(chunks, plan)),
+        return_exceptions=True
+    )
+
+    failures = [r for r in results if isinstance(r, Exception)]
+    if len(failures) == len(results):
+        raise failures[0]
+    chunk_quizzes = [None if isinstance(r, Exception) else r for r in results]
+
+    merged, shortfall = merge_chunk_quizzes(chunk_quizzes, counts)
+
+    # Chunks were each deduplicated; catch paraphrases across chunks too
+    merged = await dedup_quiz(merged, counts, use_index=False)
+    shortfall = {qtype: counts[qtype] - len(merged[qtype]) for qtype in QUESTION_TYPES}
+
+    if any(shortfall.values()):
+        # Reallocate the missing questions to the chunk that contributed least
+        contributed = [
+            sum(1 for qtype in QUESTION_TYPES for item in merged[qtype]
+                if quiz and item in quiz.get(qtype, []))
+            for quiz in chunk_quizzes
+        ]
+        target = contributed.index(min(contributed))
+        try:
+            existing = [item["question"] for qtype in QUESTION_TYPES for item in merged[qtype]]
+            extra = await generate_top_up(
+                chunks[target], shortfall, existing, max_input_tokens=chunk_tokens
+            )
+            merged = _fill_shortfall(merged, extra, counts)
+        except Exception as e:
+            logger.warning("Top-up failed, returning a short quiz: %s", e)
+
+    await index_quiz(merged, source)
+    return merged
@@ -0,0 +1,290 @@
+# app/services/micro_batcher.py
+
+"""
+In-process micro-batcher for BERT classification
+Concurrent single-question calls are gathered for up to max_wait_ms and
+run as one encode batch in the BERT thread pool. The shared entry point
+(get_classification_batcher) puts the lexical pre-classifier in front and
+swaps in the sidecar client when one is configured.
+"""
+
+import asyncio
+
+import numpy as np
+
+from app.config.settings import settings
+from app.utils.executors import run_in_bert_executor
+from app.services.bert_classifier import (
+    encode_questions,
+    get_detailed_classifications,
+    get_classifier_status,
+    reload_keyword_index,
+)
+from app.services.classifier_client import RemoteClassifier
+from app.services.embedding_cache import get_embedding_cache
+from app.services.lexical_classifier import get_lexical_classifier
+from app.utils.blooms_taxonomy import load_taxonomy, set_taxonomy
+
+
+class MicroBatcher:
+    """
+    Collects items from concurrent callers and runs batch_fn on them together
+
+    A batch is flushed when it reaches max_batch_size or when the oldest
+    waiting item has waited max_wait_ms, whichever comes first. State is
+    only touched from the event loop, so no locks are needed.
+    """
+
+    def __init__(self, batch_fn, max_batch_size, max_wait_ms):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = []  # (item, future)
+        self._timer = None
+        self._tasks = set()  # keep running batches referenced until done
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item):
+        """Queue one item and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+        return await future
+
+    async def submit_many(self, items):
+        """Queue several items (split into max_batch_size batches) and wait for all"""
+        return list(await asyncio.gather(*(self.submit(item) for item in items)))
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        items = [item for item, _ in batch]
+        self.batches += 1
+        self.items += len(items)
+        try:
+            results = await run_in_bert_executor(self.batch_fn, items)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+class LexicalFirstBatcher:
+    """
+    Lexical pre-classifier in front of a BERT batcher
+
+    Questions the keyword matcher can decide are answered right here in the
+    event loop (no thread hop, no sidecar round trip); only the rest are
+    passed to the wrapped batcher.
+    """
+
+    def __init__(self, bert_batcher):
+        self.bert_batcher = bert_batcher
+        self.questions = 0
+        self.short_circuited = 0
+
+    async def submit(self, question, question_type=None):
+        """Classify one question; returns its detailed classification dict"""
+        return (await self.submit_many([question], [question_type]))[0]
+
+    async def submit_many(self, questions, question_types=None):
+        """Classify several questions, sending only undecided ones to BERT"""
+        questions = list(questions)
+        question_types = list(question_types or [None] * len(questions))
+        lexical = get_lexical_classifier()
+        results = [
+            lexical.classify(question, question_type)
+            for question, question_type in zip(questions, question_types)
+        ]
+        pending = [i for i, result in enumerate(results) if result is None]
+
+        self.questions += len(questions)
+        self.short_circuited += len(questions) - len(pending)
+
+        if pending:
+            bert_results = await self.bert_batcher.submit_many([questions[i] for i in pending])
+            for i, result in zip(pending, bert_results):
+                results[i] = result
+        return results
+
+    def stats(self):
+        return {
+            "questions": self.questions,
+            "short_circuited": self.short_circuited,
+            "short_circuit_rate": round(self.short_circuited / self.questions, 4) if self.questions else 0.0,
+        }
+
+
+async def classify_questions(questions):
+    """
+    Detailed classification of formatted question dicts
+
+    Their types reach the lexical pre-classifier, which leaves true/false
+    statements to BERT.
+
+    Returns:
+        list: One detailed classification dict per question
+    """
+    batcher = get_classification_batcher()
+    texts = [question['question'] for question in questions]
+    if isinstance(batcher, LexicalFirstBatcher):
+        return await batcher.submit_many(texts, [question.get('type') for question in questions])
+    return await batcher.submit_many(texts)
+
+
+def annotate_question(question, result):
+    """
+    Copy a detailed classification onto a question dict (in place)
+
+    classification_method says which classifier decided ("lexical", "bert"
+    or "default"); classification_confidence is BERT's similarity score and
+    None for keyword-decided questions, which have no comparable score.
+    """
+    confidence = result.get('confidence')
+    question['bloom_classification'] = result['classification']
+    question['classification_confidence'] = round(confidence, 4) if confidence is not None else None
+    question['classification_method'] = result.get('method', 'bert')
+
+
+_bert_batcher = None
+_classification_batcher = None
+
+
+def create_local_batcher():
+    """Micro-batcher running detailed BERT classification in this process"""
+    return MicroBatcher(
+        get_detailed_classifications,
+        max_batch_size=settings.BERT_BATCH_MAX_SIZE,
+        max_wait_ms=settings.BERT_BATCH_MAX_WAIT_MS
+    )
+
+
+def get_bert_batcher():
+    """
+    Return the shared batcher that runs BERT itself
+
+    With BERT_SERVER_SOCKET set this is a client for the classifier sidecar,
+    and this process never loads the model.
+    """
+    global _bert_batcher
+    if _bert_batcher is None:
+        if settings.BERT_SERVER_SOCKET:
+            _bert_batcher = RemoteClassifier(settings.BERT_SERVER_SOCKET)
+        else:
+            _bert_batcher = create_local_batcher()
+    return _bert_batcher
+
+
+def get_classification_batcher():
+    """
+    Return the shared entry point for detailed classification
+
+    The lexical pre-classifier (LEXICAL_PRECLASSIFIER) in front of the BERT
+    batcher, or the BERT batcher alone.
+    """
+    global _classification_batcher
+    if _classification_batcher is None:
+        if settings.LEXICAL_PRECLASSIFIER:
+            _classification_batcher = LexicalFirstBatcher(get_bert_batcher())
+        else:
+            _classification_batcher = get_bert_batcher()
+    return _classification_batcher
+
+
+async def classifier_status():
+    """Classifier load state, from the sidecar if one is configured"""
+    batcher = get_bert_batcher()
+    if isinstance(batcher, RemoteClassifier):
+        try:
+            return (await batcher.server_status())["status"]
+        except (OSError, ConnectionError) as e:
+            return {"state": "error", "model": settings.BERT_MODEL_NAME,
+                    "error": f"Classifier server unreachable: {e}"}
+    return get_classifier_status()
+
+
+async def classifier_stats():
+    """Lexical, batching and embedding cache stats, from the sidecar if one is configured"""
+    batcher = get_bert_batcher()
+    if isinstance(batcher, RemoteClassifier):
+        server = await batcher.server_status()
+        stats = {
+            "client": batcher.stats(),
+            "batcher": server["batcher"],
+            "embedding_cache": server["embedding_cache"],
+        }
+    else:
+        stats = {
+            "batcher": batcher.stats(),
+            "embedding_cache": await asyncio.to_thread(get_embedding_cache().stats),
+        }
+
+    front = get_classification_batcher()
+    if isinstance(front, LexicalFirstBatcher):
+        stats["lexical"] = front.stats()
+    return stats
+
+
+async def embed_questions(questions):
+    """
+    Question embeddings from the classifier's model, from the sidecar if one is configured
+
+    In-process they go through the question embedding cache, so classifying
+    the same questions afterwards doesn't encode them again.
+
+    Returns:
+        np.ndarray: N x dim float32 embeddings
+    """
+    batcher = get_bert_batcher()
+    if isinstance(batcher, RemoteClassifier):
+        return np.asarray(await batcher.embed(questions), dtype=np.float32)
+    return await run_in_bert_executor(encode_questions, list(questions))
+
+
+async def reload_classifier_taxonomy():
+    """
+    Re-read the Bloom's taxonomy file and swap in new keyword embeddings
+
+    Reloads the sidecar if one is configured, otherwise this process. Other
+    workers pick up the changed file on their next classification (within
+    TAXONOMY_CHECK_INTERVAL); the lexical matcher follows automatically.
+    """
+    batcher = get_bert_batcher()
+    if isinstance(batcher, RemoteClassifier):
+        # Validate here first so a bad file is reported as TaxonomyError
+        taxonomy = load_taxonomy()
+        summary = await batcher.reload_taxonomy()
+        # Keep this worker's view (/classification-keywords) in step
+        set_taxonomy(taxonomy)
+        return summary
+    return await run_in_bert_executor(reload_keyword_index)
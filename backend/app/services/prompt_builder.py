@@ -0,0 +1,393 @@
+# app/services/prompt_builder.py
+
+"""
+Token-budgeted Gemini prompts
+- count_tokens(): local token estimate (no countTokens round trip)
+- clean_document(): drops running headers/footers, page numbers and
+  repeated lines across the PDF's pages
+- fit_to_budget(): fills the input token budget with the most informative
+  sentences, kept in document order
+- output_token_budget(): max_output_tokens sized from the question counts
+  plus the fixed thinking budget
+- build_quiz_prompt() / generation_config(): compact instructions, with the
+  quiz structure enforced through Gemini's JSON mode and response schema
+  instead of an example object in every prompt
+"""
+
+import heapq
+import math
+import re
+from collections import Counter
+
+from app.config.settings import settings
+from app.utils.pdf_extractor import PAGE_BREAK
+
+QUESTION_TYPES = ["multiple_choice", "true_false", "identification"]
+
+# Rough output tokens per question of each type (question, answer and JSON keys)
+OUTPUT_TOKENS_PER_QUESTION = {
+    "multiple_choice": 90,
+    "true_false": 40,
+    "identification": 50,
+}
+OUTPUT_TOKEN_OVERHEAD = 32
+OUTPUT_TOKEN_MARGIN = 1.3
+MIN_OUTPUT_TOKENS = 256
+
+# Windows a text longer than PROMPT_SELECT_MAX_CHARS is sampled in
+SCAN_WINDOWS = 8
+
+# Budget for the "do not repeat" list of top-up prompts
+EXCLUDE_TOKEN_BUDGET = 600
+
+# A short line is boilerplate when it repeats on this share of the pages
+BOILERPLATE_PAGE_SHARE = 0.5
+BOILERPLATE_MIN_PAGES = 3
+BOILERPLATE_MAX_CHARS = 100
+
+# Words, single digits (Gemini splits numbers digit by digit) and punctuation
+_TOKEN_PATTERN = re.compile(r"[^\W\d_]+|\d|[^\w\s]")
+# Word pieces of this many characters count as one more token
+_CHARS_PER_WORD_PIECE = 6
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])|\n{2,}")
+_WORD = re.compile(r"[a-z][a-z'-]+")
+_PAGE_NUMBER = re.compile(r"^(page\s*)?\d+(\s*(of|/)\s*\d+)?$", re.IGNORECASE)
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+he her here hers herself him himself his how i if in into is it its itself just may me might more most must
+my myself no nor not now of off on once only or other our ours ourselves out over own same she should so
+some such than that the their theirs them themselves then there these they this those through to too under
+until up upon very was we were what when where which while who whom why will with would you your yours
+yourself yourselves
+""".split())
+
+QUIZ_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "multiple_choice": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "question": {"type": "string"},
+                    "choices": {"type": "array", "items": {"type": "string"}},
+                    "correct_answer": {"type": "integer"},
+                    "points": {"type": "integer"},
+                },
+                "required": ["question", "choices", "correct_answer", "points"],
+            },
+        },
+        "true_false": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "question": {"type": "string"},
+                    "correct_answer": {"type": "boolean"},
+                    "points": {"type": "integer"},
+                },
+                "required": ["question", "correct_answer", "points"],
+            },
+        },
+        "identification": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "question": {"type": "string"},
+                    "correct_answer": {"type": "string"},
+                    "points": {"type": "integer"},
+                },
+                "required": ["question", "correct_answer", "points"],
+            },
+        },
+    },
+    "required": QUESTION_TYPES,
+}
+
+# Without JSON mode the structure has to be spelled out, in one line
+_INLINE_FORMAT = (
+    'Return ONLY this JSON object, no markdown: {"multiple_choice": [{"question": str, '
+    '"choices": [4 str], "correct_answer": int, "points": int}], "true_false": [{"question": str, '
+    '"correct_answer": bool, "points": int}], "identification": [{"question": str, '
+    '"correct_answer": str, "points": int}]}'
+)
+
+
+def count_tokens(text):
+    """
+    Estimate Gemini tokens locally
+
+    Counts words (long ones as several pieces), digits and punctuation,
+    which tracks SentencePiece counts far closer than a flat characters
+    per token ratio on technical text.
+
+    Args:
+        text (str): Any text
+
+    Returns:
+        int: Estimated token count
+    """
+    tokens = 0
+    for piece in _TOKEN_PATTERN.findall(text):
+        tokens += 1 + (len(piece) - 1) // _CHARS_PER_WORD_PIECE
+    return tokens
+
+
+def _line_key(line):
+    # Page numbers and dates inside running headers change from page to page
+    return re.sub(r"\d+", "#", " ".join(line.lower().split()))
+
+
+def clean_document(text):
+    """
+    Strip PDF boilerplate before the text is budgeted
+
+    Short lines repeated on at least half of the pages (running headers
+    and footers, numbers ignored) and bare page numbers are removed, and a
+    long line that already appeared earlier in the document is kept only
+    once.
+
+    Args:
+        text (str): Extracted text, pages separated by PAGE_BREAK
+
+    Returns:
+        str: Cleaned text (pages still separated by PAGE_BREAK)
+    """
+    pages = [page.splitlines() for page in text.split(PAGE_BREAK)]
+    boilerplate = set()
+    if len(pages) >= BOILERPLATE_MIN_PAGES:
+        per_page = Counter(key for lines in pages for key in {_line_key(line) for line in lines if line.strip()})
+        boilerplate = {
+            key for key, count in per_page.items()
+            if len(key) <= BOILERPLATE_MAX_CHARS
+            and count >= max(BOILERPLATE_MIN_PAGES, len(pages) * BOILERPLATE_PAGE_SHARE)
+        }
+
+    seen = set()
+    cleaned_pages = []
+    for lines in pages:
+        kept = []
+        for line in lines:
+            stripped = line.strip()
+            key = _line_key(stripped)
+            if not stripped:
+                kept.append("")
+                continue
+            if key in boilerplate or _PAGE_NUMBER.match(stripped):
+                continue
+            # Only long lines: short ones ("Example", "Summary") legitimately repeat
+            if len(stripped) >= 40:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(line)
+        cleaned_pages.append("\n".join(kept).strip())
+    cleaned = PAGE_BREAK.join(page for page in cleaned_pages if page)
+    return cleaned or text
+
+
+def split_sentences(text):
+    """Sentences of the text in order (page breaks and line wraps joined)"""
+    text = text.replace(PAGE_BREAK, "\n\n")
+    sentences = []
+    for block in _SENTENCE_SPLIT.split(text):
+        sentence = " ".join(block.split())
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def fit_to_budget(text, max_tokens=None):
+    """
+    Fill an input token budget with the document's most informative sentences
+
+    Text that already fits is returned unchanged (apart from page breaks).
+    Otherwise sentences are scored by how frequent their content words are
+    in the whole text, picked greedily, and each pick halves the weight of
+    its words so the selection covers different topics (SumBasic). Exact
+    repeats are skipped; the result keeps document order.
+
+    Scores only ever drop, so candidates sit in a heap and are re-scored
+    when they reach the top (O(S log S) instead of a rescan per pick).
+    Text beyond PROMPT_SELECT_MAX_CHARS is sampled in SCAN_WINDOWS evenly
+    spaced windows first. CPU-bound: call it off the event loop.
+
+    Args:
+        text (str): Cleaned document text
+        max_tokens (int): Budget (defaults to PROMPT_INPUT_TOKENS)
+
+    Returns:
+        str: The selected text
+    """
+    max_tokens = max_tokens or settings.PROMPT_INPUT_TOKENS
+    text = _sample_windows(text.replace(PAGE_BREAK, "\n"), settings.PROMPT_SELECT_MAX_CHARS)
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    sentences = []
+    seen = set()
+    for sentence in split_sentences(text):
+        key = " ".join(_WORD.findall(sentence.lower()))
+        if key and key not in seen:
+            seen.add(key)
+            words = [w for w in _WORD.findall(sentence.lower()) if w not in STOPWORDS]
+            sentences.append((sentence, words, count_tokens(sentence)))
+
+    frequencies = Counter(word for _, words, _ in sentences for word in words)
+    total = sum(frequencies.values()) or 1
+    weights = {word: count / total for word, count in frequencies.items()}
+
+    def score(i):
+        words = sentences[i][1]
+        return sum(weights[w] for w in words) / len(words)
+
+    chosen = set()
+    used = 0
+    # (-score, index): ties go to the earlier sentence
+    heap = [(-score(i), i) for i, (_, words, _) in enumerate(sentences) if len(words) >= 3]
+    heapq.heapify(heap)
+    while heap and used < max_tokens:
+        stale, best = heapq.heappop(heap)
+        current = -score(best)
+        if current != stale:
+            # Its words were down-weighted by an earlier pick
+            heapq.heappush(heap, (current, best))
+            continue
+        sentence_tokens = sentences[best][2]
+        if used + sentence_tokens > max_tokens:
+            continue
+        chosen.add(best)
+        used += sentence_tokens
+        for word in set(sentences[best][1]):
+            weights[word] *= 0.5
+
+    if not chosen:
+        # Not even one sentence fits: fall back to the start of the text
+        return _truncate_to_tokens(text, max_tokens)
+    return " ".join(sentences[i][0] for i in sorted(chosen))
+
+
+def _sample_windows(text, max_chars):
+    """Evenly spaced windows of text totalling about max_chars (cut at whitespace)"""
+    if len(text) <= max_chars:
+        return text
+    window = max_chars // SCAN_WINDOWS
+    stride = len(text) // SCAN_WINDOWS
+    parts = []
+    for start in range(0, stride * SCAN_WINDOWS, stride):
+        part = text[start:start + window]
+        # Drop the partial words (and sentence ends) at both edges
+        part = part[part.find(" ") + 1:part.rfind(" ")] if start else part[:part.rfind(" ")]
+        parts.append(part)
+    return "\n\n".join(parts)
+
+
+def _truncate_to_tokens(text, max_tokens):
+    used = 0
+    for match in re.finditer(r"\S+", text):
+        used += count_tokens(match.group())
+        if used > max_tokens:
+            return text[:match.start()].rstrip()
+    return text
+
+
+def output_token_budget(counts):
+    """
+    max_output_tokens for a quiz of these counts
+
+    The answer is sized from per-type estimates with a safety margin (a
+    truncated response still yields its completed questions plus a top-up)
+    and capped at GEMINI_MAX_OUTPUT_TOKENS. Thinking models count thinking
+    tokens against max_output_tokens, so GEMINI_THINKING_BUDGET (the budget
+    generation_config sets) is added on top.
+
+    Args:
+        counts (dict): Question count per type
+
+    Returns:
+        int: Token limit
+    """
+    needed = OUTPUT_TOKEN_OVERHEAD + sum(
+        OUTPUT_TOKENS_PER_QUESTION[qtype] * counts.get(qtype, 0) for qtype in QUESTION_TYPES
+    )
+    answer = min(max(MIN_OUTPUT_TOKENS, math.ceil(needed * OUTPUT_TOKEN_MARGIN)), settings.GEMINI_MAX_OUTPUT_TOKENS)
+    return answer + max(settings.GEMINI_THINKING_BUDGET, 0)
+
+
+def _exclude_section(questions):
+    listed = []
+    used = 0
+    for question in questions:
+        used += count_tokens(question) + 2
+        if used > EXCLUDE_TOKEN_BUDGET:
+            break
+        listed.append(f"- {question}")
+    if not listed:
+        return ""
+    return "Do NOT repeat any of these existing questions:\n" + "\n".join(listed) + "\n"
+
+
+def build_quiz_prompt(text, counts, exclude_questions=None, focus=None, json_mode=None):
+    """
+    Build the quiz generation prompt
+
+    Args:
+        text (str): Document text, already fitted to the input budget
+        counts (dict): Question count per type
+        exclude_questions (list): Questions the model must not repeat
+            (trimmed to EXCLUDE_TOKEN_BUDGET)
+        focus (str): Extra instruction on the kind of question wanted
+        json_mode (bool): The response schema enforces the structure
+            (defaults to GEMINI_JSON_MODE)
+
+    Returns:
+        str: The prompt
+    """
+    if json_mode is None:
+        json_mode = settings.GEMINI_JSON_MODE
+    focus_section = f"{focus}\n" if focus else ""
+    exclude_section = _exclude_section(exclude_questions or [])
+    format_section = "" if json_mode else f"{_INLINE_FORMAT}\n"
+
+    return (
+        "You are an expert educator. Write quiz questions based only on the text below.\n\n"
+        f"TEXT:\n{text}\n\n"
+        "Generate exactly:\n"
+        f"- {counts['multiple_choice']} Multiple Choice questions (4 choices; correct_answer is the index of the right one)\n"
+        f"- {counts['true_false']} True/False questions\n"
+        f"- {counts['identification']} Identification questions (short answer)\n"
+        "Every question is worth 1 point.\n"
+        f"{focus_section}{exclude_section}{format_section}"
+    )
+
+
+def generation_config(counts, json_mode=None):
+    """
+    Gemini generation config for a quiz of these counts
+
+    Args:
+        counts (dict): Question count per type
+        json_mode (bool): Request JSON with QUIZ_RESPONSE_SCHEMA (defaults
+            to GEMINI_JSON_MODE)
+
+    Returns:
+        dict: Sampling parameters, max_output_tokens, the thinking budget
+            and the response schema
+    """
+    if json_mode is None:
+        json_mode = settings.GEMINI_JSON_MODE
+    config = {
+        "temperature": 0.7,
+        "top_p": 0.95,
+        "top_k": 40,
+        "max_output_tokens": output_token_budget(counts),
+        "thinking_config": {"thinking_budget": max(settings.GEMINI_THINKING_BUDGET, 0)},
+    }
+    if json_mode:
+        config["response_mime_type"] = "application/json"
+        config["response_schema"] = QUIZ_RESPONSE_SCHEMA
+    return config
@@ -0,0 +1,315 @@
+# app/services/question_bank.py
+
+"""
+Persistent bank of generated, classified questions
+Every question is stored in SQLite (type, bloom_classification, confidence,
+points and the hash of the document it came from) with its embedding in a
+float32 matrix file next to it, so later quizzes for the same document can
+be assembled from the bank by type counts and LOTS/HOTS ratio.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from app.config.settings import settings
+from app.services.bert_classifier import embedding_model_key
+from app.services.question_index import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+QUESTION_TYPES = ["multiple_choice", "true_false", "identification"]
+CATEGORIES = ["LOTS", "HOTS"]
+
+# Candidates read per requested question, so near-duplicates can be skipped
+CANDIDATE_FACTOR = 3
+
+
+def document_hash(source):
+    """
+    SHA-256 of a source document
+
+    Args:
+        source: Path to the file, or its raw bytes
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    else:
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def category_quotas(count, hots_percentage=None):
+    """
+    Split a question count between LOTS and HOTS
+
+    Args:
+        count (int): Questions wanted
+        hots_percentage (float): Target share of HOTS questions (None = any)
+
+    Returns:
+        list: (category or None, count) pairs, preferred category first
+    """
+    if hots_percentage is None:
+        return [(None, count)]
+    hots = round(count * min(max(hots_percentage, 0), 100) / 100)
+    return [("HOTS", hots), ("LOTS", count - hots)]
+
+
+class QuestionBank:
+    """
+    SQLite question store with an append-only embedding matrix
+
+    Row i of the matrix file (<path without extension>.vectors.f32) is the
+    normalized embedding of the question whose vector_row is i. Writers hold
+    an IMMEDIATE transaction while appending, so several workers can share
+    one bank.
+
+    Args:
+        path (str): SQLite file
+        model_key (str): Embedding model the vectors come from; vectors from
+            another model are not stored
+    """
+
+    def __init__(self, path, model_key=""):
+        self.path = path
+        self.matrix_path = os.path.splitext(path)[0] + ".vectors.f32"
+        self.model_key = model_key
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bank_questions ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " source_hash TEXT NOT NULL,"
+            " type TEXT NOT NULL,"
+            " bloom_classification TEXT NOT NULL,"
+            " confidence REAL,"
+            " points INTEGER,"
+            " question TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " vector_row INTEGER,"
+            " times_served INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL,"
+            " UNIQUE (source_hash, question))"
+        )
+        # Serves both the filter and the least-served-first ordering
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS bank_questions_lookup ON bank_questions"
+            " (source_hash, type, bloom_classification, times_served)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bank_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+
+    def _meta(self, key):
+        row = self._conn.execute("SELECT value FROM bank_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO bank_meta (key, value) VALUES (?, ?)", (key, str(value))
+        )
+
+    def add(self, source_hash, questions, vectors=None):
+        """
+        Store classified questions (repeats of a stored question are ignored)
+
+        Args:
+            source_hash (str): Hash of the document they were generated from
+            questions (list): Formatted questions with bloom_classification set
+            vectors (np.ndarray): Optional embeddings, one row per question
+
+        Returns:
+            int: Questions added
+        """
+        if vectors is not None:
+            vectors = normalize_rows(vectors)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if vectors is not None:
+                    model_key = self._meta("model_key")
+                    dim = self._meta("dim")
+                    if model_key is None:
+                        self._set_meta("model_key", self.model_key)
+                        self._set_meta("dim", vectors.shape[1])
+                    elif model_key != self.model_key or int(dim) != vectors.shape[1]:
+                        logger.warning("Question bank vectors come from %s, not storing embeddings", model_key)
+                        vectors = None
+                next_row = int(self._meta("rows") or 0)
+
+                accepted = []
+                for row, question in enumerate(questions):
+                    vector_row = next_row + len(accepted) if vectors is not None else None
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO bank_questions (source_hash, type, bloom_classification,"
+                        " confidence, points, question, payload, vector_row, created_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (source_hash, question["type"], question["bloom_classification"],
+                         question.get("classification_confidence"), question.get("points"),
+                         question["question"], json.dumps(question), vector_row, now)
+                    )
+                    if cursor.rowcount == 1:
+                        accepted.append(row)
+
+                if vectors is not None and accepted:
+                    # Rows past the committed count are leftovers of a failed
+                    # write and are simply overwritten
+                    mode = "r+b" if os.path.exists(self.matrix_path) else "wb"
+                    with open(self.matrix_path, mode) as f:
+                        f.seek(next_row * vectors.shape[1] * 4)
+                        f.write(np.ascontiguousarray(vectors[accepted]).tobytes())
+                    self._set_meta("rows", next_row + len(accepted))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(accepted)
+
+    def _vectors(self, vector_rows):
+        rows = int(self._meta("rows") or 0)
+        dim = self._meta("dim")
+        if not rows or dim is None or not os.path.exists(self.matrix_path):
+            return None
+        matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(rows, int(dim)))
+        return np.asarray(matrix[vector_rows])
+
+    def _candidates(self, source_hash, question_type, category, limit, exclude):
+        query = "SELECT id, payload, vector_row FROM bank_questions WHERE source_hash = ? AND type = ?"
+        params = [source_hash, question_type]
+        if category is not None:
+            query += " AND bloom_classification = ?"
+            params.append(category)
+        if exclude:
+            query += f" AND id NOT IN ({','.join('?' * len(exclude))})"
+            params.extend(exclude)
+        query += " ORDER BY times_served, id LIMIT ?"
+        params.append(limit)
+        return self._conn.execute(query, params).fetchall()
+
+    def select(self, source_hash, counts, hots_percentage=None, diversity_threshold=None):
+        """
+        Pick stored questions for a quiz, least served first
+
+        Each type's count is split by hots_percentage; when one category runs
+        short, the other fills in. Candidates nearly identical (cosine
+        similarity >= diversity_threshold) to a question already picked are
+        skipped.
+
+        Args:
+            source_hash (str): Document hash
+            counts (dict): Questions wanted per type
+            hots_percentage (float): Target share of HOTS questions (None = any)
+            diversity_threshold (float): Defaults to QUESTION_DEDUP_THRESHOLD
+
+        Returns:
+            list: Formatted questions in type order (may be fewer than asked)
+        """
+        if diversity_threshold is None:
+            diversity_threshold = settings.QUESTION_DEDUP_THRESHOLD
+        picked = []
+        picked_vectors = []
+        with self._lock:
+            for question_type in QUESTION_TYPES:
+                wanted = counts.get(question_type, 0)
+                if wanted <= 0:
+                    continue
+                seen = []
+                quotas = category_quotas(wanted, hots_percentage)
+                # Second pass: whatever the preferred category couldn't fill
+                for category, quota in quotas + [(None, None)]:
+                    quota = wanted - len(seen) if quota is None else min(quota, wanted - len(seen))
+                    if quota <= 0:
+                        continue
+                    rows = self._candidates(
+                        source_hash, question_type, category, quota * CANDIDATE_FACTOR, [r[0] for r in seen]
+                    )
+                    vector_rows = [r[2] for r in rows if r[2] is not None]
+                    vectors = self._vectors(vector_rows) if vector_rows else None
+                    by_row = dict(zip(vector_rows, vectors)) if vectors is not None else {}
+
+                    taken = 0
+                    for row in rows:
+                        if taken == quota:
+                            break
+                        vector = by_row.get(row[2])
+                        if vector is not None and picked_vectors:
+                            if float(np.max(np.stack(picked_vectors) @ vector)) >= diversity_threshold:
+                                continue
+                        if vector is not None:
+                            picked_vectors.append(vector)
+                        seen.append(row)
+                        taken += 1
+                picked.extend(seen)
+
+            if picked:
+                ids = [row[0] for row in picked]
+                self._conn.execute(
+                    f"UPDATE bank_questions SET times_served = times_served + 1"
+                    f" WHERE id IN ({','.join('?' * len(ids))})",
+                    ids
+                )
+        return [json.loads(row[1]) for row in picked]
+
+    def recent_questions(self, source_hash, limit):
+        """Texts of the newest stored questions for a document"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question FROM bank_questions WHERE source_hash = ? ORDER BY id DESC LIMIT ?",
+                (source_hash, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT type, bloom_classification, COUNT(*) FROM bank_questions"
+                " GROUP BY type, bloom_classification"
+            ).fetchall()
+            sources = self._conn.execute(
+                "SELECT COUNT(DISTINCT source_hash) FROM bank_questions"
+            ).fetchone()[0]
+        by_type = {}
+        for question_type, category, count in rows:
+            by_type.setdefault(question_type, {})[category] = count
+        return {
+            "questions": sum(count for _, _, count in rows),
+            "documents": sources,
+            "by_type": by_type,
+            "path": self.path,
+        }
+
+
+_question_bank = None
+_bank_lock = threading.Lock()
+
+
+def get_question_bank():
+    """Return the shared question bank, or None when QUESTION_BANK_PATH is empty"""
+    global _question_bank
+    if not settings.QUESTION_BANK_PATH:
+        return None
+    if _question_bank is None:
+        with _bank_lock:
+            if _question_bank is None:
+                _question_bank = QuestionBank(settings.QUESTION_BANK_PATH, model_key=embedding_model_key())
+    return _question_bank
@@ -0,0 +1,196 @@
+# app/services/question_dedup.py
+
+"""
+Semantic near-duplicate removal for generated quizzes
+Questions are embedded once with the classifier's MiniLM model (the
+embedding cache hands the same vectors to classification afterwards),
+compared with each other and with the questions kept before for the same
+document (every document with QUESTION_DEDUP_SCOPE=global), and either
+flagged or dropped and replaced through a targeted top-up call
+(QUESTION_DEDUP = flag | drop | off). A dropped repeat that can't be
+replaced is kept and flagged, so dedup never shortens a quiz.
+"""
+
+import asyncio
+import logging
+
+import numpy as np
+
+from app.config.settings import settings
+from app.services.micro_batcher import embed_questions
+from app.services.question_index import get_question_index, find_duplicates, normalize_rows
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+QUESTION_TYPES = ["multiple_choice", "true_false", "identification"]
+
+
+def _index_scope(source):
+    """Document to search the index within (None = every document)"""
+    return None if settings.QUESTION_DEDUP_SCOPE.lower() == "global" else source
+
+
+def _flag(item, match):
+    text, similarity = match
+    item["duplicate_of"] = text
+    item["duplicate_similarity"] = round(similarity, 4)
+
+
+def _flatten(quiz_data):
+    return [(qtype, item) for qtype in QUESTION_TYPES for item in quiz_data.get(qtype, [])]
+
+
+async def _find_quiz_duplicates(items, vectors, threshold, use_index, source):
+    """{position: (matching question text, similarity)} for items that repeat"""
+    texts = [item["question"] for _, item in items]
+    duplicates = {
+        row: (texts[match], similarity)
+        for row, (match, similarity) in find_duplicates(vectors, threshold).items()
+    }
+    if use_index:
+        matches = await asyncio.to_thread(get_question_index().search, vectors, threshold, _index_scope(source))
+        for row, match in enumerate(matches):
+            if match is not None and row not in duplicates:
+                duplicates[row] = match
+    return duplicates
+
+
+async def _replace_duplicates(
+    kept, kept_vectors, kept_texts, dropped_texts, counts, top_up, threshold, use_index, source
+):
+    """Top up the dropped questions, rejecting replacements that repeat too"""
+    for _ in range(settings.GEMINI_TOP_UP_ATTEMPTS):
+        missing = {qtype: max(0, counts[qtype] - len(kept[qtype])) for qtype in QUESTION_TYPES}
+        if not any(missing.values()):
+            break
+        existing = [item["question"] for qtype in QUESTION_TYPES for item in kept[qtype]]
+        try:
+            extra = await top_up(missing, existing + dropped_texts)
+        except Exception as e:
+            logger.warning("Duplicate replacement failed, keeping short quiz: %s", e)
+            break
+
+        candidates = [
+            (qtype, item) for qtype in QUESTION_TYPES
+            for item in extra.get(qtype, [])[:missing[qtype]]
+        ]
+        if not candidates:
+            break
+        candidate_vectors = normalize_rows(await embed_questions([item["question"] for _, item in candidates]))
+
+        # Candidates are checked against the kept questions and each other
+        combined = np.vstack([kept_vectors, candidate_vectors]) if len(kept_vectors) else candidate_vectors
+        offset = len(kept_vectors)
+        repeats = {row - offset for row in find_duplicates(combined, threshold) if row >= offset}
+        if use_index:
+            matches = await asyncio.to_thread(
+                get_question_index().search, candidate_vectors, threshold, _index_scope(source)
+            )
+            repeats.update(row for row, match in enumerate(matches) if match is not None)
+
+        accepted = []
+        for row, (qtype, item) in enumerate(candidates):
+            if row in repeats:
+                dropped_texts.append(item["question"])
+            else:
+                kept[qtype].append(item)
+                kept_texts.append(item["question"])
+                accepted.append(row)
+        metrics.increment("question_duplicates", len(repeats))
+        if accepted:
+            kept_vectors = np.vstack([kept_vectors, candidate_vectors[accepted]]) if len(kept_vectors) \
+                else candidate_vectors[accepted]
+    return kept, kept_vectors, kept_texts
+
+
+async def dedup_quiz(quiz_data, counts, top_up=None, use_index=True, source=None, add_to_index=True):
+    """
+    Flag or drop near-duplicate questions in a freshly generated quiz
+
+    Args:
+        quiz_data (dict): Parsed quiz sections
+        counts (dict): Requested count per question type
+        top_up (callable): async (missing counts, questions to avoid) -> quiz
+            sections, used to replace dropped questions
+        use_index (bool): Also compare with (and then add to) the question
+            index; needs source unless QUESTION_DEDUP_SCOPE is global
+        source (str): Key of the document the quiz was generated from
+        add_to_index (bool): Add the kept questions to the index; False when
+            the caller indexes a later selection instead (index_quiz)
+
+    Returns:
+        dict: The quiz; unchanged if dedup is off or the embeddings are unavailable
+    """
+    mode = settings.QUESTION_DEDUP.lower()
+    if mode == "off":
+        return quiz_data
+    items = _flatten(quiz_data)
+    if not items:
+        return quiz_data
+
+    threshold = settings.QUESTION_DEDUP_THRESHOLD
+    # Without a document there is nothing to scope the index search to
+    use_index = use_index and (source is not None or _index_scope(source) is None)
+    try:
+        vectors = normalize_rows(await embed_questions([item["question"] for _, item in items]))
+        duplicates = await _find_quiz_duplicates(items, vectors, threshold, use_index, source)
+        if duplicates:
+            metrics.increment("question_duplicates", len(duplicates))
+            logger.info("Found %d near-duplicate questions", len(duplicates))
+
+        keep_rows = [row for row in range(len(items)) if row not in duplicates]
+        kept_vectors = vectors[keep_rows]
+        kept_texts = [items[row][1]["question"] for row in keep_rows]
+
+        if mode == "flag" or not duplicates:
+            for row, match in duplicates.items():
+                _flag(items[row][1], match)
+            result = quiz_data
+        else:
+            result = {qtype: [] for qtype in QUESTION_TYPES}
+            for row in keep_rows:
+                qtype, item = items[row]
+                result[qtype].append(item)
+            if top_up is not None:
+                dropped_texts = [items[row][1]["question"] for row in duplicates]
+                result, kept_vectors, kept_texts = await _replace_duplicates(
+                    result, kept_vectors, kept_texts, dropped_texts, counts, top_up, threshold, use_index, source
+                )
+            # Keep (flagged, not indexed) the repeats that weren't replaced
+            restored = 0
+            for row in sorted(duplicates):
+                qtype, item = items[row]
+                if len(result[qtype]) < counts.get(qtype, 0):
+                    _flag(item, duplicates[row])
+                    result[qtype].append(item)
+                    restored += 1
+            if restored:
+                logger.info("Kept %d unreplaced near-duplicates, flagged", restored)
+
+        if use_index and add_to_index and kept_texts:
+            await asyncio.to_thread(get_question_index().add, kept_texts, kept_vectors, source)
+        return result
+    except Exception as e:
+        logger.warning("Question dedup skipped: %s", e)
+        return quiz_data
+
+
+async def index_quiz(quiz_data, source):
+    """
+    Add a quiz's questions to the question index without deduplicating it
+
+    For quizzes whose questions were already delivered (streamed) or
+    selected from deduplicated parts (long documents), so later
+    regenerations of the document still avoid them.
+    """
+    if settings.QUESTION_DEDUP.lower() == "off" or (source is None and _index_scope(source) is not None):
+        return
+    texts = [item["question"] for _, item in _flatten(quiz_data)]
+    if not texts:
+        return
+    try:
+        vectors = await embed_questions(texts)
+        await asyncio.to_thread(get_question_index().add, texts, vectors, source)
+    except Exception as e:
+        logger.warning("Indexing quiz questions skipped: %s", e)
@@ -0,0 +1,321 @@
+# app/services/question_index.py
+
+"""
+Vector index of generated questions for near-duplicate detection
+- find_duplicates(): greedy dedup inside one quiz with a blocked matmul
+- QuestionIndex: recent questions kept so far with their document
+  (optionally persisted in SQLite); searches are scoped to one document,
+  unscoped ones use hnswlib when it is installed, otherwise an exact
+  blocked matmul over one contiguous float32 matrix
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from app.config.settings import settings
+from app.services.bert_classifier import embedding_model_key
+
+logger = logging.getLogger(__name__)
+
+INDEX_BACKENDS = ("auto", "exact", "hnsw")
+
+# Rows per matmul block (bounds the temporary similarity matrix)
+BLOCK_SIZE = 4096
+
+
+def normalize_rows(vectors):
+    """L2-normalize rows so dot products are cosine similarities"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def find_duplicates(vectors, threshold, block_size=BLOCK_SIZE):
+    """
+    Greedy near-duplicate detection within one set of questions
+
+    Row i is a duplicate when its cosine similarity with an earlier row that
+    was itself kept reaches threshold; the first occurrence always wins.
+
+    Args:
+        vectors (np.ndarray): N x dim embeddings (normalized or not)
+        threshold (float): Cosine similarity at which two questions are duplicates
+        block_size (int): Rows compared per matmul
+
+    Returns:
+        dict: {duplicate row: (kept row it matches, similarity)}
+    """
+    vectors = normalize_rows(vectors)
+    count = len(vectors)
+    kept = np.zeros(count, dtype=bool)
+    duplicates = {}
+    for start in range(0, count, block_size):
+        stop = min(start + block_size, count)
+        # Only earlier rows matter: this block against everything up to it
+        similarities = vectors[start:stop] @ vectors[:stop].T
+        for row in range(start, stop):
+            earlier = np.where(kept[:row], similarities[row - start, :row], -1.0)
+            if row and earlier.max() >= threshold:
+                match = int(earlier.argmax())
+                duplicates[row] = (match, float(earlier[match]))
+            else:
+                kept[row] = True
+    return duplicates
+
+
+def _resolve_backend(name):
+    name = name.lower()
+    if name not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown QUESTION_INDEX_BACKEND: {name}")
+    if name == "exact":
+        return "exact"
+    try:
+        import hnswlib  # noqa: F401
+        return "hnsw"
+    except ImportError:
+        if name == "hnsw":
+            raise
+        return "exact"
+
+
+class QuestionIndex:
+    """
+    Nearest-neighbour search over stored question embeddings
+
+    Every question is stored with the key of the document it came from, and
+    searches are normally scoped to one document; only unscoped searches
+    look at every document. At most max_questions are kept: past that the
+    oldest are evicted in bulk (down to EVICT_TO of the cap), in memory and
+    in SQLite.
+
+    With a path, questions are appended to SQLite and every worker picks up
+    rows written by the others on its next search. Only rows embedded with
+    the same model and inference backend are loaded.
+
+    Args:
+        path (str): SQLite file ("" keeps the index in memory only)
+        backend (str): auto | exact | hnsw (hnsw serves unscoped searches)
+        model_key (str): Embedding model + backend the vectors come from
+        max_questions (int): Cap on stored questions (0 = unbounded)
+    """
+
+    EVICT_TO = 0.9
+
+    def __init__(self, path="", backend="auto", model_key="", max_questions=0):
+        self.path = path
+        self.model_key = model_key
+        self.max_questions = max_questions
+        self.backend = _resolve_backend(backend)
+        self._lock = threading.Lock()
+        self._matrix = None   # capacity x dim, rows [:count] in use (normalized)
+        self._texts = []
+        self._sources = []
+        self._ids = []        # SQLite row ids (None when memory only)
+        self._rows_by_source = {}
+        self._evicted = 0
+        self._last_id = 0
+        self._hnsw = None
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS questions ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, model_key TEXT NOT NULL, "
+                "text TEXT NOT NULL, source TEXT, vector BLOB NOT NULL)"
+            )
+            self._conn.commit()
+            with self._lock:
+                self._sync_locked()
+
+    @property
+    def count(self):
+        return len(self._texts)
+
+    def _append_locked(self, texts, vectors, sources, ids):
+        if not len(texts):
+            return
+        count = len(self._texts)
+        if self._matrix is None:
+            self._matrix = np.empty((max(1024, len(texts)), vectors.shape[1]), dtype=np.float32)
+        elif count + len(texts) > len(self._matrix):
+            # Amortized growth: one copy per doubling
+            grown = np.empty((max(2 * len(self._matrix), count + len(texts)), self._matrix.shape[1]), dtype=np.float32)
+            grown[:count] = self._matrix[:count]
+            self._matrix = grown
+        self._matrix[count:count + len(texts)] = vectors
+        self._texts.extend(texts)
+        self._sources.extend(sources)
+        self._ids.extend(ids)
+        for row, source in enumerate(sources, start=count):
+            self._rows_by_source.setdefault(source, []).append(row)
+
+        if self.max_questions and len(self._texts) > self.max_questions:
+            self._evict_locked()
+        elif self.backend == "hnsw":
+            self._hnsw_add_locked(vectors, count)
+
+    def _evict_locked(self):
+        """Drop the oldest questions down to EVICT_TO of max_questions"""
+        count = len(self._texts)
+        drop = count - max(1, int(self.max_questions * self.EVICT_TO))
+        remaining = self._matrix[drop:count]
+        self._matrix = np.empty((max(1024, len(remaining)), remaining.shape[1]), dtype=np.float32)
+        self._matrix[:len(remaining)] = remaining
+        oldest_kept_id = self._ids[drop]
+        del self._texts[:drop], self._sources[:drop], self._ids[:drop]
+        self._rows_by_source = {}
+        for row, source in enumerate(self._sources):
+            self._rows_by_source.setdefault(source, []).append(row)
+        self._evicted += drop
+
+        if self._conn is not None and oldest_kept_id is not None:
+            self._conn.execute(
+                "DELETE FROM questions WHERE id < ? AND model_key = ?", (oldest_kept_id, self.model_key)
+            )
+            self._conn.commit()
+        if self.backend == "hnsw":
+            # Labels are row numbers, which just shifted
+            self._hnsw = None
+            self._hnsw_add_locked(self._matrix[:len(self._texts)], 0)
+        logger.info("Question index evicted %d oldest questions", drop)
+
+    def _hnsw_add_locked(self, vectors, first_label):
+        import hnswlib
+
+        needed = first_label + len(vectors)
+        if self._hnsw is None:
+            self._hnsw = hnswlib.Index(space="ip", dim=vectors.shape[1])
+            self._hnsw.init_index(max_elements=max(needed, 1024), ef_construction=200, M=16)
+            self._hnsw.set_ef(64)
+        elif needed > self._hnsw.get_max_elements():
+            self._hnsw.resize_index(max(needed, 2 * self._hnsw.get_max_elements()))
+        self._hnsw.add_items(vectors, np.arange(first_label, needed))
+
+    def _sync_locked(self):
+        """Load rows other workers (or an earlier run) stored since the last sync"""
+        if self._conn is None:
+            return
+        rows = self._conn.execute(
+            "SELECT id, text, source, vector FROM questions WHERE id > ? AND model_key = ? ORDER BY id",
+            (self._last_id, self.model_key)
+        ).fetchall()
+        if not rows:
+            return
+        self._last_id = rows[-1][0]
+        vectors = np.stack([np.frombuffer(blob, dtype=np.float32) for _, _, _, blob in rows])
+        self._append_locked(
+            [row[1] for row in rows], vectors, [row[2] for row in rows], [row[0] for row in rows]
+        )
+
+    def add(self, texts, vectors, source=None):
+        """
+        Store questions that were kept
+
+        Args:
+            texts (list): Question texts
+            vectors (np.ndarray): Their embeddings
+            source (str): Key of the document they were generated from
+        """
+        vectors = normalize_rows(vectors)
+        texts = list(texts)
+        with self._lock:
+            if self._conn is None:
+                self._append_locked(texts, vectors, [source] * len(texts), [None] * len(texts))
+                return
+            self._conn.executemany(
+                "INSERT INTO questions (model_key, text, source, vector) VALUES (?, ?, ?, ?)",
+                [(self.model_key, text, source, vector.tobytes()) for text, vector in zip(texts, vectors)]
+            )
+            self._conn.commit()
+            self._sync_locked()
+
+    def _search_rows_locked(self, queries, rows):
+        """Exact best match of each query among the given rows (all rows when None)"""
+        count = len(self._texts) if rows is None else len(rows)
+        best = np.zeros(len(queries), dtype=np.int64)
+        similarities = np.full(len(queries), -np.inf, dtype=np.float32)
+        for start in range(0, count, BLOCK_SIZE * 16):
+            stop = min(start + BLOCK_SIZE * 16, count)
+            candidates = self._matrix[start:stop] if rows is None else self._matrix[rows[start:stop]]
+            block = queries @ candidates.T
+            block_best = block.argmax(axis=1)
+            block_similarities = block[np.arange(len(queries)), block_best]
+            better = block_similarities > similarities
+            if rows is None:
+                best[better] = block_best[better] + start
+            else:
+                best[better] = np.asarray(rows[start:stop])[block_best[better]]
+            similarities[better] = block_similarities[better]
+        return best, similarities
+
+    def search(self, vectors, threshold, source=None):
+        """
+        Find the most similar stored question for each query
+
+        Args:
+            vectors (np.ndarray): Query embeddings
+            threshold (float): Minimum cosine similarity to report
+            source (str): Only compare with questions from this document
+                (None compares with every document)
+
+        Returns:
+            list: (stored question text, similarity) per query, or None below threshold
+        """
+        queries = normalize_rows(vectors)
+        with self._lock:
+            self._sync_locked()
+            rows = None if source is None else self._rows_by_source.get(source)
+            if not self._texts or not len(queries) or (source is not None and not rows):
+                return [None] * len(queries)
+
+            if rows is None and self._hnsw is not None:
+                labels, distances = self._hnsw.knn_query(queries, k=1)
+                best = labels[:, 0].astype(np.int64)
+                similarities = 1.0 - distances[:, 0]
+            else:
+                best, similarities = self._search_rows_locked(queries, rows)
+
+            return [
+                (self._texts[index], float(similarity)) if similarity >= threshold else None
+                for index, similarity in zip(best, similarities)
+            ]
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "questions": len(self._texts),
+            "documents": len(self._rows_by_source),
+            "max_questions": self.max_questions,
+            "evicted": self._evicted,
+            "path": self.path or None,
+        }
+
+
+_question_index = None
+_index_lock = threading.Lock()
+
+
+def get_question_index():
+    """Return the shared question index configured from settings"""
+    global _question_index
+    if _question_index is None:
+        with _index_lock:
+            if _question_index is None:
+                _question_index = QuestionIndex(
+                    settings.QUESTION_INDEX_PATH,
+                    settings.QUESTION_INDEX_BACKEND,
+                    model_key=embedding_model_key(),
+                    max_questions=settings.QUESTION_INDEX_MAX_QUESTIONS
+                )
+    return _question_index
@@ -0,0 +1,334 @@
+# app/services/quiz_cache.py
+
+"""
+Content-addressed cache for generated quizzes
+Keyed on a hash of the extracted text plus the generation parameters,
+so repeat uploads of the same handout skip the Gemini call entirely.
+Async callers use get_async/set_async, which run the SQLite backend in a
+thread.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from app.config.settings import settings
+
+
+class MemoryCacheBackend:
+    """In-memory LRU with TTL, bounded by entry count and total size"""
+
+    blocking = False
+
+    def __init__(self, max_entries=512, max_bytes=50 * 1024 * 1024, ttl=86400):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, size, expires_at = entry
+            if expires_at and expires_at < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            expires_at = time.time() + self.ttl if self.ttl else 0
+            self._entries[key] = (value, size, expires_at)
+            self._total_bytes += size
+            while (len(self._entries) > self.max_entries
+                   or self._total_bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._total_bytes -= size
+
+
+class SQLiteCacheBackend:
+    """
+    On-disk store (SQLite) with TTL and least-recently-used size eviction
+
+    Reads don't write: access times are collected in memory and written in
+    one batch with the next set() (or every TOUCH_BATCH reads), which is
+    all the LRU order needs.
+    """
+
+    blocking = True
+    TOUCH_BATCH = 64
+    # Oldest rows deleted per round while over max_bytes
+    EVICT_BATCH = 32
+
+    def __init__(self, path, max_entries=10000, max_bytes=500 * 1024 * 1024, ttl=86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._touched = {}  # key -> last read time, not yet written
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS quiz_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_quiz_cache_accessed ON quiz_cache(accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM quiz_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at and expires_at < now:
+                # Removed by the next eviction
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= self.TOUCH_BATCH:
+                self._flush_touched()
+                self._conn.commit()
+            return value
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE quiz_cache SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()]
+            )
+            self._touched = {}
+
+    def set(self, key, value):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else 0
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO quiz_cache (key, value, size, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, expires_at, now)
+            )
+            self._touched.pop(key, None)
+            self._flush_touched()
+            self._evict(now)
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._touched = {}
+            self._conn.execute("DELETE FROM quiz_cache")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM quiz_cache"
+            ).fetchone()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": entries,
+            "bytes": total,
+            "evictions": self.evictions,
+        }
+
+    def _evict(self, now):
+        # Expired rows first, then least recently used until within limits
+        cur = self._conn.execute(
+            "DELETE FROM quiz_cache WHERE expires_at > 0 AND expires_at < ?", (now,)
+        )
+        self.evictions += cur.rowcount
+        entries, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM quiz_cache"
+        ).fetchone()
+        while entries > self.max_entries or total > self.max_bytes:
+            # Bounded reads through the accessed_at index, never the whole table
+            limit = max(entries - self.max_entries, self.EVICT_BATCH if total > self.max_bytes else 1)
+            rows = self._conn.execute(
+                "SELECT key, size FROM quiz_cache ORDER BY accessed_at ASC LIMIT ?", (limit,)
+            ).fetchall()
+            if not rows:
+                break
+            stale = []
+            for key, size in rows:
+                if entries <= self.max_entries and total <= self.max_bytes:
+                    break
+                stale.append((key,))
+                entries -= 1
+                total -= size
+            self._conn.executemany("DELETE FROM quiz_cache WHERE key = ?", stale)
+            self.evictions += len(stale)
+
+
+class QuizCache:
+    """Front end for a cache backend, tracks hit/miss counters"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(text, num_multiple_choice, num_true_false, num_identification, model_name):
+        """
+        Build a content-addressed cache key
+
+        Args:
+            text (str): Extracted document text
+            num_multiple_choice (int): Requested multiple choice count
+            num_true_false (int): Requested true/false count
+            num_identification (int): Requested identification count
+            model_name (str): Gemini model used for generation
+
+        Returns:
+            str: Hex digest identifying this generation request
+        """
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        params = f"{model_name}|{num_multiple_choice}|{num_true_false}|{num_identification}"
+        return hashlib.sha256(f"{text_hash}|{params}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached quiz dict for key, or None"""
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Decode on every hit so callers can't mutate the cached copy
+        return json.loads(value)
+
+    def set(self, key, quiz_data):
+        """Store a quiz dict under key"""
+        self.backend.set(key, json.dumps(quiz_data))
+
+    async def get_async(self, key):
+        """get() without blocking the event loop on a disk backend"""
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.get, key)
+        return self.get(key)
+
+    async def set_async(self, key, quiz_data):
+        """set() without blocking the event loop on a disk backend"""
+        if self.backend.blocking:
+            await asyncio.to_thread(self.set, key, quiz_data)
+        else:
+            self.set(key, quiz_data)
+
+    def clear(self):
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        stats = self.backend.stats()
+        stats.update({
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        })
+        return stats
+
+
+class NullCache:
+    """Used when caching is disabled (QUIZ_CACHE_BACKEND=none)"""
+
+    make_key = staticmethod(QuizCache.make_key)
+
+    def get(self, key):
+        return None
+
+    def set(self, key, quiz_data):
+        pass
+
+    async def get_async(self, key):
+        return None
+
+    async def set_async(self, key, quiz_data):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {"backend": "none"}
+
+
+_quiz_cache = None
+
+
+def get_quiz_cache():
+    """Return the shared quiz cache configured from settings"""
+    global _quiz_cache
+    if _quiz_cache is None:
+        backend = settings.QUIZ_CACHE_BACKEND.lower()
+        if backend == "memory":
+            _quiz_cache = QuizCache(MemoryCacheBackend(
+                max_entries=settings.QUIZ_CACHE_MAX_ENTRIES,
+                max_bytes=settings.QUIZ_CACHE_MAX_BYTES,
+                ttl=settings.QUIZ_CACHE_TTL
+            ))
+        elif backend == "sqlite":
+            _quiz_cache = QuizCache(SQLiteCacheBackend(
+                settings.QUIZ_CACHE_PATH,
+                max_entries=settings.QUIZ_CACHE_MAX_ENTRIES,
+                max_bytes=settings.QUIZ_CACHE_MAX_BYTES,
+                ttl=settings.QUIZ_CACHE_TTL
+            ))
+        elif backend == "none":
+            _quiz_cache = NullCache()
+        else:
+            raise ValueError(f"Unknown QUIZ_CACHE_BACKEND: {settings.QUIZ_CACHE_BACKEND}")
+    return _quiz_cache
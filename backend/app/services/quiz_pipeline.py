@@ -0,0 +1,431 @@
+# app/services/quiz_pipeline.py
+
+"""
+Document -> Gemini -> BERT quiz pipeline
+Shared by the /generate-from-pdf routes (plain and streaming) and the job queue.
+Classified questions are saved to the question bank, which assemble_quiz
+draws on before calling Gemini.
+"""
+
+import asyncio
+import logging
+
+from app.config.settings import settings
+from app.utils.pdf_extractor import PDFTooLargeError
+from app.utils.document_extractors import extract_text_async, UnsupportedFormatError
+from app.services.gemini_service import (
+    generate_quiz_from_text_async,
+    stream_quiz_from_text,
+    format_quiz_for_frontend,
+    format_question,
+    generate_new_questions,
+)
+from app.services.long_document import generate_quiz_from_long_text, document_chunks
+from app.services.bloom_balance import balance_questions, on_target
+from app.services.micro_batcher import classify_questions, embed_questions, annotate_question
+from app.services.question_bank import get_question_bank, document_hash
+from app.services.prompt_builder import clean_document
+from app.utils import metrics
+from app.utils.metrics import stage, STAGE_EXTRACTION, STAGE_CLASSIFY
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages, reported through on_stage and the job status endpoint
+STAGE_EXTRACTING = "extracting"
+STAGE_GENERATING = "generating"
+STAGE_CLASSIFYING = "classifying"
+STAGE_BALANCING = "balancing"
+
+QUESTION_TYPES = ["multiple_choice", "true_false", "identification"]
+
+
+class QuizPipelineError(Exception):
+    """A client-side problem with the input (maps to a 4xx response)"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+async def _noop_stage(stage):
+    pass
+
+
+def build_classification_stats(questions):
+    """
+    Count LOTS/HOTS questions
+
+    Args:
+        questions (list): Formatted questions with bloom_classification set
+
+    Returns:
+        dict: Totals and percentages per category
+    """
+    lots_count = sum(1 for q in questions if q.get('bloom_classification') == 'LOTS')
+    hots_count = sum(1 for q in questions if q.get('bloom_classification') == 'HOTS')
+    total = len(questions)
+
+    return {
+        'total_questions': total,
+        'lots_count': lots_count,
+        'hots_count': hots_count,
+        'lots_percentage': round((lots_count / total) * 100, 2) if total > 0 else 0,
+        'hots_percentage': round((hots_count / total) * 100, 2) if total > 0 else 0,
+    }
+
+
+async def classify_quizzes(formatted_quizzes):
+    """
+    Classify the questions of several quizzes in one batch (in place)
+
+    Adds bloom_classification, classification_confidence and
+    classification_method to every question and classification_stats to
+    every quiz.
+
+    Returns:
+        list: The same quizzes
+    """
+    questions = [q for quiz in formatted_quizzes for q in quiz.get('questions', [])]
+
+    if questions:
+        # Batch classify all questions through the shared batcher (in-process
+        # BERT thread pool, or the classifier sidecar when one is configured)
+        with stage(STAGE_CLASSIFY):
+            classifications = await classify_questions(questions)
+
+        for question, result in zip(questions, classifications):
+            annotate_question(question, result)
+
+    for quiz in formatted_quizzes:
+        if quiz.get('questions'):
+            quiz['classification_stats'] = build_classification_stats(quiz['questions'])
+    return formatted_quizzes
+
+
+async def save_to_bank(source_hash, questions):
+    """
+    Store classified questions in the question bank
+
+    Questions flagged as near-duplicates are left out. A bank failure is
+    logged and never fails the request.
+
+    Returns:
+        int: Questions added
+    """
+    bank = get_question_bank()
+    questions = [
+        q for q in questions
+        if q.get('bloom_classification') and 'duplicate_of' not in q
+    ]
+    if bank is None or not questions:
+        return 0
+    try:
+        # Cache hits: dedup and classification embedded these already
+        vectors = await embed_questions([q['question'] for q in questions])
+        added = await asyncio.to_thread(bank.add, source_hash, questions, vectors)
+    except Exception as e:
+        logger.warning("Question bank save skipped: %s", e)
+        return 0
+    metrics.increment("bank_questions_saved", added)
+    return added
+
+
+async def classify_quiz(formatted_quiz):
+    """
+    Add bloom_classification, classification_confidence and
+    classification_method to every question and classification_stats to
+    the quiz (in place)
+    """
+    await classify_quizzes([formatted_quiz])
+    return formatted_quiz
+
+
+async def apply_hots_target(formatted_quiz, text, target_hots_percentage, long_document=False):
+    """
+    Steer a classified quiz to target_hots_percentage (in place)
+
+    Replaces the questions, total_points and classification_stats and adds
+    the hots_target report (see balance_questions). A long document's
+    follow-ups each get one of its chunks rather than the whole text.
+
+    Returns:
+        list: Every new question generated while balancing, classified
+    """
+    excerpts = [text]
+    if long_document:
+        excerpts, _ = await asyncio.to_thread(document_chunks, text)
+    questions, generated, report = await balance_questions(
+        formatted_quiz['questions'], excerpts or [text], target_hots_percentage
+    )
+    formatted_quiz['questions'] = questions
+    formatted_quiz['total_points'] = sum(q['points'] for q in questions)
+    if questions:
+        formatted_quiz['classification_stats'] = build_classification_stats(questions)
+    formatted_quiz['hots_target'] = report
+    return generated
+
+
+def validate_hots_percentage(value, name="target_hots_percentage"):
+    """
+    Raises:
+        QuizPipelineError: If value is set but outside 0-100
+    """
+    if value is not None and not 0 <= value <= 100:
+        raise QuizPipelineError(f"{name} must be between 0 and 100")
+
+
+async def extract_quiz_text(source, long_document=False, document_format=None):
+    """
+    Extract the text a quiz will be generated from
+
+    Args:
+        source: Path to the document, or its raw bytes
+        long_document (bool): Read the whole document
+        document_format (str): Format from detect_format (sniffed when None)
+
+    Raises:
+        QuizPipelineError: If the document is too large, not in a supported
+            format or has no extractable text
+    """
+    # Extract text in the process pool (PyPDF2 and the XML/HTML parsers are
+    # pure-Python CPU work).
+    # Unless long_document is set, only PROMPT_SOURCE_CHARS are read (the
+    # prompt builder picks its sentences from those), so long documents
+    # stop after a few pages. Running headers/footers are stripped here,
+    # while page boundaries are still known.
+    logger.info("📖 Extracting text from %s document...", document_format or "uploaded")
+    try:
+        with stage(STAGE_EXTRACTION):
+            extracted_text = await extract_text_async(
+                source,
+                document_format,
+                max_chars=None if long_document else settings.PROMPT_SOURCE_CHARS
+            )
+            if extracted_text:
+                extracted_text = await asyncio.to_thread(clean_document, extracted_text)
+    except PDFTooLargeError as e:
+        raise QuizPipelineError(str(e), status_code=413)
+    except UnsupportedFormatError as e:
+        raise QuizPipelineError(str(e))
+
+    if not extracted_text:
+        raise QuizPipelineError("Failed to extract text from the document")
+
+    logger.info("✓ Extracted %d characters", len(extracted_text))
+    return extracted_text
+
+
+async def run_quiz_pipeline(
+    source,
+    title="Generated Quiz",
+    num_multiple_choice=5,
+    num_true_false=5,
+    num_identification=5,
+    long_document=False,
+    target_hots_percentage=None,
+    document_format=None,
+    on_stage=None
+):
+    """
+    Generate a classified quiz from a document
+
+    Args:
+        source: Path to the document (PDF, DOCX, PPTX, TXT, Markdown or
+            HTML), or its raw bytes
+        title (str): Quiz title
+        num_multiple_choice (int): Multiple choice questions to generate
+        num_true_false (int): True/false questions to generate
+        num_identification (int): Identification questions to generate
+        long_document (bool): Cover the whole document with chunked generation
+        target_hots_percentage (float): Steer the quiz to this HOTS share
+            with follow-up calls for the underrepresented category
+        document_format (str): Format from detect_format (sniffed when None)
+        on_stage (callable): Optional async callback, awaited with each stage name
+
+    Returns:
+        dict: Formatted quiz with classification_stats (and hots_target
+            when a target was given)
+
+    Raises:
+        QuizPipelineError: If the document is too large, unsupported or has
+            no extractable text, or the target is out of range
+    """
+    validate_hots_percentage(target_hots_percentage)
+    on_stage = on_stage or _noop_stage
+
+    await on_stage(STAGE_EXTRACTING)
+    extracted_text = await extract_quiz_text(source, long_document, document_format)
+    source_hash = await asyncio.to_thread(document_hash, source)
+
+    # Generate quiz using Gemini
+    await on_stage(STAGE_GENERATING)
+    logger.info(
+        "🤖 Generating quiz (MC: %d, TF: %d, ID: %d)...",
+        num_multiple_choice, num_true_false, num_identification
+    )
+    generate = generate_quiz_from_long_text if long_document else generate_quiz_from_text_async
+    quiz_data = await generate(
+        extracted_text,
+        num_multiple_choice,
+        num_true_false,
+        num_identification
+    )
+
+    # Format for frontend
+    formatted_quiz = format_quiz_for_frontend(quiz_data, title)
+
+    # Classify questions using BERT
+    await on_stage(STAGE_CLASSIFYING)
+    logger.info("🧠 Classifying questions with BERT (LOTS/HOTS)...")
+    await classify_quiz(formatted_quiz)
+
+    stats = formatted_quiz.get('classification_stats')
+    if stats:
+        logger.info("✓ Classification complete: %d LOTS, %d HOTS", stats['lots_count'], stats['hots_count'])
+
+    banked = formatted_quiz['questions']
+    if target_hots_percentage is not None:
+        await on_stage(STAGE_BALANCING)
+        banked = banked + await apply_hots_target(
+            formatted_quiz, extracted_text, target_hots_percentage, long_document
+        )
+
+    await save_to_bank(source_hash, banked)
+    return formatted_quiz
+
+
+async def assemble_quiz(
+    source=None,
+    source_hash=None,
+    title="Generated Quiz",
+    num_multiple_choice=5,
+    num_true_false=5,
+    num_identification=5,
+    hots_percentage=None,
+    document_format=None
+):
+    """
+    Build a quiz from the question bank, generating only what it lacks
+
+    Stored questions for the document are picked by type and LOTS/HOTS
+    ratio; Gemini is called for the shortfall only (and not at all when the
+    bank covers the request). New questions are classified and banked. If
+    the assembled mix still misses hots_percentage and the document was sent,
+    it is steered there like target_hots_percentage in run_quiz_pipeline.
+
+    Args:
+        source: The document (path or bytes); needed to generate a shortfall
+        source_hash (str): Document hash, when the document isn't sent again
+        title (str): Quiz title
+        num_multiple_choice (int): Multiple choice questions wanted
+        num_true_false (int): True/false questions wanted
+        num_identification (int): Identification questions wanted
+        hots_percentage (float): Target share of HOTS questions (None = any)
+        document_format (str): Format from detect_format (sniffed when None)
+
+    Returns:
+        tuple: (formatted quiz with classification_stats, {"source_hash",
+            "from_bank", "generated", "shortfall"})
+
+    Raises:
+        QuizPipelineError: If neither source nor source_hash is given, or the
+            document can't be extracted
+    """
+    if source is None and not source_hash:
+        raise QuizPipelineError("Send the document or its source_hash")
+    validate_hots_percentage(hots_percentage, "hots_percentage")
+    if source is not None:
+        source_hash = await asyncio.to_thread(document_hash, source)
+
+    counts = {
+        "multiple_choice": num_multiple_choice,
+        "true_false": num_true_false,
+        "identification": num_identification,
+    }
+    bank = get_question_bank()
+    questions = []
+    if bank is not None:
+        questions = await asyncio.to_thread(bank.select, source_hash, counts, hots_percentage)
+    from_bank = len(questions)
+    banked_ids = {id(q) for q in questions}
+    metrics.increment("bank_questions_served", from_bank)
+
+    def shortfall():
+        return {
+            qtype: max(0, counts[qtype] - sum(1 for q in questions if q['type'] == qtype))
+            for qtype in QUESTION_TYPES
+        }
+
+    extracted_text = None
+    missing = shortfall()
+    if any(missing.values()) and source is not None:
+        logger.info("🏦 %d questions from the bank, generating %s", from_bank, missing)
+        extracted_text = await extract_quiz_text(source, document_format=document_format)
+        avoid = [q['question'] for q in questions]
+        if bank is not None:
+            avoid += await asyncio.to_thread(bank.recent_questions, source_hash, settings.QUESTION_BANK_MAX_AVOID)
+        quiz_data = await generate_new_questions(extracted_text, missing, list(dict.fromkeys(avoid)))
+
+        new_quiz = format_quiz_for_frontend(quiz_data, title)
+        await classify_quiz(new_quiz)
+        await save_to_bank(source_hash, new_quiz['questions'])
+
+        # The model may still repeat a stored question word for word
+        seen = {q['question'].strip().lower() for q in questions}
+        for question in new_quiz['questions']:
+            if question['question'].strip().lower() not in seen and missing[question['type']] > 0:
+                missing[question['type']] -= 1
+                questions.append(question)
+    else:
+        logger.info("🏦 %d questions from the bank", from_bank)
+
+    questions.sort(key=lambda q: QUESTION_TYPES.index(q['type']))
+    quiz = {
+        "title": title,
+        "questions": questions,
+        "total_points": sum(q['points'] for q in questions),
+    }
+    if questions:
+        quiz['classification_stats'] = build_classification_stats(questions)
+
+    if hots_percentage is not None and questions and source is not None \
+            and not on_target(questions, hots_percentage):
+        extracted_text = extracted_text or await extract_quiz_text(source, document_format=document_format)
+        await save_to_bank(source_hash, await apply_hots_target(quiz, extracted_text, hots_percentage))
+        questions = quiz['questions']
+
+    from_bank = sum(1 for q in questions if id(q) in banked_ids)
+    return quiz, {
+        "source_hash": source_hash,
+        "from_bank": from_bank,
+        "generated": len(questions) - from_bank,
+        "shortfall": shortfall(),
+    }
+
+
+async def stream_quiz_questions(
+    extracted_text,
+    num_multiple_choice=5,
+    num_true_false=5,
+    num_identification=5
+):
+    """
+    Generate, format and classify questions one at a time as Gemini streams them
+
+    Yields:
+        dict: A formatted question with bloom_classification set
+    """
+    async for question_type, item in stream_quiz_from_text(
+        extracted_text, num_multiple_choice, num_true_false, num_identification
+    ):
+        try:
+            question = format_question(question_type, item)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("Skipping malformed %s item: %s", question_type, e)
+            continue
+
+        # Shared micro-batcher: concurrent streams share encode batches
+        with stage(STAGE_CLASSIFY):
+            result = (await classify_questions([question]))[0]
+        annotate_question(question, result)
+        yield question
@@ -2,52 +2,182 @@
 
 """
 Bloom's Taxonomy keyword definitions for LOTS/HOTS classification
+
+The keyword lists live in a versioned JSON file (app/data/blooms_taxonomy.json
+by default, or BLOOMS_TAXONOMY_PATH) with one entry per level, Remember to
+Create, each tagged LOTS or HOTS. reload_taxonomy() re-reads it at runtime,
+and get_taxonomy() picks up a changed file by itself (checked at most every
+TAXONOMY_CHECK_INTERVAL seconds), so every worker process follows an edit
+or a reload made through another worker.
 """
 
-LOTS_KEYWORDS = [
-    # Remember Level - Recall basic facts
-    "identify", "define", "list", "name", "state", "label", 
-    "recall", "recognize", "match", "select", "who", "what", 
-    "when", "where", "which",
-    
-    # Understand Level - Explain ideas
-    "explain", "summarize", "interpret", "classify", "describe",
-    "discuss", "illustrate", "paraphrase", "restate", "translate",
-    
-    # Apply Level - Use information
-    "compute", "calculate", "solve", "apply", "demonstrate",
-    "use", "show", "complete", "examine", "modify", "implement"
-]
-
-HOTS_KEYWORDS = [
-    # Analyze Level - Break down information
-    "analyze", "compare and contrast", "differentiate", "examine",
-    "distinguish", "investigate", "categorize", "infer", 
-    "breakdown", "deconstruct", "organize", "separate",
-    
-    # Evaluate Level - Make judgments
-    "evaluate", "assess", "justify", "critique", "argue",
-    "defend", "judge", "rate", "validate", "support",
-    "recommend", "prioritize", "prove", "disprove",
-    
-    # Create Level - Generate new ideas
-    "create", "design", "formulate", "propose", "construct",
-    "develop", "predict", "hypothesize", "compose", "plan",
-    "generate", "devise", "why", "how would", "what if",
-    "imagine", "invent", "synthesize"
-]
+import json
+import logging
+import os
+import threading
+import time
+
+from app.config.settings import settings
+
+DEFAULT_TAXONOMY_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "blooms_taxonomy.json"
+)
+CATEGORIES = ("LOTS", "HOTS")
+
+logger = logging.getLogger(__name__)
+
+_taxonomy = None
+_signature = None  # (mtime, size) of the file behind _taxonomy, or of the last bad file seen
+_next_check = 0.0
+_lock = threading.Lock()
+
+
+class TaxonomyError(ValueError):
+    """The taxonomy file is missing or malformed"""
+
+
+def taxonomy_path():
+    """Path of the taxonomy file in use"""
+    return settings.BLOOMS_TAXONOMY_PATH or DEFAULT_TAXONOMY_PATH
+
+
+def load_taxonomy(path=None):
+    """
+    Read and validate a taxonomy file
+
+    Args:
+        path (str): File to read (defaults to taxonomy_path())
+
+    Returns:
+        dict: {"version": str, "levels": [{"name", "category", "description", "keywords"}, ...]}
+
+    Raises:
+        TaxonomyError: If the file can't be read or is malformed
+    """
+    path = path or taxonomy_path()
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise TaxonomyError(f"Cannot read taxonomy file {path}: {e}")
+
+    if not isinstance(data, dict) or not isinstance(data.get("levels"), list):
+        raise TaxonomyError("Taxonomy file must be an object with a 'levels' list")
+
+    levels = []
+    for level in data["levels"]:
+        name = level.get("name") if isinstance(level, dict) else None
+        if not name:
+            raise TaxonomyError("Every taxonomy level needs a name")
+        if level.get("category") not in CATEGORIES:
+            raise TaxonomyError(f"Level {name}: category must be LOTS or HOTS")
+        keywords = level.get("keywords")
+        if not isinstance(keywords, list) or not keywords or \
+                not all(isinstance(k, str) and k.strip() for k in keywords):
+            raise TaxonomyError(f"Level {name}: keywords must be a non-empty list of strings")
+        levels.append({
+            "name": name,
+            "category": level["category"],
+            "description": level.get("description", ""),
+            "keywords": [k.strip() for k in keywords],
+        })
+
+    for category in CATEGORIES:
+        if not any(level["category"] == category for level in levels):
+            raise TaxonomyError(f"Taxonomy has no {category} level")
+
+    return {"version": str(data.get("version", "")), "levels": levels}
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _follow_file():
+    """Re-read the taxonomy file if it changed on disk since it was loaded"""
+    global _taxonomy, _signature, _next_check
+    now = time.monotonic()
+    if settings.TAXONOMY_CHECK_INTERVAL <= 0 or now < _next_check:
+        return
+    _next_check = now + settings.TAXONOMY_CHECK_INTERVAL
+    signature = _file_signature(taxonomy_path())
+    if signature is None or signature == _signature:
+        return
+    with _lock:
+        if signature == _signature:
+            return
+        _signature = signature
+        try:
+            _taxonomy = load_taxonomy()
+        except TaxonomyError as e:
+            # Keep classifying with the previous taxonomy
+            logger.error("Changed taxonomy file not loaded: %s", e)
+            return
+    logger.info("Bloom's taxonomy file changed, now v%s", _taxonomy["version"])
+
+
+def get_taxonomy():
+    """Return the current taxonomy (loaded on first use, re-read when the file changes)"""
+    global _taxonomy, _signature
+    if _taxonomy is None:
+        with _lock:
+            if _taxonomy is None:
+                _signature = _file_signature(taxonomy_path())
+                _taxonomy = load_taxonomy()
+    else:
+        _follow_file()
+    return _taxonomy
+
+
+def set_taxonomy(taxonomy):
+    """Make a taxonomy just read from the taxonomy file current"""
+    global _taxonomy, _signature
+    with _lock:
+        _taxonomy = taxonomy
+        _signature = _file_signature(taxonomy_path())
+
+
+def reload_taxonomy(path=None):
+    """
+    Re-read the taxonomy file and make it current
+
+    The previous taxonomy stays in place if the new file is invalid.
+
+    Returns:
+        dict: The new taxonomy
+    """
+    taxonomy = load_taxonomy(path)
+    set_taxonomy(taxonomy)
+    return taxonomy
+
+
+def _category_keywords(taxonomy, category):
+    return [k for level in taxonomy["levels"] if level["category"] == category for k in level["keywords"]]
+
 
 def get_lots_keywords():
     """Return LOTS keywords list"""
-    return LOTS_KEYWORDS
+    return _category_keywords(get_taxonomy(), "LOTS")
+
 
 def get_hots_keywords():
     """Return HOTS keywords list"""
-    return HOTS_KEYWORDS
+    return _category_keywords(get_taxonomy(), "HOTS")
+
+
+def get_category_levels(category):
+    """Return the taxonomy levels (name, description, keywords) of one category"""
+    return [level for level in get_taxonomy()["levels"] if level["category"] == category]
+
 
 def get_all_keywords():
     """Return dictionary with both categories"""
+    taxonomy = get_taxonomy()
     return {
-        "LOTS": LOTS_KEYWORDS,
-        "HOTS": HOTS_KEYWORDS
-    }
\ No newline at end of file
+        "LOTS": _category_keywords(taxonomy, "LOTS"),
+        "HOTS": _category_keywords(taxonomy, "HOTS")
+    }
@@ -0,0 +1,523 @@
+# app/utils/document_extractors.py
+
+"""
+Text extraction for every supported upload format
+Formats are recognised from the content (magic bytes, the parts inside an
+OOXML archive, markup), not the file name. Each format registers a page
+iterator: PDF pages and PPTX slides as they are; DOCX, plain text,
+Markdown and HTML as runs of paragraphs ending at a page break (DOCX
+breaks, form feeds) or after about TEXT_PAGE_CHARS. Iterators are lazy,
+so early stops read only the start of a document. Extracted pages are
+joined with PAGE_BREAK like PDF pages.
+"""
+
+import codecs
+import io
+import logging
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterator, Iterable, Optional, Union
+
+from app.config.settings import settings
+from app.utils.executors import run_in_pdf_executor
+from app.utils.pdf_extractor import (
+    PAGE_BREAK,
+    PDFTooLargeError,
+    iter_pdf_pages,
+    extract_text_from_pdf_async,
+)
+
+logger = logging.getLogger(__name__)
+
+# A file path or the raw bytes of the document
+DocumentSource = Union[str, os.PathLike, bytes]
+
+# Size of the pseudo-pages text formats are split into
+TEXT_PAGE_CHARS = 3000
+
+SNIFF_BYTES = 8192
+
+FORMAT_LABELS = {
+    "pdf": "PDF",
+    "docx": "DOCX",
+    "pptx": "PPTX",
+    "txt": "TXT",
+    "md": "Markdown",
+    "html": "HTML",
+}
+TEXT_EXTENSIONS = {
+    ".txt": "txt", ".text": "txt",
+    ".md": "md", ".markdown": "md",
+    ".html": "html", ".htm": "html",
+}
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_HTML_START = re.compile(rb"^\s*(<\?xml[^>]*>\s*)?(<!doctype\s+html|<html|<head|<body)", re.IGNORECASE)
+_HTML_TAG = re.compile(rb"<(p|div|h[1-6]|ul|ol|li|table|br|span|a)\b[^>]*>", re.IGNORECASE)
+_MARKDOWN_LINE = re.compile(
+    r"^(#{1,6}\s|\s*[-*+]\s+\S|\s*\d+\.\s+\S|```|>\s)|\[[^\]]+\]\([^)]+\)|\*\*[^*]+\*\*"
+)
+
+UNSUPPORTED_MESSAGE = "Unsupported file type (upload PDF, DOCX, PPTX, TXT, Markdown or HTML)"
+
+_extractors: Dict[str, Callable[[DocumentSource], Iterator[str]]] = {}
+
+
+class UnsupportedFormatError(ValueError):
+    """Raised when a document is not in a supported format"""
+
+
+class DocumentTooLargeError(PDFTooLargeError):
+    """Raised when a document (or the XML inside it) exceeds the size limits"""
+
+
+def register_extractor(name: str):
+    """
+    Register a page iterator for a format (decorator)
+
+    The iterator takes a file path or bytes and yields the text of each
+    page, slide or section in order.
+    """
+    def decorator(func):
+        _extractors[name] = func
+        return func
+    return decorator
+
+
+def supported_formats():
+    """Names of the registered formats"""
+    return list(_extractors)
+
+
+register_extractor("pdf")(iter_pdf_pages)
+
+
+def _head(source: DocumentSource) -> bytes:
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source[:SNIFF_BYTES])
+    with open(source, "rb") as f:
+        return f.read(SNIFF_BYTES)
+
+
+def _open_zip(source: DocumentSource) -> zipfile.ZipFile:
+    if isinstance(source, (bytes, bytearray)):
+        return zipfile.ZipFile(io.BytesIO(source))
+    return zipfile.ZipFile(source)
+
+
+def _decode_head(head: bytes) -> Optional[str]:
+    """The start of the document as text, or None if it looks binary"""
+    for bom, encoding in ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"),
+                          (codecs.BOM_UTF16_BE, "utf-16")):
+        if head.startswith(bom):
+            return head.decode(encoding, errors="ignore")
+    if b"\x00" in head:
+        return None
+    try:
+        return head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample is fine
+        if e.start >= len(head) - 3:
+            return head[:e.start].decode("utf-8")
+    text = head.decode("cp1252", errors="replace")
+    printable = sum(1 for c in text if c.isprintable() or c in "\r\n\t")
+    return text if printable >= 0.95 * len(text) else None
+
+
+def detect_format(source: DocumentSource, filename: Optional[str] = None) -> Optional[str]:
+    """
+    Work out a document's format from its content
+
+    Binary formats are recognised from their signature (and for ZIP files,
+    the parts inside); the file name only decides between the text formats
+    when given.
+
+    Args:
+        source: Path to the file, or its raw bytes
+        filename: Original file name, if known
+
+    Returns:
+        str: A registered format, "zip" for other ZIP archives, or None
+    """
+    head = _head(source)
+    if b"%PDF-" in head[:1024]:
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with _open_zip(source) as archive:
+                names = set(archive.namelist())
+        except zipfile.BadZipFile:
+            return None
+        if "word/document.xml" in names:
+            return "docx"
+        if "ppt/presentation.xml" in names:
+            return "pptx"
+        return "zip"
+
+    text = _decode_head(head)
+    if text is None:
+        return None
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension in TEXT_EXTENSIONS:
+        return TEXT_EXTENSIONS[extension]
+    if _HTML_START.match(head) or len(_HTML_TAG.findall(head)) >= 3:
+        return "html"
+    if sum(1 for line in text.splitlines() if _MARKDOWN_LINE.search(line)) >= 3:
+        return "md"
+    return "txt"
+
+
+def _check_size(source: DocumentSource):
+    size = len(source) if isinstance(source, (bytes, bytearray)) else os.path.getsize(source)
+    if size > settings.MAX_FILE_SIZE:
+        raise DocumentTooLargeError(
+            f"Document is {size} bytes, the limit is {settings.MAX_FILE_SIZE} bytes"
+        )
+
+
+def _read_text(source: DocumentSource) -> str:
+    _check_size(source)
+    if isinstance(source, (bytes, bytearray)):
+        data = bytes(source)
+    else:
+        with open(source, "rb") as f:
+            data = f.read()
+    for bom, encoding in ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"),
+                          (codecs.BOM_UTF16_BE, "utf-16")):
+        if data.startswith(bom):
+            return data.decode(encoding, errors="replace")
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("cp1252", errors="replace")
+
+
+def _paginate(paragraphs: Iterable[str], page_chars: int = TEXT_PAGE_CHARS) -> Iterator[str]:
+    """Group paragraphs into pages of about page_chars"""
+    page, size = [], 0
+    for paragraph in paragraphs:
+        if paragraph == PAGE_BREAK:
+            if page:
+                yield "\n".join(page).strip()
+            page, size = [], 0
+            continue
+        page.append(paragraph)
+        size += len(paragraph) + 1
+        if size >= page_chars:
+            yield "\n".join(page).strip()
+            page, size = [], 0
+    if page:
+        yield "\n".join(page).strip()
+
+
+class _LimitedReader(io.RawIOBase):
+    """File wrapper that refuses to decompress more than limit bytes"""
+
+    def __init__(self, raw, limit):
+        self._raw = raw
+        self._remaining = limit
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._raw.read(min(len(buffer), self._remaining + 1))
+        self._remaining -= len(data)
+        if self._remaining < 0:
+            raise DocumentTooLargeError(
+                f"Document XML exceeds {settings.MAX_UNCOMPRESSED_SIZE} bytes uncompressed"
+            )
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _open_part(archive: zipfile.ZipFile, name: str):
+    return io.BufferedReader(_LimitedReader(archive.open(name), settings.MAX_UNCOMPRESSED_SIZE))
+
+
+@register_extractor("docx")
+def iter_docx_pages(source: DocumentSource) -> Iterator[str]:
+    """
+    Yield DOCX pages from the body XML, streamed with iterparse
+
+    Pages end at explicit and last-rendered page breaks, or after about
+    TEXT_PAGE_CHARS. Headers and footers live in other parts and are not
+    read.
+    """
+    _check_size(source)
+
+    def paragraphs():
+        with _open_zip(source) as archive, _open_part(archive, "word/document.xml") as f:
+            runs = []
+            for _, elem in ET.iterparse(f, events=("end",)):
+                tag = elem.tag
+                if tag == _W + "t":
+                    runs.append(elem.text or "")
+                elif tag == _W + "tab":
+                    runs.append("\t")
+                elif tag == _W + "br" and elem.get(_W + "type") != "page":
+                    runs.append("\n")
+                elif tag == _W + "lastRenderedPageBreak" or (tag == _W + "br" and elem.get(_W + "type") == "page"):
+                    if runs:
+                        yield "".join(runs)
+                        runs = []
+                    yield PAGE_BREAK
+                elif tag == _W + "p":
+                    yield "".join(runs)
+                    runs = []
+                    elem.clear()
+
+    return _paginate(paragraphs())
+
+
+def _slide_names(archive: zipfile.ZipFile):
+    """Slide part names in presentation order"""
+    with _open_part(archive, "ppt/_rels/presentation.xml.rels") as f:
+        targets = {
+            rel.get("Id"): rel.get("Target")
+            for rel in ET.parse(f).getroot().iter(_REL + "Relationship")
+        }
+    with _open_part(archive, "ppt/presentation.xml") as f:
+        ids = [slide.get(_R + "id") for slide in ET.parse(f).getroot().iter(_P + "sldId")]
+    names = []
+    for rel_id in ids:
+        target = targets.get(rel_id)
+        if target:
+            names.append(target.lstrip("/") if target.startswith("/") else f"ppt/{target}")
+    return names
+
+
+@register_extractor("pptx")
+def iter_pptx_slides(source: DocumentSource) -> Iterator[str]:
+    """Yield the text of each PPTX slide in presentation order (one paragraph per line)"""
+    _check_size(source)
+    with _open_zip(source) as archive:
+        for name in _slide_names(archive):
+            lines, runs = [], []
+            with _open_part(archive, name) as f:
+                for _, elem in ET.iterparse(f, events=("end",)):
+                    if elem.tag == _A + "t":
+                        runs.append(elem.text or "")
+                    elif elem.tag == _A + "br":
+                        runs.append("\n")
+                    elif elem.tag == _A + "p":
+                        line = "".join(runs).strip()
+                        if line:
+                            lines.append(line)
+                        runs = []
+            yield "\n".join(lines)
+
+
+@register_extractor("txt")
+def iter_text_pages(source: DocumentSource) -> Iterator[str]:
+    """Yield plain-text pages (form feeds are kept as page breaks)"""
+    text = _read_text(source)
+
+    def paragraphs():
+        for page in text.split(PAGE_BREAK):
+            yield from page.splitlines()
+            yield PAGE_BREAK
+
+    return _paginate(paragraphs())
+
+
+_MD_FENCE = re.compile(r"^\s*(```|~~~)")
+_MD_RULE = re.compile(r"^\s*([-*_]\s*){3,}$")
+_MD_TABLE_RULE = re.compile(r"^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$")
+_MD_INLINE = [
+    (re.compile(r"!\[([^\]]*)\]\([^)]*\)"), r"\1"),      # images -> alt text
+    (re.compile(r"\[([^\]]+)\]\([^)]*\)"), r"\1"),       # links -> link text
+    (re.compile(r"<[^>]+>"), ""),                        # inline HTML
+    (re.compile(r"(\*\*|__)(.+?)\1"), r"\2"),            # bold
+    (re.compile(r"(?<!\w)([*_])(.+?)\1(?!\w)"), r"\2"),  # italics
+    (re.compile(r"`([^`]*)`"), r"\1"),                   # inline code
+]
+
+
+def _markdown_line(line: str) -> str:
+    line = re.sub(r"^\s{0,3}#{1,6}\s+", "", line).rstrip("#").rstrip()
+    line = re.sub(r"^\s*>\s?", "", line)
+    if "|" in line:
+        line = " ".join(cell.strip() for cell in line.strip().strip("|").split("|"))
+    for pattern, replacement in _MD_INLINE:
+        line = pattern.sub(replacement, line)
+    return line
+
+
+@register_extractor("md")
+def iter_markdown_pages(source: DocumentSource) -> Iterator[str]:
+    """Yield Markdown as plain text: markup, front matter and fences removed"""
+    lines = _read_text(source).splitlines()
+
+    def paragraphs():
+        start = 0
+        if lines and lines[0].strip() == "---":
+            # YAML front matter
+            end = next((i for i in range(1, len(lines)) if lines[i].strip() in ("---", "...")), None)
+            if end is not None:
+                start = end + 1
+        for line in lines[start:]:
+            if _MD_FENCE.match(line) or _MD_RULE.match(line) or _MD_TABLE_RULE.match(line):
+                continue
+            yield _markdown_line(line)
+
+    return _paginate(paragraphs())
+
+
+class _HTMLText(HTMLParser):
+    """Collects visible text as paragraphs, skipping scripts and page chrome"""
+
+    SKIP = {"script", "style", "noscript", "template", "head", "nav", "header", "footer", "aside", "svg"}
+    BLOCKS = {
+        "p", "div", "br", "li", "tr", "section", "article", "h1", "h2", "h3", "h4", "h5", "h6",
+        "blockquote", "pre", "table", "ul", "ol", "dd", "dt", "figcaption", "hr",
+    }
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.paragraphs = []
+        self._current = []
+        self._skip_depth = 0
+
+    def _flush(self):
+        text = " ".join("".join(self._current).split())
+        if text:
+            self.paragraphs.append(text)
+        self._current = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip_depth += 1
+        elif tag in self.BLOCKS:
+            self._flush()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in self.BLOCKS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.BLOCKS:
+            self._flush()
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._current.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+@register_extractor("html")
+def iter_html_pages(source: DocumentSource) -> Iterator[str]:
+    """Yield the visible text of an HTML page, fed to the parser incrementally"""
+    text = _read_text(source)
+
+    def paragraphs():
+        parser = _HTMLText()
+        for start in range(0, len(text), 65536):
+            parser.feed(text[start:start + 65536])
+            yield from parser.paragraphs
+            parser.paragraphs = []
+        parser.close()
+        yield from parser.paragraphs
+
+    return _paginate(paragraphs())
+
+
+def iter_document_pages(
+    source: DocumentSource,
+    document_format: Optional[str] = None,
+    max_chars: Optional[int] = None
+) -> Iterator[str]:
+    """
+    Yield the text of each page (slide, section) of any supported document
+
+    Args:
+        source: Path to the file, or its raw bytes
+        document_format: A registered format (detected when None)
+        max_chars: Stop once this many characters have been yielded
+
+    Raises:
+        UnsupportedFormatError: If the format isn't supported
+    """
+    document_format = document_format or detect_format(source)
+    extractor = _extractors.get(document_format)
+    if extractor is None:
+        raise UnsupportedFormatError(UNSUPPORTED_MESSAGE)
+
+    collected = 0
+    for page in extractor(source):
+        yield page
+        collected += len(page) + 1
+        if max_chars is not None and collected >= max_chars:
+            return
+
+
+def extract_text(
+    source: DocumentSource,
+    document_format: Optional[str] = None,
+    max_chars: Optional[int] = None
+) -> Optional[str]:
+    """
+    Extract text content from any supported document
+
+    Top-level so it can be shipped to a worker process.
+
+    Args:
+        source: Path to the file, or its raw bytes
+        document_format: A registered format (detected when None)
+        max_chars: Stop reading pages once this much text is collected
+
+    Returns:
+        Extracted text (pages separated by PAGE_BREAK), or None if extraction fails
+
+    Raises:
+        PDFTooLargeError: If the document exceeds the size or page limits
+        UnsupportedFormatError: If the format isn't supported
+    """
+    try:
+        return PAGE_BREAK.join(iter_document_pages(source, document_format, max_chars)).strip()
+    except (PDFTooLargeError, UnsupportedFormatError):
+        raise
+    except Exception as e:
+        logger.error("Error extracting document text: %s", e)
+        return None
+
+
+async def extract_text_async(
+    source: DocumentSource,
+    document_format: Optional[str] = None,
+    max_chars: Optional[int] = None
+) -> Optional[str]:
+    """
+    Extract text in the document process pool without blocking the event loop
+
+    PDFs keep their page-range parallelism for whole large documents; other
+    formats are extracted by one worker each, so the documents of a batch
+    are spread across the pool.
+
+    Args:
+        source: Path to the file, or its raw bytes
+        document_format: A registered format (detected when None)
+        max_chars: Stop reading pages once this much text is collected
+
+    Returns:
+        Extracted text, or None if extraction fails
+    """
+    document_format = document_format or detect_format(source)
+    if document_format == "pdf":
+        return await extract_text_from_pdf_async(source, max_chars)
+    if document_format not in _extractors:
+        raise UnsupportedFormatError(UNSUPPORTED_MESSAGE)
+    return await run_in_pdf_executor(extract_text, source, document_format, max_chars)
@@ -0,0 +1,63 @@
+# app/utils/executors.py
+
+"""
+Bounded executors for blocking work (document parsing, BERT inference)
+Keeps CPU-heavy calls off the event loop so one upload can't stall the worker
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from app.config.settings import settings
+
+_pdf_executor = None
+_bert_executor = None
+
+
+def get_pdf_executor():
+    """Return the shared process pool used for document parsing (created on first use)"""
+    global _pdf_executor
+    if _pdf_executor is None:
+        # spawn instead of fork: the parent may already hold torch threads
+        _pdf_executor = ProcessPoolExecutor(
+            max_workers=settings.PDF_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pdf_executor
+
+
+def get_bert_executor():
+    """Return the shared thread pool used for BERT inference (created on first use)"""
+    global _bert_executor
+    if _bert_executor is None:
+        # torch releases the GIL during encode, so threads are enough here
+        _bert_executor = ThreadPoolExecutor(
+            max_workers=settings.BERT_WORKERS,
+            thread_name_prefix="bert"
+        )
+    return _bert_executor
+
+
+async def run_in_pdf_executor(func, *args, **kwargs):
+    """Run a picklable function in the document process pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pdf_executor(), partial(func, *args, **kwargs))
+
+
+async def run_in_bert_executor(func, *args, **kwargs):
+    """Run a function in the BERT thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_bert_executor(), partial(func, *args, **kwargs))
+
+
+def shutdown_executors():
+    """Shut down both pools (called on application shutdown)"""
+    global _pdf_executor, _bert_executor
+    if _pdf_executor is not None:
+        _pdf_executor.shutdown(wait=False, cancel_futures=True)
+        _pdf_executor = None
+    if _bert_executor is not None:
+        _bert_executor.shutdown(wait=False, cancel_futures=True)
+        _bert_executor = None
@@ -0,0 +1,117 @@
+# app/utils/json_repair.py
+
+"""
+Tolerant parsing of quiz JSON returned by Gemini
+Handles markdown fences, prose around the object, trailing commas and
+truncated output (salvaging every question that did complete)
+"""
+
+import json
+import re
+
+from app.utils.json_stream import QuizStreamParser
+
+QUIZ_SECTIONS = ["multiple_choice", "true_false", "identification"]
+
+
+def strip_trailing_commas(text):
+    """Remove commas directly before } or ] (ignoring string contents)"""
+    out = []
+    in_string = False
+    escape = False
+    pending_comma = None
+
+    for c in text:
+        if in_string:
+            out.append(c)
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+            continue
+
+        if pending_comma is not None:
+            if c.isspace():
+                pending_comma.append(c)
+                continue
+            if c not in "}]":
+                out.append(",")
+            out.extend(pending_comma)
+            pending_comma = None
+
+        if c == ",":
+            pending_comma = []
+        else:
+            out.append(c)
+            if c == '"':
+                in_string = True
+
+    if pending_comma is not None:
+        out.append(",")
+        out.extend(pending_comma)
+    return "".join(out)
+
+
+def _loads_tolerant(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(strip_trailing_commas(text))
+
+
+def _extract_object(text):
+    """Slice from the first { to the last } (drops fences and surrounding prose)"""
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1:
+        return None
+    if end < start:
+        return text[start:]
+    return text[start:end + 1]
+
+
+def parse_quiz_json(text):
+    """
+    Parse a quiz JSON document, repairing it where possible
+
+    Args:
+        text (str): Raw model output
+
+    Returns:
+        tuple: (quiz_data, repaired)
+        - quiz_data: dict with the three quiz sections (possibly short)
+        - repaired: True if the strict parse failed and recovery was needed
+
+    Raises:
+        ValueError: If no question at all could be recovered
+    """
+    stripped = text.strip()
+    try:
+        quiz_data = json.loads(stripped)
+        if isinstance(quiz_data, dict):
+            return quiz_data, False
+    except json.JSONDecodeError:
+        pass
+
+    # Fences/prose around the object, trailing commas
+    candidate = _extract_object(stripped)
+    if candidate is not None:
+        try:
+            quiz_data = _loads_tolerant(candidate)
+            if isinstance(quiz_data, dict):
+                return quiz_data, True
+        except json.JSONDecodeError:
+            pass
+
+    # Truncated or otherwise broken: keep every item object that completed
+    parser = QuizStreamParser(loads=_loads_tolerant)
+    quiz_data = {section: [] for section in QUIZ_SECTIONS}
+    for section, item in parser.feed(stripped):
+        if section in quiz_data and isinstance(item, dict):
+            quiz_data[section].append(item)
+
+    if not any(quiz_data.values()):
+        raise ValueError("No quiz questions could be recovered from the response")
+    return quiz_data, True
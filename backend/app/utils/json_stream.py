@@ -0,0 +1,98 @@
+# app/utils/json_stream.py
+
+"""
+Incremental parser for streamed quiz JSON
+Emits each question object as soon as its closing brace arrives, without
+waiting for the rest of the completion
+"""
+
+import json
+
+
+class QuizStreamParser:
+    """
+    Feed raw text chunks of a {"section": [ {...}, ... ], ...} document and
+    get back (section, item) pairs for every completed item object.
+
+    Anything before the first "{" (e.g. a ```json fence) is ignored.
+    Items that fail to decode with `loads` are skipped.
+    """
+
+    def __init__(self, loads=json.loads):
+        self._loads = loads
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._section = None
+        self._item_start = None
+
+    def feed(self, chunk):
+        """
+        Consume a chunk of streamed text
+
+        Args:
+            chunk (str): Next piece of the model output
+
+        Returns:
+            list: (section, item_dict) for each item completed by this chunk
+        """
+        self._text += chunk
+        completed = []
+        text = self._text
+
+        for i in range(self._pos, len(text)):
+            c = text[i]
+
+            if not self._started:
+                if c == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = text[self._string_start + 1:i]
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                self._depth += 1
+                if c == "[" and self._depth == 2:
+                    self._section = self._last_string
+                elif c == "{" and self._depth == 3 and self._section:
+                    self._item_start = i
+            elif c in "}]":
+                if c == "}" and self._depth == 3 and self._item_start is not None:
+                    try:
+                        completed.append((self._section, self._loads(text[self._item_start:i + 1])))
+                    except ValueError:
+                        pass
+                    self._item_start = None
+                self._depth -= 1
+                if self._depth == 1:
+                    self._section = None
+
+        self._pos = len(text)
+        self._compact()
+        return completed
+
+    def _compact(self):
+        """Drop consumed text that no pending item or key still refers to"""
+        if self._item_start is not None or self._in_string:
+            return
+        self._text = ""
+        self._pos = 0
+        self._string_start = None
@@ -0,0 +1,176 @@
+# app/utils/metrics.py
+
+"""
+Prometheus metrics and per-request stage timing for the quiz pipeline
+
+- increment(): named event counters (repair rates, top-ups, ...)
+- stage(): times one pipeline stage into a histogram and records it as a
+  span on the current request, so slow requests can be broken down
+- MetricsMiddleware: request latency histogram + slow-request log
+- render_metrics(): Prometheus text format for /metrics (multiprocess
+  aware when PROMETHEUS_MULTIPROC_DIR is set)
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    REGISTRY,
+)
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages timed with stage()
+STAGE_UPLOAD = "upload_read"
+STAGE_EXTRACTION = "extraction"
+STAGE_PROMPT = "prompt_build"
+STAGE_GEMINI = "gemini_call"
+STAGE_PARSE = "json_parse"
+STAGE_FORMAT = "formatting"
+STAGE_CLASSIFY = "classification"
+
+_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+EVENTS = Counter("quiz_events_total", "Pipeline events (JSON repairs, top-ups, ...)", ["event"])
+STAGE_SECONDS = Histogram(
+    "quiz_stage_duration_seconds", "Time spent per pipeline stage", ["stage"], buckets=_LATENCY_BUCKETS
+)
+GEMINI_TOKENS = Counter("quiz_gemini_tokens_total", "Gemini tokens from usage metadata", ["kind"])
+GEMINI_REQUESTS = Counter("quiz_gemini_requests_total", "Gemini calls by outcome", ["outcome"])
+HTTP_SECONDS = Histogram(
+    "quiz_http_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"], buckets=_LATENCY_BUCKETS
+)
+
+# In-process snapshot behind get_counters() (Prometheus counters can't be read back cheaply)
+_counters = defaultdict(int)
+_lock = threading.Lock()
+
+# Spans of the request being handled; None outside a request (e.g. job workers)
+_spans = contextvars.ContextVar("quiz_request_spans", default=None)
+
+
+def increment(name, amount=1):
+    """Add amount to the named counter"""
+    EVENTS.labels(event=name).inc(amount)
+    with _lock:
+        _counters[name] += amount
+
+
+def get_counters():
+    """Return a snapshot of all counters"""
+    with _lock:
+        return dict(_counters)
+
+
+def record_tokens(prompt_tokens, output_tokens):
+    """Count Gemini token usage"""
+    if prompt_tokens:
+        GEMINI_TOKENS.labels(kind="prompt").inc(prompt_tokens)
+    if output_tokens:
+        GEMINI_TOKENS.labels(kind="output").inc(output_tokens)
+
+
+def record_gemini_request(outcome):
+    """Count one Gemini attempt: success, retry, error or circuit_open"""
+    GEMINI_REQUESTS.labels(outcome=outcome).inc()
+
+
+def observe_stage(name, seconds):
+    """Record a stage duration measured elsewhere"""
+    STAGE_SECONDS.labels(stage=name).observe(seconds)
+    spans = _spans.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as pipeline stage `name`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request
+
+    Requests slower than SLOW_REQUEST_SECONDS are logged at WARNING with
+    their per-stage breakdown.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def tracking_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        spans = []
+        token = _spans.set(spans)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, tracking_send)
+        finally:
+            elapsed = time.perf_counter() - start
+            _spans.reset(token)
+
+            # Route template, not the raw path, to keep label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_SECONDS.labels(method=scope["method"], route=route, status=str(status)).observe(elapsed)
+
+            if elapsed >= settings.SLOW_REQUEST_SECONDS:
+                # Repeated stages (per-question classification) are summed
+                totals, counts = {}, defaultdict(int)
+                for name, seconds in spans:
+                    totals[name] = totals.get(name, 0.0) + seconds
+                    counts[name] += 1
+                breakdown = ", ".join(
+                    f"{name}={seconds:.3f}s" + (f" (x{counts[name]})" if counts[name] > 1 else "")
+                    for name, seconds in totals.items()
+                )
+                logger.warning(
+                    "Slow request: %s %s -> %s in %.3fs [%s]",
+                    scope["method"], scope["path"], status, elapsed, breakdown or "no stages"
+                )
+
+
+def render_metrics():
+    """
+    Render all metrics in the Prometheus text format
+
+    Returns:
+        tuple: (body bytes, content type)
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Aggregate across uvicorn worker processes
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,125 @@
+# app/utils/upload_limits.py
+
+"""
+Upload size limits enforced while the request is still streaming in
+Oversized multipart bodies are rejected with 413 from the Content-Length
+header, or as soon as the received bytes pass the limit, instead of after
+the multipart parser has spooled the whole upload
+"""
+
+import json
+
+from fastapi import HTTPException, UploadFile
+
+from app.config.settings import settings
+from app.utils.metrics import stage, STAGE_UPLOAD
+
+# Room for the non-file form fields and multipart boundaries
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLargeError(HTTPException):
+    """413 raised from inside the body stream (FastAPI passes HTTPExceptions through)"""
+
+    def __init__(self, limit):
+        super().__init__(status_code=413, detail=f"Upload too large (limit {limit} bytes)")
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware capping the size of multipart/form-data request bodies
+
+    Args:
+        app: The wrapped ASGI app
+        max_body_size (int): Default limit in bytes
+        path_limits (dict): Optional per-path overrides {path: bytes}
+    """
+
+    def __init__(self, app, max_body_size, path_limits=None):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").lower().startswith(b"multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.path_limits.get(scope["path"], self.max_body_size)
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await self._reject(send, limit)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise UploadTooLargeError(limit)
+            return message
+
+        response_started = False
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except UploadTooLargeError:
+            # Raised outside a FastAPI route (otherwise it became a 413 response)
+            if not response_started:
+                await self._reject(send, limit)
+
+    @staticmethod
+    async def _reject(send, limit):
+        body = json.dumps({"detail": f"Upload too large (limit {limit} bytes)"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+async def read_upload(file: UploadFile, max_size=None) -> bytes:
+    """
+    Read an upload from its spooled buffer, enforcing max_size as it goes
+
+    Small uploads are read from memory, larger ones from the anonymous
+    tempfile Starlette spooled them to; nothing is written under a shared
+    directory or a client-chosen filename.
+
+    Args:
+        file (UploadFile): The uploaded file
+        max_size (int): Limit in bytes (defaults to MAX_FILE_SIZE)
+
+    Returns:
+        bytes: The file contents
+
+    Raises:
+        UploadTooLargeError: As soon as more than max_size bytes were read
+    """
+    max_size = settings.MAX_FILE_SIZE if max_size is None else max_size
+    data = bytearray()
+    with stage(STAGE_UPLOAD):
+        while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+            data += chunk
+            if len(data) > max_size:
+                raise UploadTooLargeError(max_size)
+    return bytes(data)
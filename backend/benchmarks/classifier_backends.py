@@ -0,0 +1,118 @@
+# benchmarks/classifier_backends.py
+
+"""
+Accuracy parity and throughput/RSS of the BERT inference backends
+
+Each backend runs in its own spawned process so peak RSS is measured in
+isolation. LOTS/HOTS decisions on a fixed question set are compared with
+the torch backend; the script exits non-zero if any backend agrees on
+fewer than --min-agreement of the questions.
+Run from the backend directory:
+    python benchmarks/classifier_backends.py [--backends torch onnx int8]
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.question_set import BENCHMARK_QUESTIONS as PARITY_QUESTIONS
+
+BATCH_SIZE = 32
+REPEATS = 10
+
+
+def run_backend(backend_name, model_name, queue):
+    """Child process: load one backend, score the parity set, time encode"""
+    try:
+        from app.services.bert_classifier import build_centroid_matrix, score_embeddings
+        from app.services.inference_backends import create_backend
+        from app.utils.blooms_taxonomy import get_lots_keywords, get_hots_keywords
+
+        start = time.perf_counter()
+        backend = create_backend(backend_name, model_name)
+        centroids = build_centroid_matrix(
+            backend.encode(get_lots_keywords()), backend.encode(get_hots_keywords())
+        )
+        load_seconds = time.perf_counter() - start
+
+        scores = score_embeddings(backend.encode(PARITY_QUESTIONS), centroids)
+
+        batch = (PARITY_QUESTIONS * (BATCH_SIZE // len(PARITY_QUESTIONS) + 1))[:BATCH_SIZE]
+        backend.encode(batch)  # warm-up
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            backend.encode(batch)
+        throughput = REPEATS * BATCH_SIZE / (time.perf_counter() - start)
+
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+        queue.put({
+            "backend": backend_name,
+            "scores": scores.tolist(),
+            "load_seconds": load_seconds,
+            "throughput": throughput,
+            "peak_rss_mb": peak_rss_mb,
+        })
+    except Exception as e:
+        queue.put({"backend": backend_name, "error": f"{type(e).__name__}: {e}"})
+
+
+def measure(backend_name, model_name):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=run_backend, args=(backend_name, model_name, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    from app.config.settings import settings
+    from app.services.inference_backends import BACKENDS
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--model", default=settings.BERT_MODEL_NAME)
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args()
+
+    backends = list(args.backends)
+    if "torch" not in backends:
+        backends.insert(0, "torch")  # the parity reference
+
+    results = {name: measure(name, args.model) for name in backends}
+    reference = results["torch"]
+    if "error" in reference:
+        print(f"torch reference backend failed: {reference['error']}")
+        return 1
+    reference_scores = np.array(reference["scores"])
+    reference_hots = reference_scores[:, 1] > reference_scores[:, 0]
+
+    failed = False
+    print(f"{'backend':>8} {'load s':>7} {'q/s':>8} {'peak RSS MB':>12} {'agreement':>10} {'max |diff|':>11}")
+    for name in backends:
+        result = results[name]
+        if "error" in result:
+            print(f"{name:>8} failed: {result['error']}")
+            failed = True
+            continue
+
+        scores = np.array(result["scores"])
+        agreement = float(np.mean((scores[:, 1] > scores[:, 0]) == reference_hots))
+        max_diff = float(np.max(np.abs(scores - reference_scores)))
+        print(f"{name:>8} {result['load_seconds']:>7.1f} {result['throughput']:>8.1f} "
+              f"{result['peak_rss_mb']:>12.0f} {agreement:>9.1%} {max_diff:>11.2e}")
+        if agreement < args.min_agreement:
+            failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# benchmarks/classifier_scoring.py
+
+"""
+Microbenchmark: LOTS/HOTS scoring kernel vs the old per-question loop
+
+Uses synthetic embeddings so it measures scoring cost only (no encode).
+Run from the backend directory:
+    python benchmarks/classifier_scoring.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.services.bert_classifier import build_centroid_matrix, score_embeddings
+
+DIM = 384
+BATCH_SIZES = [1, 32, 1024]
+REPEATS = 20
+
+
+def legacy_scores(question_embeddings, lots_embeddings, hots_embeddings):
+    """The pre-vectorization loop, kept here as the reference implementation"""
+    scores = []
+    for question_embedding in question_embeddings:
+        lots_score = np.mean(cosine_similarity([question_embedding], lots_embeddings))
+        hots_score = np.mean(cosine_similarity([question_embedding], hots_embeddings))
+        scores.append((lots_score, hots_score))
+    return np.array(scores, dtype=np.float32)
+
+
+def time_per_question(func, batch_size):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        func()
+    elapsed = time.perf_counter() - start
+    return elapsed / (REPEATS * batch_size) * 1e6  # microseconds
+
+
+def main():
+    rng = np.random.default_rng(0)
+    lots_embeddings = rng.standard_normal((36, DIM)).astype(np.float32)
+    hots_embeddings = rng.standard_normal((48, DIM)).astype(np.float32)
+    centroids = build_centroid_matrix(lots_embeddings, hots_embeddings)
+
+    print(f"{'batch':>6} {'legacy us/q':>12} {'kernel us/q':>12} {'speedup':>8} {'max |diff|':>11}")
+    for batch_size in BATCH_SIZES:
+        questions = rng.standard_normal((batch_size, DIM)).astype(np.float32)
+
+        expected = legacy_scores(questions, lots_embeddings, hots_embeddings)
+        actual = score_embeddings(questions, centroids)
+        max_diff = float(np.max(np.abs(expected - actual)))
+        assert max_diff < 1e-6, f"score mismatch at batch {batch_size}: {max_diff}"
+
+        legacy = time_per_question(
+            lambda: legacy_scores(questions, lots_embeddings, hots_embeddings), batch_size
+        )
+        kernel = time_per_question(
+            lambda: score_embeddings(questions, centroids), batch_size
+        )
+        print(f"{batch_size:>6} {legacy:>12.2f} {kernel:>12.2f} {legacy / kernel:>7.1f}x {max_diff:>11.2e}")
+
+
+if __name__ == "__main__":
+    main()
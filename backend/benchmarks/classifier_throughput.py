@@ -0,0 +1,109 @@
+# benchmarks/classifier_throughput.py
+
+"""
+Classifier throughput and latency percentiles across batch sizes and backends
+
+Each backend runs in its own spawned process with the question embedding
+cache disabled, so every call pays for a full encode + score. Batches are
+drawn from the shared benchmark question set.
+Run from the backend directory:
+    python benchmarks/classifier_throughput.py [--backends torch onnx int8] [--json out.json]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.common import percentiles, add_json_argument, write_results
+from benchmarks.question_set import BENCHMARK_QUESTIONS
+
+BATCH_SIZES = [1, 8, 32, 128]
+REPEATS = 20
+
+
+def _batch(size, offset):
+    questions = BENCHMARK_QUESTIONS
+    return [questions[(offset + i) % len(questions)] for i in range(size)]
+
+
+def run_backend(backend_name, batch_sizes, repeats, queue):
+    """Child process: load one backend and time classification per batch size"""
+    os.environ["BERT_BACKEND"] = backend_name
+    os.environ["QUESTION_EMBEDDING_CACHE_MAX_ENTRIES"] = "0"
+    os.environ["QUESTION_EMBEDDING_CACHE_PATH"] = ""
+    try:
+        from app.services.bert_classifier import load_classifier, get_detailed_classifications
+
+        start = time.perf_counter()
+        load_classifier()
+        results = {"load_s": round(time.perf_counter() - start, 3)}
+
+        for batch_size in batch_sizes:
+            get_detailed_classifications(_batch(batch_size, 0))  # warm-up
+            durations = []
+            for i in range(repeats):
+                batch = _batch(batch_size, i * batch_size)
+                start = time.perf_counter()
+                get_detailed_classifications(batch)
+                durations.append(time.perf_counter() - start)
+            results[f"batch_{batch_size}"] = {
+                **percentiles(durations),
+                "questions_per_s": round(batch_size * repeats / sum(durations), 1),
+            }
+        queue.put(results)
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def measure(backend_name, batch_sizes, repeats):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=run_backend, args=(backend_name, batch_sizes, repeats, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def run(backends=("torch",), batch_sizes=BATCH_SIZES, repeats=REPEATS):
+    """
+    Returns:
+        dict: {backend: {"load_s", "batch_<n>": {percentiles, questions_per_s}} or {"error"}}
+    """
+    return {name: measure(name, batch_sizes, repeats) for name in backends}
+
+
+def main():
+    from app.services.inference_backends import BACKENDS
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["torch"], choices=BACKENDS)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=BATCH_SIZES)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    add_json_argument(parser)
+    args = parser.parse_args()
+
+    results = run(args.backends, args.batch_sizes, args.repeats)
+
+    failed = False
+    print(f"{'backend':>8} {'batch':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'q/s':>9}")
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:>8} failed: {result['error']}")
+            failed = True
+            continue
+        for batch_size in args.batch_sizes:
+            stats = result[f"batch_{batch_size}"]
+            print(f"{name:>8} {batch_size:>6} {stats['p50_ms']:>9.2f} {stats['p90_ms']:>9.2f} "
+                  f"{stats['p99_ms']:>9.2f} {stats['questions_per_s']:>9.1f}")
+
+    if args.json:
+        write_results(args.json, {"classifier_throughput": results})
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
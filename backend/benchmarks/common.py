@@ -0,0 +1,101 @@
+# benchmarks/common.py
+
+"""
+Helpers shared by the benchmark suite: latency percentiles, run metadata
+and JSON result files
+
+Result files hold {"meta": {...}, "benchmarks": {name: results}} so runs on
+different commits can be diffed with benchmarks/compare.py. Metric names
+carry their unit: *_ms and *_s are lower-is-better, *_per_s higher-is-better.
+"""
+
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+# Benchmarks never call the real Gemini API (and don't need a key)
+os.environ.setdefault("GEMINI_TRANSPORT", "fake")
+
+
+def percentiles(samples):
+    """
+    Summarize latencies
+
+    Args:
+        samples (list): Durations in seconds
+
+    Returns:
+        dict: mean/p50/p90/p99/max in milliseconds
+    """
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(pick(0.50), 3),
+        "p90_ms": round(pick(0.90), 3),
+        "p99_ms": round(pick(0.99), 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def _git(*args):
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def run_metadata():
+    """Commit, interpreter and machine the results were measured on"""
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def default_results_path():
+    """benchmarks/results/<short commit>.json"""
+    commit = _git("rev-parse", "--short", "HEAD") or "unknown"
+    return os.path.join(RESULTS_DIR, f"{commit}.json")
+
+
+def add_json_argument(parser):
+    parser.add_argument("--json", metavar="PATH", help="also write the results to this JSON file")
+
+
+def write_results(path, benchmarks):
+    """
+    Write benchmark results with run metadata
+
+    Args:
+        path (str): Output file ("-" for stdout)
+        benchmarks (dict): {benchmark name: results}
+    """
+    document = {"meta": run_metadata(), "benchmarks": benchmarks}
+    if path == "-":
+        json.dump(document, sys.stdout, indent=2)
+        print()
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {path}")
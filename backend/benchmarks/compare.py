@@ -0,0 +1,83 @@
+# benchmarks/compare.py
+
+"""
+Compare two benchmark result files and flag regressions
+
+Metrics are matched by their path in the JSON. *_ms and *_s are
+lower-is-better, *_per_s higher-is-better; anything else is shown but never
+flagged. Exits non-zero if any metric got worse by more than --threshold.
+Run from the backend directory:
+    python benchmarks/compare.py benchmarks/results/abc1234.json benchmarks/results/def5678.json
+"""
+
+import argparse
+import json
+import sys
+
+
+def flatten(node, prefix=""):
+    """{"a": {"b_ms": 1}} -> {"a.b_ms": 1} (numbers only)"""
+    flat = {}
+    for key, value in node.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def direction(path):
+    """+1 if higher is better, -1 if lower is better, 0 if unknown"""
+    name = path.rsplit(".", 1)[-1]
+    if name.endswith("_per_s"):
+        return 1
+    if name.endswith(("_ms", "_s")):
+        return -1
+    return 0
+
+
+def compare(baseline, current, threshold):
+    """
+    Returns:
+        list: (path, baseline value, current value, relative change, regressed)
+    """
+    old, new = flatten(baseline["benchmarks"]), flatten(current["benchmarks"])
+    rows = []
+    for path in sorted(old.keys() & new.keys()):
+        before, after = old[path], new[path]
+        change = (after - before) / before if before else 0.0
+        sign = direction(path)
+        regressed = sign != 0 and -sign * change > threshold
+        rows.append((path, before, after, change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown")
+    parser.add_argument("--all", action="store_true", help="also list unchanged and unflagged metrics")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    print(f"baseline {baseline['meta'].get('commit', '?')[:10]}  ->  current {current['meta'].get('commit', '?')[:10]}")
+    rows = compare(baseline, current, args.threshold)
+    regressions = 0
+    for path, before, after, change, regressed in rows:
+        regressions += regressed
+        if args.all or regressed or (direction(path) and abs(change) > args.threshold):
+            flag = "REGRESSION" if regressed else ""
+            print(f"{path:<60} {before:>12.3f} {after:>12.3f} {change:>+8.1%} {flag}")
+
+    print(f"{len(rows)} metrics compared, {regressions} regressions (threshold {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
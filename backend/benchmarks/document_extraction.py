@@ -0,0 +1,125 @@
+# benchmarks/document_extraction.py
+
+"""
+Extraction throughput per document format over a synthetic corpus
+
+Every format is built from the same page texts and extracted in-process
+(content sniffing included), then a mixed multi-file batch is extracted
+one document after another and concurrently through the document process
+pool, the way /generate-batch does.
+Run from the backend directory:
+    python benchmarks/document_extraction.py [--pages 50] [--files 12] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.common import percentiles, add_json_argument, write_results
+from benchmarks.synthetic_documents import FORMATS, synthetic_document
+
+PAGES = 50
+FILES = 12
+REPEATS = 5
+
+
+def _summary(durations, page_count, size):
+    total = sum(durations)
+    return {
+        **percentiles(durations),
+        "pages_per_s": round(page_count * len(durations) / total, 1),
+        "mb_per_s": round(size * len(durations) / total / 1e6, 2),
+    }
+
+
+def run(pages=PAGES, files=FILES, repeats=REPEATS, formats=FORMATS):
+    """
+    Returns:
+        dict: {"formats": {format: {"bytes", "chars", "sequential"}},
+            "batch": {"files", "bytes", "sequential", "pool", "speedup"}}
+    """
+    from app.utils.executors import shutdown_executors
+    from app.utils.document_extractors import detect_format, extract_text, extract_text_async
+
+    results = {"formats": {}}
+    for document_format in formats:
+        data = synthetic_document(document_format, pages, seed=pages)
+        durations = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            text = extract_text(data, detect_format(data))
+            durations.append(time.perf_counter() - start)
+            assert text, f"{document_format} extraction returned no text"
+        results["formats"][document_format] = {
+            "bytes": len(data),
+            "chars": len(text),
+            "sequential": _summary(durations, pages, len(data)),
+        }
+
+    # A unit's worth of mixed uploads
+    corpus = [synthetic_document(formats[i % len(formats)], pages, seed=i) for i in range(files)]
+    total_bytes = sum(len(data) for data in corpus)
+    total_pages = pages * files
+
+    sequential = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for data in corpus:
+            assert extract_text(data), "extraction returned no text"
+        sequential.append(time.perf_counter() - start)
+
+    async def measure_pool():
+        await asyncio.gather(*(extract_text_async(data) for data in corpus))  # start the pool workers
+        durations = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            texts = await asyncio.gather(*(extract_text_async(data) for data in corpus))
+            durations.append(time.perf_counter() - start)
+            assert all(texts), "extraction returned no text"
+        return durations
+
+    try:
+        pool = asyncio.run(measure_pool())
+    finally:
+        shutdown_executors()
+
+    results["batch"] = {
+        "files": files,
+        "bytes": total_bytes,
+        "sequential": _summary(sequential, total_pages, total_bytes),
+        "pool": _summary(pool, total_pages, total_bytes),
+        "speedup": round(sum(sequential) / sum(pool), 2),
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=PAGES, help="pages (slides) per document")
+    parser.add_argument("--files", type=int, default=FILES, help="documents in the mixed batch")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=FORMATS)
+    add_json_argument(parser)
+    args = parser.parse_args()
+
+    results = run(args.pages, args.files, args.repeats, args.formats)
+
+    print(f"{'format':>7} {'KB':>7} {'p50 ms':>8} {'pages/s':>9} {'MB/s':>7}")
+    for document_format, result in results["formats"].items():
+        print(f"{document_format:>7} {result['bytes'] / 1024:>7.0f} {result['sequential']['p50_ms']:>8.1f} "
+              f"{result['sequential']['pages_per_s']:>9.1f} {result['sequential']['mb_per_s']:>7.2f}")
+
+    batch = results["batch"]
+    print(f"\nmixed batch of {batch['files']} documents: "
+          f"sequential {batch['sequential']['pages_per_s']:.0f} pages/s, "
+          f"pool {batch['pool']['pages_per_s']:.0f} pages/s ({batch['speedup']}x)")
+
+    if args.json:
+        write_results(args.json, {"document_extraction": results})
+
+
+if __name__ == "__main__":
+    main()
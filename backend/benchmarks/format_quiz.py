@@ -0,0 +1,92 @@
+# benchmarks/format_quiz.py
+
+"""
+format_quiz_for_frontend on large quizzes
+
+Builds Gemini-shaped quiz dicts with an even mix of the three question
+types and times formatting them for the frontend.
+Run from the backend directory:
+    python benchmarks/format_quiz.py [--sizes 15 150 1500 15000] [--json out.json]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.common import percentiles, add_json_argument, write_results
+from benchmarks.question_set import BENCHMARK_QUESTIONS
+
+QUIZ_SIZES = [15, 150, 1500, 15000]
+REPEATS = 20
+
+
+def build_quiz(size):
+    """A Gemini-style quiz dict with size questions split across the three types"""
+    per_type = size // 3
+    questions = BENCHMARK_QUESTIONS
+
+    def question(i):
+        return f"{questions[i % len(questions)]} ({i})"
+
+    return {
+        "multiple_choice": [
+            {"question": question(i), "choices": ["A", "B", "C", "D"], "correct_answer": i % 4, "points": 2}
+            for i in range(size - 2 * per_type)
+        ],
+        "true_false": [
+            {"question": question(i), "correct_answer": i % 2 == 0, "points": 1}
+            for i in range(per_type)
+        ],
+        "identification": [
+            {"question": question(i), "correct_answer": f"answer {i}", "points": 2}
+            for i in range(per_type)
+        ],
+    }
+
+
+def run(sizes=QUIZ_SIZES, repeats=REPEATS):
+    """
+    Returns:
+        dict: {"<size>_questions": {percentiles, questions_per_s}}
+    """
+    from app.services.gemini_service import format_quiz_for_frontend
+
+    results = {}
+    for size in sizes:
+        quiz = build_quiz(size)
+        format_quiz_for_frontend(quiz, "Benchmark")  # warm-up
+        durations = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            formatted = format_quiz_for_frontend(quiz, "Benchmark")
+            durations.append(time.perf_counter() - start)
+        assert len(formatted["questions"]) == size
+        results[f"{size}_questions"] = {
+            **percentiles(durations),
+            "questions_per_s": round(size * repeats / sum(durations), 1),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=QUIZ_SIZES)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    add_json_argument(parser)
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeats)
+
+    print(f"{'questions':>10} {'p50 ms':>9} {'p99 ms':>9} {'q/s':>12}")
+    for size in args.sizes:
+        stats = results[f"{size}_questions"]
+        print(f"{size:>10} {stats['p50_ms']:>9.3f} {stats['p99_ms']:>9.3f} {stats['questions_per_s']:>12.0f}")
+
+    if args.json:
+        write_results(args.json, {"format_quiz": results})
+
+
+if __name__ == "__main__":
+    main()
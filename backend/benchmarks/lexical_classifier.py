@@ -0,0 +1,64 @@
+# benchmarks/lexical_classifier.py
+
+"""
+Lexical pre-classifier: short-circuit rate, agreement with BERT, speed
+
+Every question in the benchmark set is classified by BERT; questions the
+keyword matcher decides are compared with BERT's decision. Exits non-zero
+if agreement on decided questions is below --min-agreement.
+Run from the backend directory:
+    python benchmarks/lexical_classifier.py
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.question_set import BENCHMARK_QUESTIONS
+from app.services.bert_classifier import load_classifier, get_detailed_classifications
+from app.services.lexical_classifier import get_lexical_classifier
+
+REPEATS = 200
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--min-agreement", type=float, default=0.9)
+    parser.add_argument("--verbose", action="store_true", help="list disagreements")
+    args = parser.parse_args()
+
+    lexical = get_lexical_classifier()
+    load_classifier()
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        lexical_results = [lexical.classify(q) for q in BENCHMARK_QUESTIONS]
+    lexical_us = (time.perf_counter() - start) / (REPEATS * len(BENCHMARK_QUESTIONS)) * 1e6
+
+    get_detailed_classifications(BENCHMARK_QUESTIONS[:2])  # warm-up
+    start = time.perf_counter()
+    bert_results = get_detailed_classifications(BENCHMARK_QUESTIONS)
+    bert_us = (time.perf_counter() - start) / len(BENCHMARK_QUESTIONS) * 1e6
+
+    decided = [(q, lex, bert) for q, lex, bert in zip(BENCHMARK_QUESTIONS, lexical_results, bert_results) if lex]
+    agreed = [item for item in decided if item[1]["classification"] == item[2]["classification"]]
+    agreement = len(agreed) / len(decided) if decided else 1.0
+
+    print(f"questions:          {len(BENCHMARK_QUESTIONS)}")
+    print(f"short-circuited:    {len(decided)} ({len(decided) / len(BENCHMARK_QUESTIONS):.1%})")
+    print(f"agreement vs BERT:  {len(agreed)}/{len(decided)} ({agreement:.1%})")
+    print(f"lexical us/q:       {lexical_us:.1f}")
+    print(f"BERT us/q (batch):  {bert_us:.1f}")
+
+    if args.verbose:
+        for question, lex, bert in decided:
+            if lex["classification"] != bert["classification"]:
+                print(f"  lexical {lex['classification']} ({lex['matched_keyword']}) vs BERT {bert['classification']}: {question}")
+
+    return 0 if agreement >= args.min_agreement else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
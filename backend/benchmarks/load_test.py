@@ -0,0 +1,228 @@
+# benchmarks/load_test.py
+
+"""
+End-to-end load test of /api/quiz/generate-from-pdf against the fake Gemini
+
+Starts uvicorn with GEMINI_TRANSPORT=fake (GEMINI_FAKE_LATENCY simulates the
+API round trip), then posts synthetic PDFs at each concurrency level and
+reports latency percentiles, throughput, errors and the mean time per
+pipeline stage scraped from /metrics. Every request uses a different PDF so
+the quiz cache never answers.
+Run from the backend directory:
+    python benchmarks/load_test.py [--concurrency 1 4 16] [--json out.json]
+"""
+
+import argparse
+import http.client
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.common import BACKEND_DIR, percentiles, add_json_argument, write_results
+from benchmarks.synthetic_pdf import synthetic_pdf
+
+CONCURRENCY_LEVELS = [1, 4, 16]
+REQUESTS_PER_LEVEL = 32
+STARTUP_TIMEOUT = 180
+
+_STAGE_SAMPLE = re.compile(r'^quiz_stage_duration_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$', re.M)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _multipart(fields, file_name, file_data):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{file_name}"\r\n'
+        f"Content-Type: application/pdf\r\n\r\n".encode() + file_data + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class Server:
+    """uvicorn running main:app on a free port with the fake Gemini transport"""
+
+    def __init__(self, workers=1, fake_latency=0.5, extra_env=None):
+        self.port = _free_port()
+        self.metrics_dir = tempfile.mkdtemp(prefix="quiz-bench-metrics-")
+        env = dict(os.environ)
+        env.update({
+            "GEMINI_TRANSPORT": "fake",
+            "GEMINI_FAKE_LATENCY": str(fake_latency),
+            "GEMINI_REQUESTS_PER_MINUTE": "1000000",
+            "GEMINI_TOKENS_PER_MINUTE": "1000000000",
+            "PROMETHEUS_MULTIPROC_DIR": self.metrics_dir,
+            "LOG_LEVEL": "WARNING",
+            "SLOW_REQUEST_SECONDS": "3600",
+        })
+        env.update(extra_env or {})
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--workers", str(workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env
+        )
+
+    def request(self, method, path, body=None, headers=None, timeout=300):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=timeout)
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            return response.status, response.read()
+        finally:
+            connection.close()
+
+    def wait_ready(self):
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {self.process.returncode}")
+            try:
+                status, _ = self.request("GET", "/api/quiz/health", timeout=5)
+                if status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.5)
+        raise RuntimeError("Server did not become healthy in time")
+
+    def stage_totals(self):
+        """{stage: (sum seconds, count)} from /metrics"""
+        _, body = self.request("GET", "/metrics")
+        totals = {}
+        for kind, stage, value in _STAGE_SAMPLE.findall(body.decode("utf-8")):
+            seconds, count = totals.get(stage, (0.0, 0.0))
+            if kind == "sum":
+                seconds += float(value)
+            else:
+                count += float(value)
+            totals[stage] = (seconds, count)
+        return totals
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
+
+
+def _stage_means(before, after):
+    means = {}
+    for stage, (seconds, count) in after.items():
+        previous_seconds, previous_count = before.get(stage, (0.0, 0.0))
+        if count > previous_count:
+            means[f"{stage}_ms"] = round((seconds - previous_seconds) / (count - previous_count) * 1000, 3)
+    return means
+
+
+def run_level(server, concurrency, pdfs, questions):
+    fields = {
+        "title": "Load test",
+        "num_multiple_choice": questions,
+        "num_true_false": questions,
+        "num_identification": questions,
+    }
+
+    def post(pdf):
+        body, content_type = _multipart(fields, "load.pdf", pdf)
+        start = time.perf_counter()
+        try:
+            status, _ = server.request(
+                "POST", "/api/quiz/generate-from-pdf", body, {"Content-Type": content_type}
+            )
+        except OSError:
+            status = 0
+        return status, time.perf_counter() - start
+
+    before = server.stage_totals()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(post, pdfs))
+    wall = time.perf_counter() - start
+
+    ok = [duration for status, duration in outcomes if status == 200]
+    return {
+        **percentiles(ok),
+        "requests": len(outcomes),
+        "errors": len(outcomes) - len(ok),
+        "requests_per_s": round(len(ok) / wall, 2),
+        "stages": _stage_means(before, server.stage_totals()),
+    }
+
+
+def run(concurrency_levels=CONCURRENCY_LEVELS, requests_per_level=REQUESTS_PER_LEVEL,
+        pages=3, questions=5, fake_latency=0.5, workers=1):
+    """
+    Returns:
+        dict: {"settings": {...}, "concurrency_<n>": {percentiles, requests_per_s, errors, stages}}
+    """
+    results = {"settings": {
+        "requests_per_level": requests_per_level,
+        "pages": pages,
+        "questions_per_type": questions,
+        "fake_latency": fake_latency,
+        "workers": workers,
+    }}
+    server = Server(workers=workers, fake_latency=fake_latency)
+    try:
+        server.wait_ready()
+        # Warm-up request (first model use, PDF pool start)
+        run_level(server, 1, [synthetic_pdf(pages, seed=-1)], questions)
+
+        seed = 0
+        for concurrency in concurrency_levels:
+            pdfs = [synthetic_pdf(pages, seed=seed + i) for i in range(requests_per_level)]
+            seed += requests_per_level
+            results[f"concurrency_{concurrency}"] = run_level(server, concurrency, pdfs, questions)
+    finally:
+        server.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=CONCURRENCY_LEVELS)
+    parser.add_argument("--requests", type=int, default=REQUESTS_PER_LEVEL, help="requests per level")
+    parser.add_argument("--pages", type=int, default=3, help="pages per synthetic PDF")
+    parser.add_argument("--questions", type=int, default=5, help="questions per type")
+    parser.add_argument("--fake-latency", type=float, default=0.5, help="simulated Gemini seconds")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    add_json_argument(parser)
+    args = parser.parse_args()
+
+    results = run(args.concurrency, args.requests, args.pages, args.questions,
+                  args.fake_latency, args.workers)
+
+    print(f"{'conc':>5} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'req/s':>7} {'errors':>7}  stages (mean ms)")
+    for concurrency in args.concurrency:
+        result = results[f"concurrency_{concurrency}"]
+        stages = ", ".join(f"{name[:-3]}={value:.1f}" for name, value in result["stages"].items())
+        print(f"{concurrency:>5} {result.get('p50_ms', 0):>9.1f} {result.get('p90_ms', 0):>9.1f} "
+              f"{result.get('p99_ms', 0):>9.1f} {result['requests_per_s']:>7.2f} {result['errors']:>7}  {stages}")
+
+    if args.json:
+        write_results(args.json, {"load_test": results})
+    return 1 if any(results[f"concurrency_{c}"]["errors"] for c in args.concurrency) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
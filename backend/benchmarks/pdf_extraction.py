@@ -0,0 +1,108 @@
+# benchmarks/pdf_extraction.py
+
+"""
+PDF extraction throughput over a corpus of synthetic PDFs
+
+Each document size is extracted in-process (one core, PyPDF2) and through
+the PDF process pool (page ranges in parallel above PDF_PARALLEL_MIN_PAGES),
+plus the prompt-budget early stop used by regular quiz requests.
+Run from the backend directory:
+    python benchmarks/pdf_extraction.py [--pages 1 10 50 200] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.common import percentiles, add_json_argument, write_results
+from benchmarks.synthetic_pdf import synthetic_pdf
+
+PAGE_COUNTS = [1, 10, 50, 200]
+REPEATS = 5
+
+
+def _summary(durations, page_count, size):
+    total = sum(durations)
+    return {
+        **percentiles(durations),
+        "pages_per_s": round(page_count * len(durations) / total, 1),
+        "mb_per_s": round(size * len(durations) / total / 1e6, 2),
+    }
+
+
+async def _time_async(func, repeats):
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        text = await func()
+        durations.append(time.perf_counter() - start)
+        assert text, "extraction returned no text"
+    return durations
+
+
+def run(page_counts=PAGE_COUNTS, repeats=REPEATS):
+    """
+    Returns:
+        dict: {"<pages>_pages": {"bytes", "sequential", "pool", "prompt_budget"}}
+    """
+    from app.config.settings import settings
+    from app.utils.executors import shutdown_executors
+    from app.utils.pdf_extractor import extract_text_from_pdf, extract_text_from_pdf_async
+
+    async def measure():
+        results = {}
+        for page_count in page_counts:
+            data = synthetic_pdf(page_count, seed=page_count)
+
+            sequential = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                assert extract_text_from_pdf(data), "extraction returned no text"
+                sequential.append(time.perf_counter() - start)
+
+            await extract_text_from_pdf_async(data)  # start the pool workers
+            pool = await _time_async(lambda: extract_text_from_pdf_async(data), repeats)
+            budget = await _time_async(
+                lambda: extract_text_from_pdf_async(data, max_chars=settings.PROMPT_SOURCE_CHARS), repeats
+            )
+            results[f"{page_count}_pages"] = {
+                "bytes": len(data),
+                "sequential": _summary(sequential, page_count, len(data)),
+                "pool": _summary(pool, page_count, len(data)),
+                "prompt_budget": percentiles(budget),
+            }
+        return results
+
+    try:
+        return asyncio.run(measure())
+    finally:
+        shutdown_executors()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", nargs="+", type=int, default=PAGE_COUNTS)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    add_json_argument(parser)
+    args = parser.parse_args()
+
+    results = run(args.pages, args.repeats)
+
+    print(f"{'pages':>6} {'KB':>7} {'seq p50 ms':>11} {'seq pages/s':>12} "
+          f"{'pool p50 ms':>12} {'pool pages/s':>13} {'budget p50 ms':>14}")
+    for page_count in args.pages:
+        result = results[f"{page_count}_pages"]
+        print(f"{page_count:>6} {result['bytes'] / 1024:>7.0f} "
+              f"{result['sequential']['p50_ms']:>11.1f} {result['sequential']['pages_per_s']:>12.1f} "
+              f"{result['pool']['p50_ms']:>12.1f} {result['pool']['pages_per_s']:>13.1f} "
+              f"{result['prompt_budget']['p50_ms']:>14.1f}")
+
+    if args.json:
+        write_results(args.json, {"pdf_extraction": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/question_dedup.py
+
+"""
+Near-duplicate detection cost: one quiz, and one quiz against the index
+
+Synthetic unit vectors stand in for MiniLM embeddings (no model needed).
+The index is searched with each available backend (hnsw needs hnswlib).
+Run from the backend directory:
+    python benchmarks/question_dedup.py [--stored 100000] [--json out.json]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.common import percentiles, add_json_argument, write_results
+
+DIM = 384
+QUIZ_SIZES = [15, 150, 1500]
+QUERIES = 15   # one quiz
+REPEATS = 20
+
+
+def run(stored=100_000, quiz_sizes=QUIZ_SIZES, repeats=REPEATS):
+    """
+    Returns:
+        dict: {"within_quiz": {"<n>_questions": percentiles},
+               "index_<backend>": {"build_s", "search": percentiles, "recall"}}
+    """
+    from app.services.question_index import QuestionIndex, find_duplicates
+
+    rng = np.random.default_rng(0)
+    results = {"within_quiz": {}}
+    for size in quiz_sizes:
+        vectors = rng.standard_normal((size, DIM)).astype(np.float32)
+        durations = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            find_duplicates(vectors, 0.9)
+            durations.append(time.perf_counter() - start)
+        results["within_quiz"][f"{size}_questions"] = percentiles(durations)
+
+    corpus = rng.standard_normal((stored, DIM)).astype(np.float32)
+    texts = [f"question {i}" for i in range(stored)]
+    # Half of each quiz repeats a stored question with a little noise
+    targets = rng.integers(0, stored, size=QUERIES // 2)
+
+    for backend in ("exact", "hnsw"):
+        try:
+            index = QuestionIndex(backend=backend)
+        except ImportError:
+            results[f"index_{backend}"] = {"error": "hnswlib not installed"}
+            continue
+        start = time.perf_counter()
+        index.add(texts, corpus)
+        build_s = time.perf_counter() - start
+
+        durations, found = [], 0
+        for _ in range(repeats):
+            queries = np.vstack([
+                corpus[targets] + 0.05 * rng.standard_normal((len(targets), DIM)).astype(np.float32),
+                rng.standard_normal((QUERIES - len(targets), DIM)).astype(np.float32),
+            ])
+            start = time.perf_counter()
+            matches = index.search(queries, 0.9)
+            durations.append(time.perf_counter() - start)
+            found += sum(
+                1 for match, target in zip(matches, targets)
+                if match is not None and match[0] == texts[target]
+            )
+        results[f"index_{backend}"] = {
+            "stored": stored,
+            "build_s": round(build_s, 3),
+            "search": percentiles(durations),
+            "recall": round(found / (repeats * len(targets)), 4),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stored", type=int, default=100_000, help="questions in the index")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    add_json_argument(parser)
+    args = parser.parse_args()
+
+    results = run(args.stored, repeats=args.repeats)
+
+    print(f"{'within quiz':>14} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, stats in results["within_quiz"].items():
+        print(f"{name:>14} {stats['p50_ms']:>9.3f} {stats['p99_ms']:>9.3f}")
+    print(f"\n{'index':>8} {'stored':>8} {'build s':>8} {'p50 ms':>9} {'p99 ms':>9} {'recall':>7}")
+    for backend in ("exact", "hnsw"):
+        result = results[f"index_{backend}"]
+        if "error" in result:
+            print(f"{backend:>8} skipped: {result['error']}")
+            continue
+        print(f"{backend:>8} {result['stored']:>8} {result['build_s']:>8.2f} {result['search']['p50_ms']:>9.2f} "
+              f"{result['search']['p99_ms']:>9.2f} {result['recall']:>6.1%}")
+
+    if args.json:
+        write_results(args.json, {"question_dedup": results})
+
+
+if __name__ == "__main__":
+    main()
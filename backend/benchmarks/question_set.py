@@ -0,0 +1,75 @@
+# benchmarks/question_set.py
+
+"""
+Fixed question set shared by the classifier benchmarks
+
+Covers every Bloom's level and the question styles Gemini produces
+(imperatives, wh-questions, true/false statements, identification prompts).
+"""
+
+BENCHMARK_QUESTIONS = [
+    "What is the capital of France?",
+    "Define photosynthesis.",
+    "List the three states of matter.",
+    "Who wrote the Declaration of Independence?",
+    "Identify the main organ of the circulatory system.",
+    "Name the largest planet in the solar system.",
+    "Recall the formula for the area of a circle.",
+    "What year did World War II end?",
+    "Describe the water cycle.",
+    "Explain why the sky appears blue.",
+    "Summarize the main idea of the passage.",
+    "Classify the following animals as mammals or reptiles.",
+    "Give an example of a chemical change.",
+    "Which of the following is a prime number?",
+    "True or false: the heart has four chambers.",
+    "Identify the term described: the powerhouse of the cell.",
+    "Apply Newton's second law to compute the acceleration of a 2 kg mass under a 10 N force.",
+    "Use the given data to calculate the average speed of the car.",
+    "Demonstrate how to solve a quadratic equation by completing the square.",
+    "Analyze the causes of the French Revolution.",
+    "Compare and contrast mitosis and meiosis.",
+    "Examine the relationship between supply and demand in this scenario.",
+    "Differentiate between weather and climate.",
+    "Evaluate the effectiveness of the government's economic policy.",
+    "Justify your choice of experimental method.",
+    "Critique the author's argument about renewable energy.",
+    "Assess the strengths and weaknesses of the proposed solution.",
+    "Design an experiment to test the effect of light on plant growth.",
+    "Create a plan to reduce plastic waste in your school.",
+    "Propose a new solution to traffic congestion in large cities.",
+    "Formulate a hypothesis explaining the observed results.",
+    "Develop a marketing strategy for a new product.",
+    "Predict what would happen if the Earth stopped rotating.",
+    "How would you improve the design of this bridge?",
+    "Which argument best supports the author's conclusion, and why?",
+    "What evidence would you use to defend this position?",
+    "State the first law of thermodynamics.",
+    "Label the parts of a plant cell.",
+    "Match each scientist with their discovery.",
+    "Select the correct unit for measuring force.",
+    "When did the Berlin Wall fall?",
+    "Where is the mitochondria located in the cell?",
+    "Interpret the graph showing population growth.",
+    "Paraphrase the second paragraph in your own words.",
+    "Translate the sentence into scientific notation.",
+    "Solve for x: 2x + 3 = 11.",
+    "Calculate the kinetic energy of a 3 kg ball moving at 4 m/s.",
+    "Implement a function that reverses a list.",
+    "Infer the author's attitude toward technology from the text.",
+    "Distinguish between facts and opinions in the article.",
+    "Investigate how temperature affects the rate of reaction.",
+    "Organize the events in chronological order and explain the pattern.",
+    "Defend the decision to build the new highway.",
+    "Prioritize the tasks needed to launch the project.",
+    "Recommend the best approach for reducing energy use.",
+    "Construct an argument for or against school uniforms.",
+    "Compose a short poem about the ocean.",
+    "What if the moon did not exist?",
+    "Imagine you are a cell; describe your daily activities.",
+    "Why do leaves change color in autumn?",
+    "The Earth revolves around the Sun once every 365 days.",
+    "Photosynthesis takes place in the chloroplasts.",
+    "Which statement best describes the role of enzymes?",
+    "Identify the term that describes the resistance of a fluid to flow.",
+]
@@ -0,0 +1,64 @@
+# benchmarks/run_all.py
+
+"""
+Run the benchmark suite and write one JSON result file
+
+Results go to benchmarks/results/<short commit>.json by default; compare
+two runs with benchmarks/compare.py. --quick shrinks every benchmark for a
+fast smoke run (numbers are then only roughly comparable).
+Run from the backend directory:
+    python benchmarks/run_all.py [--quick] [--only pdf_extraction load_test] [--json out.json]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import (
+    classifier_throughput, document_extraction, format_quiz, load_test, pdf_extraction, question_dedup,
+)
+from benchmarks.common import default_results_path, write_results
+
+SUITES = {
+    "pdf_extraction": (pdf_extraction.run, {}, {"page_counts": [1, 10, 50], "repeats": 2}),
+    "document_extraction": (document_extraction.run, {}, {"pages": 10, "files": 6, "repeats": 2}),
+    "classifier_throughput": (classifier_throughput.run, {}, {"batch_sizes": [1, 32], "repeats": 5}),
+    "format_quiz": (format_quiz.run, {}, {"sizes": [15, 1500], "repeats": 5}),
+    "question_dedup": (question_dedup.run, {}, {"stored": 10_000, "repeats": 5}),
+    "load_test": (load_test.run, {}, {"concurrency_levels": [1, 4], "requests_per_level": 8,
+                                      "fake_latency": 0.1}),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=list(SUITES), default=list(SUITES))
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer repeats")
+    parser.add_argument("--backends", nargs="+", default=["torch"], help="classifier backends")
+    parser.add_argument("--json", metavar="PATH", help="output file (default benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.only:
+        run, options, quick_options = SUITES[name]
+        options = dict(quick_options if args.quick else options)
+        if name == "classifier_throughput":
+            options["backends"] = args.backends
+        print(f"▶ {name}...")
+        start = time.perf_counter()
+        try:
+            results[name] = run(**options)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"  failed: {results[name]['error']}")
+        else:
+            print(f"  done in {time.perf_counter() - start:.1f}s")
+
+    write_results(args.json or default_results_path(), results)
+    return 1 if any("error" in result for result in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
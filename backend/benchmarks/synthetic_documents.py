@@ -0,0 +1,132 @@
+# benchmarks/synthetic_documents.py
+
+"""
+Deterministic synthetic documents in every upload format
+
+Builds DOCX, PPTX, TXT, Markdown and HTML files from the same page texts
+as benchmarks/synthetic_pdf.py (the OOXML packages by hand with zipfile,
+holding only the parts the extractors read), so each format's extraction
+throughput is measured on identical content.
+"""
+
+import io
+import zipfile
+from xml.sax.saxutils import escape
+
+from benchmarks.synthetic_pdf import synthetic_pages, synthetic_pdf
+
+FORMATS = ["pdf", "docx", "pptx", "txt", "md", "html"]
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+_P_NS = "http://schemas.openxmlformats.org/presentationml/2006/main"
+_R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_SLIDE_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide"
+
+# Lines per paragraph (DOCX, Markdown, HTML) or bullet (PPTX)
+LINES_PER_PARAGRAPH = 6
+
+
+def _paragraphs(page):
+    lines = page.split("\n")
+    return [" ".join(lines[i:i + LINES_PER_PARAGRAPH]) for i in range(0, len(lines), LINES_PER_PARAGRAPH)]
+
+
+def _zip(parts):
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in parts.items():
+            archive.writestr(name, content)
+    return out.getvalue()
+
+
+def make_docx(pages):
+    """A DOCX with one page per text (explicit page breaks between them)"""
+    body = []
+    for number, page in enumerate(pages):
+        if number:
+            body.append('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+        body.append(f"<w:p><w:r><w:t>Section {number + 1}</w:t></w:r></w:p>")
+        body.extend(
+            f'<w:p><w:r><w:t xml:space="preserve">{escape(paragraph)}</w:t></w:r></w:p>'
+            for paragraph in _paragraphs(page)
+        )
+    document = f'<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="{_W_NS}"><w:body>{"".join(body)}</w:body></w:document>'
+    return _zip({
+        "[Content_Types].xml": '<?xml version="1.0" encoding="UTF-8"?><Types/>',
+        "word/document.xml": document,
+    })
+
+
+def make_pptx(pages):
+    """A PPTX with one slide per text (a title and one bullet per paragraph)"""
+    parts = {"[Content_Types].xml": '<?xml version="1.0" encoding="UTF-8"?><Types/>'}
+    slide_ids, rels = [], []
+    for number, page in enumerate(pages, start=1):
+        bullets = "".join(
+            f"<a:p><a:r><a:t>{escape(paragraph)}</a:t></a:r></a:p>" for paragraph in _paragraphs(page)
+        )
+        parts[f"ppt/slides/slide{number}.xml"] = (
+            f'<?xml version="1.0" encoding="UTF-8"?><p:sld xmlns:p="{_P_NS}" xmlns:a="{_A_NS}"><p:cSld><p:spTree>'
+            f"<p:sp><p:txBody><a:p><a:r><a:t>Slide {number}</a:t></a:r></a:p></p:txBody></p:sp>"
+            f"<p:sp><p:txBody>{bullets}</p:txBody></p:sp>"
+            "</p:spTree></p:cSld></p:sld>"
+        )
+        slide_ids.append(f'<p:sldId id="{255 + number}" r:id="rId{number}"/>')
+        rels.append(f'<Relationship Id="rId{number}" Type="{_SLIDE_REL}" Target="slides/slide{number}.xml"/>')
+    parts["ppt/presentation.xml"] = (
+        f'<?xml version="1.0" encoding="UTF-8"?><p:presentation xmlns:p="{_P_NS}" xmlns:r="{_R_NS}">'
+        f'<p:sldIdLst>{"".join(slide_ids)}</p:sldIdLst></p:presentation>'
+    )
+    parts["ppt/_rels/presentation.xml.rels"] = (
+        f'<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="{_REL_NS}">{"".join(rels)}</Relationships>'
+    )
+    return _zip(parts)
+
+
+def make_txt(pages):
+    """Plain text, pages separated by form feeds"""
+    return "\f".join(pages).encode("utf-8")
+
+
+def make_markdown(pages):
+    """Markdown with a heading per page, emphasis and a link in every paragraph"""
+    out = ["---", "title: Synthetic unit", "---", ""]
+    for number, page in enumerate(pages, start=1):
+        out.append(f"## Section {number}\n")
+        for paragraph in _paragraphs(page):
+            first, _, rest = paragraph.partition(" ")
+            out.append(f"**{first}** {rest} See [the notes](https://example.com/{number}).\n")
+    return "\n".join(out).encode("utf-8")
+
+
+def make_html(pages):
+    """An HTML page with navigation, a script and one <section> per page"""
+    out = [
+        "<!DOCTYPE html><html><head><title>Synthetic unit</title>",
+        "<style>body { font-family: sans-serif; }</style></head><body>",
+        '<nav><a href="/">Home</a> <a href="/units">Units</a></nav>',
+    ]
+    for number, page in enumerate(pages, start=1):
+        out.append(f"<section><h2>Section {number}</h2>")
+        out.extend(f"<p>{escape(paragraph)}</p>" for paragraph in _paragraphs(page))
+        out.append("</section>")
+    out.append("<script>console.log('analytics');</script><footer>Course site</footer></body></html>")
+    return "\n".join(out).encode("utf-8")
+
+
+_BUILDERS = {
+    "docx": make_docx,
+    "pptx": make_pptx,
+    "txt": make_txt,
+    "md": make_markdown,
+    "html": make_html,
+}
+
+
+def synthetic_document(document_format, page_count, seed=0):
+    """A page_count-page document in the given format; the same seed always gives the same bytes"""
+    if document_format == "pdf":
+        return synthetic_pdf(page_count, seed)
+    return _BUILDERS[document_format](synthetic_pages(page_count, seed))
@@ -0,0 +1,105 @@
+# benchmarks/synthetic_pdf.py
+
+"""
+Deterministic synthetic PDFs for the extraction and load benchmarks
+
+Writes minimal text-only PDFs (one Helvetica content stream per page)
+without any PDF library, so the corpus is identical on every machine.
+"""
+
+import random
+
+SUBJECTS = [
+    "Photosynthesis", "The water cycle", "Plate tectonics", "The French Revolution",
+    "Natural selection", "Supply and demand", "The immune system", "Newton's second law",
+    "The Industrial Revolution", "Cellular respiration", "The Roman Republic", "Climate change",
+]
+VERBS = [
+    "explains", "depends on", "is driven by", "changes", "regulates", "was shaped by",
+    "influences", "transforms", "is measured by", "contrasts with",
+]
+OBJECTS = [
+    "the movement of energy through ecosystems", "the distribution of resources",
+    "long-term patterns in the environment", "the behavior of individual cells",
+    "the balance between competing forces", "political institutions of the period",
+    "the rate of chemical reactions", "economic decisions made by households",
+]
+
+LINE_CHARS = 90
+LINES_PER_PAGE = 48
+
+
+def synthetic_pages(page_count, seed=0):
+    """
+    Generate page texts made of plausible study-material sentences
+
+    Returns:
+        list: One string per page, LINES_PER_PAGE lines of ~LINE_CHARS characters
+    """
+    rng = random.Random(seed)
+    pages = []
+    for _ in range(page_count):
+        words = []
+        while sum(len(w) + 1 for w in words) < LINE_CHARS * LINES_PER_PAGE:
+            words.extend(f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)}.".split())
+        lines, line = [], ""
+        for word in words:
+            if len(line) + len(word) + 1 > LINE_CHARS:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        pages.append("\n".join(lines[:LINES_PER_PAGE]))
+    return pages
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages):
+    """
+    Build a PDF with one page per text
+
+    Args:
+        pages (list): Page texts (ASCII, newline-separated lines)
+
+    Returns:
+        bytes: The PDF file
+    """
+    count = len(pages)
+    font_id = 3 + 2 * count
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [{}] /Count {} >>".format(
+            " ".join(f"{3 + 2 * i} 0 R" for i in range(count)), count
+        ),
+    ]
+    for i, text in enumerate(pages):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>"
+        )
+        body = "BT /F1 10 Tf 50 760 Td 14 TL " + " ".join(
+            f"({_escape(line)}) '" for line in text.split("\n")
+        ) + " ET"
+        objects.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    out += b"".join(f"{offset:010d} 00000 n \n".encode("ascii") for offset in offsets)
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    ).encode("ascii")
+    return bytes(out)
+
+
+def synthetic_pdf(page_count, seed=0):
+    """A page_count-page PDF; the same seed always gives the same bytes"""
+    return make_pdf(synthetic_pages(page_count, seed))
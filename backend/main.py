@@ -1,14 +1,60 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from app.config.settings import settings
 from app.routes import quiz_routes
+from app.services.bert_classifier import load_classifier
+from app.services.job_queue import get_job_queue
+from app.utils.executors import run_in_bert_executor, shutdown_executors
+from app.utils.upload_limits import UploadSizeLimitMiddleware, MULTIPART_OVERHEAD
+from app.utils.metrics import MetricsMiddleware, render_metrics
+
+logger = logging.getLogger(__name__)
+
+
+async def _warm_up_classifier():
+    try:
+        await run_in_bert_executor(load_classifier)
+    except Exception as e:
+        # Reported as "error" on /health; requests will retry the load
+        logger.error("❌ BERT warm-up failed: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load BERT in the background so the port binds immediately;
+    # /api/quiz/health reports "cold" until the model is ready.
+    # With a classifier sidecar (BERT_SERVER_SOCKET) workers never load it.
+    eager_load = settings.BERT_EAGER_LOAD and not settings.BERT_SERVER_SOCKET
+    warm_up = asyncio.create_task(_warm_up_classifier()) if eager_load else None
+    job_queue = get_job_queue()
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    if warm_up is not None and not warm_up.done():
+        warm_up.cancel()
+    # Release PDF/BERT worker pools on shutdown
+    shutdown_executors()
+
 
 app = FastAPI(
     title="Quiz Generator API",
     description="AI-powered quiz generation using Gemini",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# CORS Configuration
+# Reject oversized uploads while they stream in, before multipart parsing
+# (added first so CORS wraps it and the 413 carries CORS headers)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_body_size=settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+    path_limits={"/api/quiz/generate-batch": settings.BATCH_MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD}
+)
+
+# CORS Configuration (outside the size limit)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://localhost:5173", "http://localhost:5174"],
@@ -17,6 +63,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost: request latency histogram and slow-request log
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(quiz_routes.router, prefix="/api/quiz", tags=["Quiz"])
 
@@ -26,4 +75,11 @@ async def root():
         "message": "Quiz Generator API",
         "status": "running",
         "docs": "/docs"
-    }
\ No newline at end of file
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,17 @@
+# tests/conftest.py
+
+"""
+Shared test setup: the offline Gemini transport, so no API key is needed,
+and every store in a throwaway directory instead of backend/cache
+"""
+
+import os
+import tempfile
+
+_store_dir = tempfile.mkdtemp(prefix="quiz-tests-")
+
+os.environ.setdefault("GEMINI_TRANSPORT", "fake")
+os.environ.setdefault("EMBEDDING_CACHE_DIR", os.path.join(_store_dir, "embeddings"))
+os.environ.setdefault("QUESTION_BANK_PATH", os.path.join(_store_dir, "question_bank.sqlite3"))
+os.environ.setdefault("JOB_STORE_PATH", os.path.join(_store_dir, "jobs.sqlite3"))
+os.environ.setdefault("QUIZ_CACHE_PATH", os.path.join(_store_dir, "quiz_cache.sqlite3"))
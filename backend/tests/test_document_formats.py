@@ -0,0 +1,96 @@
+# tests/test_document_formats.py
+
+"""
+Format sniffing and the ZIP limits of batch uploads
+"""
+
+import io
+import zipfile
+
+import pytest
+
+from app.config.settings import settings
+from app.services.batch_pipeline import expand_zip, collect_documents, BatchTooLargeError
+from app.utils.document_extractors import detect_format
+from benchmarks.synthetic_documents import synthetic_document
+
+
+def _zip(members):
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("document_format", ["pdf", "docx", "pptx", "md", "html", "txt"])
+def test_formats_are_sniffed_from_content(document_format):
+    # A misleading name doesn't change what the content is
+    assert detect_format(synthetic_document(document_format, 2), "upload.bin") == document_format
+
+
+def test_extension_decides_between_text_formats():
+    html = synthetic_document("html", 1)
+    assert detect_format(html, "notes.txt") == "txt"
+    assert detect_format(b"# Title\n\nplain", "notes.md") == "md"
+
+
+def test_binary_and_plain_zip_content():
+    assert detect_format(b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR", "scan.pdf") is None
+    assert detect_format(b"PK\x03\x04 truncated archive", "a.docx") is None
+    assert detect_format(_zip({"notes.txt": "hello"}), "unit.zip") == "zip"
+
+
+def test_text_decoding_edge_cases():
+    assert detect_format("Café notes".encode("utf-16")) == "txt"
+    assert detect_format("naïve".encode("cp1252")) == "txt"
+    # A multi-byte character cut by the sniff window is still text
+    assert detect_format(("é" * 5000).encode("utf-8")) == "txt"
+
+
+def test_zip_members_are_sniffed_and_junk_skipped():
+    archive = _zip({
+        "unit/lesson.docx": synthetic_document("docx", 1),
+        "unit/readme.txt": "Plain notes about the unit.",
+        "unit/photo.png": b"\x89PNG\r\n\x1a\n\x00\x00",
+        "unit/.DS_Store": b"\x00\x00",
+        "__MACOSX/unit/._lesson.docx": b"\x00\x05",
+    })
+    documents = expand_zip("unit.zip", archive)
+    assert [(d["name"], d["format"], d["error"] is None) for d in documents] == [
+        ("unit.zip/unit/lesson.docx", "docx", True),
+        ("unit.zip/unit/readme.txt", "txt", True),
+        ("unit.zip/unit/photo.png", None, False),
+    ]
+
+
+def test_zip_bomb_member_is_rejected_without_inflating_it(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 1024)
+    archive = _zip({"bomb.txt": b"0" * (50 * 1024 * 1024), "ok.txt": b"fine"})
+    assert len(archive) < 100 * 1024
+
+    bomb, ok = expand_zip("unit.zip", archive)
+    assert (bomb["status_code"], bomb["data"]) == (413, None)
+    assert ok["data"] == b"fine"
+
+
+def test_zip_total_over_batch_limit_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 1024)
+    monkeypatch.setattr(settings, "BATCH_MAX_UPLOAD_SIZE", 4096)
+    archive = _zip({f"part{i}.txt": b"x" * 1000 for i in range(5)})
+    with pytest.raises(BatchTooLargeError) as e:
+        expand_zip("unit.zip", archive)
+    assert e.value.status_code == 413
+
+
+def test_corrupt_zip_becomes_an_error_document():
+    [document] = expand_zip("unit.zip", b"PK\x03\x04 not really")
+    assert document["error"].startswith("Invalid ZIP archive")
+
+
+def test_batch_document_count_is_capped(monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_MAX_FILES", 3)
+    archive = _zip({f"note{i}.txt": f"Note {i}" for i in range(4)})
+    with pytest.raises(BatchTooLargeError):
+        collect_documents([("unit.zip", archive)])
+    assert len(collect_documents([("a.txt", b"a"), ("b.txt", b"b"), ("c.txt", b"c")])) == 3
@@ -0,0 +1,53 @@
+# tests/test_embedding_cache.py
+
+"""
+The persistent embedding store stays within max_rows, evicting the least recently used
+"""
+
+import sqlite3
+
+import numpy as np
+
+from app.services.embedding_cache import SQLiteEmbeddingStore, EmbeddingCache
+
+
+def _vector(i):
+    return np.full(4, i, dtype=np.float32)
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    store = SQLiteEmbeddingStore(str(tmp_path / "embeddings.db"), max_rows=3)
+    store.put_many([("a", _vector(1)), ("b", _vector(2)), ("c", _vector(3))])
+    # Make "a" the most recently used, then overflow
+    assert list(store.get_many(["a"])) == ["a"]
+    store._touched["a"] += 1
+    store.put_many([("d", _vector(4))])
+
+    assert store.count() == 3
+    assert set(store.get_many(["a", "b", "c", "d"])) == {"a", "c", "d"}
+    assert store.evictions == 1
+
+
+def test_store_upgrades_old_schema(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+    conn.execute("INSERT INTO embeddings VALUES (?, ?)", ("old", _vector(1).tobytes()))
+    conn.commit()
+    conn.close()
+
+    store = SQLiteEmbeddingStore(path, max_rows=1)
+    store.put_many([("new", _vector(2))])
+    assert set(store.get_many(["old", "new"])) == {"new"}
+
+
+def test_cache_reads_through_to_store(tmp_path):
+    store = SQLiteEmbeddingStore(str(tmp_path / "embeddings.db"))
+    EmbeddingCache(10, store).put_many(["a"], [_vector(1)])
+
+    fresh = EmbeddingCache(10, store)
+    vectors = fresh.get_many(["a", "b"])
+    np.testing.assert_array_equal(vectors[0], _vector(1))
+    assert vectors[1] is None
+    stats = fresh.stats()
+    assert (stats["store_hits"], stats["misses"], stats["store_entries"]) == (1, 1, 1)
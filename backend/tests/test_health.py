@@ -0,0 +1,39 @@
+# tests/test_health.py
+
+"""
+/health gates on the BERT warm-up only when something performs it
+"""
+
+from fastapi.testclient import TestClient
+
+from app.config.settings import settings
+from main import app
+
+
+def _status(state):
+    async def classifier_status():
+        return {"state": state, "model": settings.BERT_MODEL_NAME}
+    return classifier_status
+
+
+def _health(monkeypatch, eager_load, state):
+    monkeypatch.setattr(settings, "BERT_EAGER_LOAD", eager_load)
+    monkeypatch.setattr(settings, "BERT_SERVER_SOCKET", "")
+    monkeypatch.setattr("app.routes.quiz_routes.classifier_status", _status(state))
+    return TestClient(app).get("/api/quiz/health")
+
+
+def test_cold_model_is_unhealthy_while_warming_up(monkeypatch):
+    response = _health(monkeypatch, True, "cold")
+    assert response.status_code == 503
+    assert response.json()["status"] == "warming"
+
+
+def test_cold_model_is_healthy_with_lazy_loading(monkeypatch):
+    response = _health(monkeypatch, False, "cold")
+    assert response.status_code == 200
+    assert response.json()["bert_classifier"] == "cold"
+
+
+def test_failed_load_is_unhealthy_with_lazy_loading(monkeypatch):
+    assert _health(monkeypatch, False, "error").status_code == 503
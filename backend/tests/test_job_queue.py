@@ -0,0 +1,138 @@
+# tests/test_job_queue.py
+
+"""
+Job store leases and the queue's claim / reclaim behaviour
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.config.settings import settings
+from app.services import job_queue
+from app.services.job_queue import JobStore, JobQueue, STATUS_DONE, STATUS_FAILED, STATUS_RUNNING
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_only_one_owner_claims_a_job(store):
+    store.create("j1", {}, b"data")
+    assert store.claim("j1", "a", 60)
+    assert not store.claim("j1", "b", 60)
+    assert store.get("j1")["status"] == STATUS_RUNNING
+
+
+def test_expired_lease_is_taken_over_and_old_owner_loses_it(store):
+    store.create("j1", {}, b"data")
+    assert store.claim("j1", "a", -1)  # lease already expired
+    assert store.claimable_job_ids(queued_before=0) == ["j1"]
+    assert store.claim("j1", "b", 60)
+
+    # The first owner's late result is ignored, the input kept for b
+    store.finish("j1", {"late": True}, owner="a")
+    assert store.get("j1")["status"] == STATUS_RUNNING
+    assert store.get_input("j1") == b"data"
+
+    store.finish("j1", {"quiz": 1}, owner="b")
+    job = store.get("j1")
+    assert (job["status"], job["result"]) == (STATUS_DONE, {"quiz": 1})
+    assert store.get_input("j1") is None
+
+
+def test_renewed_lease_is_not_claimable(store):
+    store.create("j1", {}, b"data")
+    store.claim("j1", "a", -1)
+    store.renew("a", ["j1"], 60)
+    assert store.claimable_job_ids(queued_before=0) == []
+    assert not store.claim("j1", "b", 60)
+
+
+def test_queued_jobs_are_claimable_only_once_stale(store):
+    store.create("j1", {}, b"data")
+    job = store.get("j1")
+    assert store.claimable_job_ids(queued_before=job["updated_at"]) == []
+    assert store.claimable_job_ids(queued_before=job["updated_at"] + 1) == ["j1"]
+
+
+def test_purge_keeps_unfinished_jobs(store):
+    store.create("done", {}, b"")
+    store.create("queued", {}, b"")
+    store.finish("done", None, "boom", 500)
+    assert store.get("done")["status"] == STATUS_FAILED
+
+    store.purge(older_than=store.get("done")["updated_at"] + 1)
+    assert store.get("done") is None
+    assert store.get("queued") is not None
+
+
+def test_store_upgrades_old_schema(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, stage TEXT, params TEXT NOT NULL,"
+        " result TEXT, error TEXT, status_code INTEGER, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+    )
+    conn.commit()
+    conn.close()
+
+    store = JobStore(path)
+    store.create("j1", {}, b"")
+    assert store.claim("j1", "a", 60)
+
+
+def test_two_queues_run_each_job_once(store, monkeypatch):
+    runs = []
+
+    async def fake_pipeline(data, on_stage=None, **params):
+        runs.append(params["n"])
+        await on_stage("generating")
+        await asyncio.sleep(0.01)
+        return {"n": params["n"]}
+
+    monkeypatch.setattr(job_queue, "run_quiz_pipeline", fake_pipeline)
+    monkeypatch.setattr(settings, "JOB_SWEEP_INTERVAL", 0.01)
+    monkeypatch.setattr(settings, "JOB_LEASE_SECONDS", 0.3)
+
+    async def main():
+        first, second = JobQueue(store, 2, 50), JobQueue(store, 2, 50)
+        await first.start()
+        await second.start()
+        job_ids = [await first.submit(b"pdf", {"n": n}) for n in range(10)]
+        # The second queue's sweeper also sees them once they are stale
+        for _ in range(200):
+            if all(store.get(job_id)["status"] == STATUS_DONE for job_id in job_ids):
+                break
+            await asyncio.sleep(0.01)
+        await first.stop()
+        await second.stop()
+        return job_ids
+
+    job_ids = asyncio.run(main())
+    assert sorted(runs) == list(range(10))
+    assert [store.get(job_id)["result"] for job_id in job_ids] == [{"n": n} for n in range(10)]
+
+
+def test_job_of_a_dead_process_is_picked_up(store, monkeypatch):
+    async def fake_pipeline(data, on_stage=None, **params):
+        return {"recovered": True}
+
+    monkeypatch.setattr(job_queue, "run_quiz_pipeline", fake_pipeline)
+    monkeypatch.setattr(settings, "JOB_SWEEP_INTERVAL", 0.01)
+    store.create("orphan", {}, b"pdf")
+    store.claim("orphan", "dead-process", -1)
+
+    async def main():
+        queue = JobQueue(store, 1, 10)
+        await queue.start()
+        for _ in range(100):
+            if store.get("orphan")["status"] == STATUS_DONE:
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(main())
+    assert store.get("orphan")["result"] == {"recovered": True}
@@ -0,0 +1,82 @@
+# tests/test_json_parsing.py
+
+"""
+Quiz JSON repair and incremental stream parsing
+"""
+
+import json
+
+import pytest
+
+from app.utils.json_repair import parse_quiz_json, strip_trailing_commas
+from app.utils.json_stream import QuizStreamParser
+
+QUIZ = {
+    "multiple_choice": [
+        {"question": "Which {brace} is \"quoted\"?", "choices": ["a", "b", "c", "d"], "correct_answer": 1},
+        {"question": "Second [bracket] question?", "choices": ["a", "b", "c", "d"], "correct_answer": 0},
+    ],
+    "true_false": [{"question": "Commas, here.", "correct_answer": True}],
+    "identification": [{"question": "Name it.", "correct_answer": "it"}],
+}
+QUIZ_TEXT = json.dumps(QUIZ, indent=2)
+
+
+def test_clean_json_is_not_repaired():
+    assert parse_quiz_json(QUIZ_TEXT) == (QUIZ, False)
+
+
+@pytest.mark.parametrize("text", [
+    f"```json\n{QUIZ_TEXT}\n```",
+    f"Here is your quiz:\n{QUIZ_TEXT}\nGood luck!",
+    QUIZ_TEXT.replace('"d"]', '"d"],').replace("\n  ]", ",\n  ]"),
+])
+def test_fences_prose_and_trailing_commas_are_repaired(text):
+    assert parse_quiz_json(text) == (QUIZ, True)
+
+
+def test_trailing_commas_inside_strings_are_kept():
+    assert strip_trailing_commas('{"a": "x,]", "b": [1, 2, ], }') == '{"a": "x,]", "b": [1, 2 ] }'
+
+
+def test_truncated_output_keeps_completed_items():
+    cut = QUIZ_TEXT.index("Name it.")
+    quiz_data, repaired = parse_quiz_json(QUIZ_TEXT[:cut])
+    assert repaired
+    assert quiz_data == {
+        "multiple_choice": QUIZ["multiple_choice"],
+        "true_false": QUIZ["true_false"],
+        "identification": [],
+    }
+
+
+@pytest.mark.parametrize("text", ["", "Sorry, I can't help with that.", '{"multiple_choice": [{"question": "cut'])
+def test_nothing_recoverable_raises(text):
+    with pytest.raises(ValueError):
+        parse_quiz_json(text)
+
+
+def _stream(text, size):
+    parser = QuizStreamParser()
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start:start + size]))
+    return items
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, 100000])
+def test_stream_emits_every_item_whatever_the_chunking(size):
+    expected = [(section, item) for section, items in QUIZ.items() for item in items]
+    assert _stream(f"```json\n{QUIZ_TEXT}\n```", size) == expected
+
+
+def test_stream_emits_items_as_soon_as_they_close():
+    parser = QuizStreamParser()
+    first_end = QUIZ_TEXT.index("}", QUIZ_TEXT.index("correct_answer")) + 1
+    assert parser.feed(QUIZ_TEXT[:first_end - 1]) == []
+    assert parser.feed(QUIZ_TEXT[first_end - 1:first_end]) == [("multiple_choice", QUIZ["multiple_choice"][0])]
+
+
+def test_stream_skips_undecodable_items():
+    text = '{"true_false": [{"question": "ok", "correct_answer": true}, {"question": nope}, {"question": "b", "correct_answer": false}]}'
+    assert [item["question"] for _, item in _stream(text, 5)] == ["ok", "b"]
@@ -0,0 +1,64 @@
+# tests/test_lexical_classifier.py
+
+"""
+The lexical pre-classifier decides instructions and leaves statements to BERT
+"""
+
+import pytest
+
+from app.services.lexical_classifier import get_lexical_classifier
+
+# Statements that open with a taxonomy keyword used as a noun or a
+# conjunction, like generated true/false items
+STATEMENTS = [
+    "Rate of reaction increases with temperature.",
+    "Support for the hypothesis comes from fossil records.",
+    "Plan B was the preferred strategy during the drought.",
+    "State capitals are governed by mayors.",
+    "Use of antibiotics causes resistance.",
+    "Design flaws caused the bridge to collapse.",
+    "Name changes must be registered with the court.",
+    "When heated, water expands.",
+    "Which is why the cell membrane is selectively permeable.",
+]
+
+INSTRUCTIONS = [
+    ("Define the term osmosis.", "LOTS", "Remember"),
+    ("List three causes of the First World War.", "LOTS", "Remember"),
+    ("1. Identify the main idea of the passage.", "LOTS", "Remember"),
+    ("Calculate the area of a circle with radius 3 cm.", "LOTS", "Apply"),
+    ("Define: photosynthesis", "LOTS", "Remember"),
+    ("What is the capital of France?", "LOTS", "Remember"),
+    ("Design an experiment to test the pH of soil.", "HOTS", "Create"),
+    ("Justify your choice of sampling method.", "HOTS", "Evaluate"),
+    ("Why might a cell shrink in salt water?", "HOTS", "Create"),
+]
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return get_lexical_classifier()
+
+
+@pytest.mark.parametrize("statement", STATEMENTS)
+def test_statements_are_left_to_bert(classifier, statement):
+    assert classifier.classify(statement) is None
+
+
+@pytest.mark.parametrize("question, category, level", INSTRUCTIONS)
+def test_instructions_are_decided(classifier, question, category, level):
+    result = classifier.classify(question)
+    assert result["classification"] == category
+    assert result["bloom_level"] == level
+    assert result["method"] == "lexical"
+    # No similarity scores to report on BERT's scale
+    assert result["confidence"] is None
+
+
+def test_true_false_items_are_left_to_bert(classifier):
+    assert classifier.classify("Define the term osmosis.", "true_false") is None
+    assert classifier.classify("Define the term osmosis.", "identification") is not None
+
+
+def test_mixed_categories_are_left_to_bert(classifier):
+    assert classifier.classify("List the steps and evaluate which one is slowest.") is None
@@ -0,0 +1,123 @@
+# tests/test_question_dedup.py
+
+"""
+Near-duplicate flagging, dropping and top-up replacement
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.config.settings import settings
+from app.services import question_dedup
+from app.services.question_dedup import dedup_quiz
+from app.services.question_index import QuestionIndex
+
+DIMENSIONS = 32
+
+
+def _embed(texts):
+    """Questions about the same topic (their first word) embed identically"""
+    vectors = np.full((len(texts), DIMENSIONS), 0.01, dtype=np.float32)
+    for row, text in enumerate(texts):
+        vectors[row, sum(map(ord, text.split()[0])) % DIMENSIONS] = 1.0
+    return vectors
+
+
+@pytest.fixture(autouse=True)
+def fake_embeddings(monkeypatch):
+    async def embed_questions(texts):
+        return _embed(texts)
+
+    index = QuestionIndex(backend="exact")
+    monkeypatch.setattr(question_dedup, "embed_questions", embed_questions)
+    monkeypatch.setattr(question_dedup, "get_question_index", lambda: index)
+    monkeypatch.setattr(settings, "QUESTION_DEDUP_SCOPE", "document")
+    monkeypatch.setattr(settings, "GEMINI_TOP_UP_ATTEMPTS", 2)
+    return index
+
+
+def _quiz(*questions):
+    return {
+        "multiple_choice": [{"question": q, "choices": ["a", "b", "c", "d"], "correct_answer": 0} for q in questions],
+        "true_false": [],
+        "identification": [],
+    }
+
+
+def _questions(quiz):
+    return [item["question"] for item in quiz["multiple_choice"]]
+
+
+COUNTS = {"multiple_choice": 3, "true_false": 0, "identification": 0}
+
+
+def test_flag_mode_marks_repeats_in_place(monkeypatch):
+    monkeypatch.setattr(settings, "QUESTION_DEDUP", "flag")
+    quiz = asyncio.run(dedup_quiz(_quiz("cells divide how?", "photosynthesis needs?", "cells divide when?"),
+                                  COUNTS, source="doc"))
+    flagged = [item.get("duplicate_of") for item in quiz["multiple_choice"]]
+    assert flagged == [None, None, "cells divide how?"]
+
+
+def test_drop_mode_replaces_repeats_through_top_up(monkeypatch):
+    monkeypatch.setattr(settings, "QUESTION_DEDUP", "drop")
+    calls = []
+
+    async def top_up(missing, avoid):
+        calls.append((missing, avoid))
+        return _quiz("enzymes speed up?")
+
+    quiz = asyncio.run(dedup_quiz(_quiz("cells divide how?", "photosynthesis needs?", "cells divide when?"),
+                                  COUNTS, top_up=top_up, source="doc"))
+    assert _questions(quiz) == ["cells divide how?", "photosynthesis needs?", "enzymes speed up?"]
+    assert not any("duplicate_of" in item for item in quiz["multiple_choice"])
+    assert calls == [({"multiple_choice": 1, "true_false": 0, "identification": 0},
+                      ["cells divide how?", "photosynthesis needs?", "cells divide when?"])]
+
+
+def test_unreplaced_repeats_are_kept_flagged(monkeypatch):
+    monkeypatch.setattr(settings, "QUESTION_DEDUP", "drop")
+
+    async def top_up(missing, avoid):
+        # Every replacement repeats a kept question
+        return _quiz("photosynthesis requires?")
+
+    quiz = asyncio.run(dedup_quiz(_quiz("cells divide how?", "photosynthesis needs?", "cells divide when?"),
+                                  COUNTS, top_up=top_up, source="doc"))
+    assert _questions(quiz) == ["cells divide how?", "photosynthesis needs?", "cells divide when?"]
+    assert quiz["multiple_choice"][2]["duplicate_of"] == "cells divide how?"
+
+
+def test_failed_top_up_never_shortens_the_quiz(monkeypatch):
+    monkeypatch.setattr(settings, "QUESTION_DEDUP", "drop")
+
+    async def top_up(missing, avoid):
+        raise RuntimeError("quota")
+
+    quiz = asyncio.run(dedup_quiz(_quiz("cells a?", "cells b?", "cells c?"), COUNTS, top_up=top_up, source="doc"))
+    assert len(quiz["multiple_choice"]) == 3
+
+
+def test_regenerations_avoid_questions_of_the_same_document(monkeypatch, fake_embeddings):
+    monkeypatch.setattr(settings, "QUESTION_DEDUP", "flag")
+    asyncio.run(dedup_quiz(_quiz("cells divide how?"), COUNTS, source="doc"))
+
+    same = asyncio.run(dedup_quiz(_quiz("cells divide when?"), COUNTS, source="doc"))
+    other = asyncio.run(dedup_quiz(_quiz("cells divide why?"), COUNTS, source="other-doc"))
+    assert same["multiple_choice"][0]["duplicate_of"] == "cells divide how?"
+    assert "duplicate_of" not in other["multiple_choice"][0]
+
+
+def test_not_indexed_when_caller_indexes_later(monkeypatch, fake_embeddings):
+    monkeypatch.setattr(settings, "QUESTION_DEDUP", "drop")
+    asyncio.run(dedup_quiz(_quiz("cells divide how?"), COUNTS, source="doc", add_to_index=False))
+    assert fake_embeddings.search(_embed(["cells again?"]), 0.9, "doc") == [None]
+
+
+def test_off_mode_returns_the_quiz_untouched(monkeypatch):
+    monkeypatch.setattr(settings, "QUESTION_DEDUP", "off")
+    quiz = _quiz("cells a?", "cells b?")
+    assert asyncio.run(dedup_quiz(quiz, COUNTS, source="doc")) is quiz
+    assert not any("duplicate_of" in item for item in quiz["multiple_choice"])
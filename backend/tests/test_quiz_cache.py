@@ -0,0 +1,91 @@
+# tests/test_quiz_cache.py
+
+"""
+Quiz cache backends: LRU order, size bounds and TTL
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.quiz_cache import MemoryCacheBackend, SQLiteCacheBackend, QuizCache
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_backend(request, tmp_path):
+    def make(**limits):
+        if request.param == "memory":
+            return MemoryCacheBackend(**limits)
+        return SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), **limits)
+    return make
+
+
+def _keys(backend, keys):
+    return [key for key in keys if backend.get(key) is not None]
+
+
+def test_entry_limit_evicts_least_recently_used(make_backend, monkeypatch):
+    backend = make_backend(max_entries=3, max_bytes=10 ** 6)
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr("app.services.quiz_cache.time.time", lambda: next(clock))
+    for key in "abc":
+        backend.set(key, "x")
+    backend.get("a")  # a is now the most recently used
+    backend.set("d", "x")
+
+    assert _keys(backend, "abcd") == ["a", "c", "d"]
+    assert backend.stats()["evictions"] == 1
+
+
+def test_byte_limit_evicts_until_within_bounds(make_backend):
+    backend = make_backend(max_entries=100, max_bytes=1000)
+    for i in range(30):
+        backend.set(f"k{i}", "x" * 100)
+
+    stats = backend.stats()
+    assert stats["entries"] == 10 and stats["bytes"] == 1000
+    assert _keys(backend, [f"k{i}" for i in range(30)]) == [f"k{i}" for i in range(20, 30)]
+
+
+def test_oversized_value_is_not_stored(make_backend):
+    backend = make_backend(max_entries=10, max_bytes=10)
+    backend.set("big", "x" * 11)
+    assert backend.get("big") is None
+
+
+def test_expired_entries_are_misses(make_backend, monkeypatch):
+    backend = make_backend(ttl=60)
+    now = [1000.0]
+    monkeypatch.setattr("app.services.quiz_cache.time.time", lambda: now[0])
+    backend.set("a", "x")
+    assert backend.get("a") == "x"
+    now[0] += 61
+    assert backend.get("a") is None
+
+
+def test_sqlite_reads_are_recorded_without_writes(tmp_path, monkeypatch):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr("app.services.quiz_cache.time.time", lambda: next(clock))
+    backend.set("a", "x")
+    backend.set("b", "x")
+    backend.get("a")
+    assert backend._touched  # pending, written with the next set()
+    backend.set("c", "x")
+
+    assert not backend._touched
+    assert _keys(backend, "abc") == ["a", "c"]
+
+
+def test_quiz_cache_counts_hits_and_returns_copies():
+    cache = QuizCache(MemoryCacheBackend())
+    key = cache.make_key("text", 5, 5, 5, "model")
+    assert key != cache.make_key("text", 5, 5, 4, "model")
+
+    asyncio.run(cache.set_async(key, {"multiple_choice": []}))
+    first = asyncio.run(cache.get_async(key))
+    first["multiple_choice"].append("changed")
+    assert cache.get(key) == {"multiple_choice": []}
+    assert cache.get("missing") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
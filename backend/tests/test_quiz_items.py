@@ -0,0 +1,47 @@
+# tests/test_quiz_items.py
+
+"""
+Malformed Gemini items are dropped before anything calls string methods on them
+"""
+
+import json
+
+import pytest
+
+from app.services.gemini_service import _is_valid_item, _parse_quiz_response, _merge_top_up
+
+
+@pytest.mark.parametrize("item", [
+    {"question": 42, "correct_answer": True},
+    {"question": None, "correct_answer": True},
+    {"question": "   ", "correct_answer": True},
+    {"question": ["Is it?"], "correct_answer": True},
+    "Is water wet?",
+])
+def test_question_must_be_a_non_empty_string(item):
+    assert not _is_valid_item("true_false", item)
+
+
+@pytest.mark.parametrize("answer, valid", [(1, True), (0, True), (True, False), (False, False), (3, False), ("1", False)])
+def test_multiple_choice_answer_is_an_index(answer, valid):
+    item = {"question": "Pick one", "choices": ["a", "b", "c"], "correct_answer": answer}
+    assert _is_valid_item("multiple_choice", item) is valid
+
+
+def test_parse_drops_invalid_items_and_merge_survives():
+    response = json.dumps({
+        "multiple_choice": [
+            {"question": "Pick one", "choices": ["a", "b"], "correct_answer": True},
+            {"question": "Pick two", "choices": ["a", "b"], "correct_answer": 1},
+        ],
+        "true_false": [{"question": 7, "correct_answer": True}],
+        "identification": [{"question": None, "correct_answer": "x"}],
+    })
+    quiz = _parse_quiz_response(response)
+    assert [item["question"] for item in quiz["multiple_choice"]] == ["Pick two"]
+    assert quiz["true_false"] == [] and quiz["identification"] == []
+
+    extra = _parse_quiz_response(json.dumps({"true_false": [{"question": "Is it?", "correct_answer": False}]}))
+    counts = {"multiple_choice": 1, "true_false": 1, "identification": 0}
+    merged = _merge_top_up(quiz, extra, counts)
+    assert len(merged["true_false"]) == 1
@@ -0,0 +1,60 @@
+# tests/test_taxonomy_reload.py
+
+"""
+Every worker follows the shared taxonomy file, not only the one that handled the reload
+"""
+
+import json
+import os
+
+import pytest
+
+from app.config.settings import settings
+from app.services.lexical_classifier import get_lexical_classifier
+from app.utils import blooms_taxonomy
+from app.utils.blooms_taxonomy import DEFAULT_TAXONOMY_PATH, get_taxonomy
+
+
+@pytest.fixture
+def taxonomy_file(tmp_path, monkeypatch):
+    path = tmp_path / "taxonomy.json"
+    with open(DEFAULT_TAXONOMY_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    path.write_text(json.dumps(data), encoding="utf-8")
+    monkeypatch.setattr(settings, "BLOOMS_TAXONOMY_PATH", str(path))
+    monkeypatch.setattr(settings, "TAXONOMY_CHECK_INTERVAL", 0.001)
+    monkeypatch.setattr(blooms_taxonomy, "_taxonomy", None)
+    monkeypatch.setattr(blooms_taxonomy, "_next_check", 0.0)
+    return path, data
+
+
+def _rewrite(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    stat = os.stat(path)
+    # Make sure the change is visible even on coarse mtime filesystems
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    blooms_taxonomy._next_check = 0.0
+
+
+def test_changed_file_is_picked_up(taxonomy_file):
+    path, data = taxonomy_file
+    assert get_lexical_classifier().classify("Formulate the problem as an equation.")["classification"] == "HOTS"
+
+    for level in data["levels"]:
+        if level["name"] == "Remember":
+            level["keywords"].append("formulate")
+        else:
+            level["keywords"] = [k for k in level["keywords"] if k != "formulate"]
+    data["version"] = "test-2"
+    _rewrite(path, data)
+
+    assert get_taxonomy()["version"] == "test-2"
+    assert get_lexical_classifier().classify("Formulate the problem as an equation.")["classification"] == "LOTS"
+
+
+def test_invalid_file_keeps_previous_taxonomy(taxonomy_file):
+    path, data = taxonomy_file
+    version = get_taxonomy()["version"]
+    _rewrite(path, {"levels": []})
+
+    assert get_taxonomy()["version"] == version
@@ -0,0 +1,36 @@
+# tests/test_upload_limits.py
+
+"""
+Oversized uploads are rejected early, with CORS headers the browser can read
+"""
+
+from fastapi.testclient import TestClient
+
+from main import app
+
+ORIGIN = "http://localhost:5173"
+
+
+def _post(headers, body=b"--x--"):
+    client = TestClient(app)
+    return client.post(
+        "/api/quiz/generate-from-pdf",
+        content=body,
+        headers={"Origin": ORIGIN, "Content-Type": "multipart/form-data; boundary=x", **headers},
+    )
+
+
+def test_declared_oversize_is_413_with_cors_headers():
+    response = _post({"Content-Length": str(10 ** 10)})
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"] == ORIGIN
+
+
+def test_streamed_oversize_is_413_with_cors_headers():
+    def chunks():
+        for _ in range(200):
+            yield b"x" * (1024 * 1024)
+
+    response = _post({}, body=chunks())
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"] == ORIGIN